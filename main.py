@@ -11,6 +11,16 @@ from src import issues_parser
 from src import pull_requests_parser
 from src import wikipars
 from src import workflow_runs_parser
+from src.constants import HTTP_CACHE_PATH, USER_CACHE_PATH
+from src.graphql import commits_parser as graphql_commits_parser
+from src.graphql import issues_parser as graphql_issues_parser
+from src.graphql import pull_request_parser as graphql_pull_request_parser
+from src.http_cache import HttpCache
+from src.http_transport import transport
+from src.progress import SUMMARY, VERBOSITY_LEVELS, progress
+from src.sync_state import SyncState, get_state_path
+from src.user_cache import user_cache
+from src.sinks import CSV_FORMAT, OUTPUT_FORMATS
 from src.utils import parse_time, validate_and_normalize_cell
 
 
@@ -22,7 +32,13 @@ def parse_args():
         "-p", "--pull_requests", help="log pull requests", action="store_true"
     )
     parser.add_argument(
-        "--graphql", help="use graphql for requesting data (work only with --pull_requests) ", action="store_true"
+        "--graphql", help="use graphql for requesting data (work only with --commits, --pull_requests and --issues)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--commit_files",
+        help="with --commits --graphql also fetch changed file paths (one REST request per commit)",
+        action="store_true",
     )
     parser.add_argument("-i", "--issues", help="log issues", action="store_true")
     parser.add_argument("-w", "--wikis", help="log wikis", action="store_true")
@@ -76,9 +92,50 @@ def parse_args():
         default='./',
     )
     parser.add_argument('-o', '--out', type=str, required=True, help='output filename')
+    parser.add_argument(
+        '--format',
+        type=str,
+        choices=OUTPUT_FORMATS,
+        default=CSV_FORMAT,
+        help='output file format: csv, parquet or arrow (Arrow IPC stream)',
+    )
     parser.add_argument(
         "--pr_comments", help="log comments for PR", action="store_true"
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='number of repositories processed in parallel, each worker uses its own token',
+    )
+    parser.add_argument(
+        '--verbosity',
+        type=str,
+        choices=VERBOSITY_LEVELS,
+        default=SUMMARY,
+        help=(
+            'stdout output: "quiet" - only warnings and errors, '
+            '"summary" - periodic progress per repository, '
+            '"verbose" - progress and every logged row'
+        ),
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help=(
+            'fetch only commits, issues, pull requests and workflow runs newer than the previous run '
+            'and append them to the output file; marks are kept in <out>.state.json'
+        ),
+    )
+    parser.add_argument(
+        '--http_cache',
+        type=str,
+        default=HTTP_CACHE_PATH,
+        help='path to the on-disk HTTP cache; repeated runs revalidate cached pages with ETag/If-Modified-Since',
+    )
+    parser.add_argument(
+        '--no_cache', help='disable the on-disk HTTP and user profile caches', action='store_true'
+    )
     parser.add_argument(
         '-s',
         '--start',
@@ -144,19 +201,46 @@ def parse_args():
     return parser.parse_args()
 
 
-def run(args, binded_repos, repos_for_wiki=None):
+def run(args, binded_repos, repos_for_wiki=None, clients=None):
     start = parse_time(args.start.split('-'))
     finish = parse_time(args.finish.split('-'))
+    sync_state = SyncState(get_state_path(args.out)) if args.incremental else None
 
     if args.commits:
-        commits_parser.log_commits(
-            binded_repos, args.out, start, finish, args.branch, args.forks_include
-        )
+        if args.graphql:
+            graphql_commits_parser.log_commits_by_graphql(
+                binded_repos,
+                args.out,
+                start,
+                finish,
+                args.branch,
+                args.forks_include,
+                args.format,
+                args.workers,
+                sync_state,
+                args.commit_files,
+            )
+        else:
+            commits_parser.log_commits(
+                binded_repos,
+                args.out,
+                start,
+                finish,
+                args.branch,
+                args.forks_include,
+                args.format,
+                args.workers,
+                sync_state,
+            )
     if args.pull_requests:
         if args.graphql:
-            pull_requests_parser.log_pull_requests_by_graphql(
+            graphql_pull_request_parser.log_pull_requests_by_graphql(
                 binded_repos=binded_repos,
-                csv_name=args.out
+                csv_name=args.out,
+                output_format=args.format,
+                workers=args.workers,
+                sync_state=sync_state,
+                get_worker_client=clients.get_worker_client if clients and args.workers > 1 else None,
             )
         else:
             pull_requests_parser.log_pull_requests(
@@ -166,24 +250,51 @@ def run(args, binded_repos, repos_for_wiki=None):
                 finish,
                 args.forks_include,
                 args.pr_comments,
+                args.format,
+                args.workers,
+                sync_state,
             )
     if args.issues:
-        issues_parser.log_issues(
-            binded_repos, args.out, start, finish, args.forks_include, args.base_url,
-        )
+        if args.graphql:
+            graphql_issues_parser.log_issues_by_graphql(
+                binded_repos,
+                args.out,
+                start,
+                finish,
+                args.forks_include,
+                args.format,
+                args.workers,
+                sync_state,
+            )
+        else:
+            issues_parser.log_issues(
+                binded_repos,
+                args.out,
+                start,
+                finish,
+                args.forks_include,
+                args.base_url,
+                args.format,
+                args.workers,
+                sync_state,
+            )
     if args.invites:
         invites_parser.log_invitations(
             binded_repos,
             args.out,
+            args.format,
+            args.workers,
         )
     if args.contributors:
-        contributors_parser.log_contributors(binded_repos, args.out, args.forks_include)
+        contributors_parser.log_contributors(
+            binded_repos, args.out, args.forks_include, args.format, args.workers
+        )
     if args.workflow_runs:
         workflow_runs_parser.log_workflow_runs(
-            binded_repos, args.out, args.forks_include
+            binded_repos, args.out, args.forks_include, args.format, args.workers, sync_state
         )
     if args.wikis:
-        wikipars.wikiparser(repos_for_wiki, args.download_repos, args.out)
+        wikipars.wikiparser(repos_for_wiki, args.download_repos, args.out, args.format)
     if args.export_google_sheets:
         export_sheets.write_data_to_table(
             csv_path=args.out,
@@ -192,11 +303,17 @@ def run(args, binded_repos, repos_for_wiki=None):
             sheet_name=args.sheet_name,
             start_cell=args.start_cell,
             clear_content=args.clear_sheet,
+            output_format=args.format,
         )
 
 
 def main():
     args = parse_args()
+    progress.set_level(args.verbosity)
+    transport.add_response_hook(progress.on_response)
+    if not args.no_cache:
+        transport.set_cache(HttpCache(args.http_cache))
+        user_cache.set_store(USER_CACHE_PATH)
 
     try:
         args.start_cell = validate_and_normalize_cell(args.start_cell)
@@ -213,13 +330,15 @@ def main():
 
     try:
         clients = git_logger.Clients(tokens, args.base_url)
-        binded_repos = git_logger.get_next_binded_repo(clients, repositories)
+        binded_repos = git_logger.get_next_binded_repo(
+            clients, repositories, bind_to_worker=args.workers > 1
+        )
     except Exception as e:
         print(f"Failed to initialize any clients: {e}")
         print(traceback.format_exc())
         return
 
-    run(args, binded_repos, repositories)
+    run(args, binded_repos, repositories, clients)
 
 
 if __name__ == '__main__':
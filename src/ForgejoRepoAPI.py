@@ -1,10 +1,21 @@
 import base64
 import sys
 import logging
+import re
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from types import SimpleNamespace
+from typing import Container, Iterator
 
 import isodate
 from pyforgejo import PyforgejoApi
 
+from src.async_http import AsyncHttpSession, async_engine
+from src.constants import FORGEJO_MAX_PAGE_SIZE, FORGEJO_PAGE_WORKERS
+from src.progress import progress
 from src.utils import (
     log_exceptions,
 )
@@ -13,6 +24,7 @@ from src.interface_wrapper import (
     Comment,
     Commit,
     Contributor,
+    ContributorStats,
     Invite,
     IRepositoryAPI,
     Issue,
@@ -24,9 +36,28 @@ from src.interface_wrapper import (
 )
 
 
+# #12 или !12 не внутри слова и не в пути ссылки (owner/repo#12 -- другой репозиторий)
+REFERENCE_PATTERN = re.compile(r'(?<![\w/])[#!](\d+)\b')
+
+
+def get_references(text: str | None) -> set[int]:
+    return {int(number) for number in REFERENCE_PATTERN.findall(text or '')}
+
+
+def get_index_from_url(url: str) -> int | None:
+    """Номер issue/PR из issue_url или pull_request_url комментария (.../issues/12)."""
+    tail = url.rstrip('/').rsplit('/', 1)[-1] if url else ''
+    return int(tail) if tail.isdigit() else None
+
+
 class ForgejoRepoAPI(IRepositoryAPI):
     def __init__(self, client):
         self.client = client
+        self._comments_lock = threading.Lock()
+        self._comments_index: dict[str, dict[int, list[Comment]]] = {}
+        self._references_index: dict[str, dict[int, list[str]]] = {}
+        self._review_comments: dict[tuple[str, int], list[Comment]] = {}
+        self._max_page_size = None
 
     def get_user_data(self, user) -> User:
         return User(
@@ -65,15 +96,34 @@ class ForgejoRepoAPI(IRepositoryAPI):
         )
         return permission.permission
 
-    @log_exceptions(default_return=[], message="Failed to get commits from Forgejo")
-    def get_commits(self, repo: Repository, files: bool = True) -> list[Commit]:
-        commits = self.get_all_data_from_pages(self.client.repository.repo_get_all_commits, repo.owner.login, repo.name)
-        return [
+    @log_exceptions(message="Failed to get commits from Forgejo")
+    def iter_commits(
+        self,
+        repo: Repository,
+        files: bool = True,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        sha: str | None = None,
+        known_shas: Container[str] = (),
+    ) -> Iterator[Commit]:
+        # список коммитов Forgejo уже содержит всё нужное, known_shas дозапросов не экономит
+        # since/until есть в API Forgejo, но не в сигнатуре pyforgejo -- передаются доп. параметрами запроса
+        query = {}
+        if since is not None:
+            query['since'] = since.isoformat()
+        if until is not None:
+            query['until'] = until.isoformat()
+        commits = self.iter_all_data_from_pages(
+            self.client.repository.repo_get_all_commits, repo.owner.login, repo.name,
+            sha=sha, files=files, request_options={'additional_query_parameters': query},
+        )
+        yield from (
             Commit(
                 _id=c.sha,
                 message=c.commit.message,
                 author=self.get_user_data(c.author) if c.author else None,
                 date=isodate.parse_datetime(c.commit.author.date),
+                committed_at=isodate.parse_datetime(c.commit.committer.date) if c.commit.committer else None,
                 files=(
                     [f.filename for f in getattr(c, "files", [])] if files else None
                 ),
@@ -81,7 +131,7 @@ class ForgejoRepoAPI(IRepositoryAPI):
                 deletions=None,  # TODO
             )
             for c in commits
-        ]
+        )
 
     @log_exceptions(default_return=[], message="Failed to get contributors from Forgejo")
     def get_contributors(self, repo: Repository) -> list[Contributor]:
@@ -93,10 +143,28 @@ class ForgejoRepoAPI(IRepositoryAPI):
         }
         return [Contributor(login, email) for login, email in contributors.items()]
 
-    @log_exceptions(default_return=[], message="Failed to get issues from Forgejo")
-    def get_issues(self, repo: Repository) -> list[Issue]:
-        issues = self.client.issue.list_issues(repo.owner.login, repo.name)
-        return [
+    @log_exceptions(default_return=[], message="Failed to get contributors stats from Forgejo")
+    def get_contributors_stats(self, repo: Repository) -> list[ContributorStats]:
+        # у Forgejo нет эндпоинта статистики контрибьюторов: коммиты листаются страницами
+        # максимального размера без stat/verification/files, которые сервер считает на каждый коммит
+        stats = {}
+        commits = self.iter_all_data_from_pages(
+            self.client.repository.repo_get_all_commits, repo.owner.login, repo.name,
+            stat=False, verification=False, files=False,
+        )
+        for c in commits:
+            if not c.author:
+                continue
+            if c.author.login not in stats:
+                stats[c.author.login] = ContributorStats(self.get_user_data(c.author), 0)
+            stats[c.author.login].total_commits += 1
+        return list(stats.values())
+
+    @log_exceptions(message="Failed to get issues from Forgejo")
+    def iter_issues(self, repo: Repository, since: datetime | None = None) -> Iterator[Issue]:
+        # since у Forgejo фильтрует по времени обновления, поэтому созданные раньше отсекаются здесь
+        issues = self.iter_all_data_from_pages(self.client.issue.list_issues, repo.owner.login, repo.name, since=since)
+        yield from (
             Issue(
                 _id=i.id,
                 number=i.number,
@@ -115,14 +183,33 @@ class ForgejoRepoAPI(IRepositoryAPI):
                 milestone=i.milestone.title if i.milestone else None,
             )
             for i in issues
-        ]
-
-    @log_exceptions(default_return=[], message="Failed to get pull requests from Forgejo")
-    def get_pull_requests(self, repo: Repository) -> list[PullRequest]:
-        pulls = self.get_all_data_from_pages(self.client.repository.repo_list_pull_requests,
-                                             repo.owner.login, repo.name)
-        return [
-            PullRequest(
+            if since is None or i.created_at >= since
+        )
+
+    @log_exceptions(message="Failed to get pull requests from Forgejo")
+    def iter_pull_requests(
+        self, repo: Repository, since: datetime | None = None, files: bool = True, comments: bool = False
+    ) -> Iterator[PullRequest]:
+        pulls = self.iter_all_data_from_pages(self.client.repository.repo_list_pull_requests,
+                                              repo.owner.login, repo.name)
+        # у списка PR в Forgejo нет фильтра по дате -- отметка применяется до дозапросов по каждому PR
+        if since is not None:
+            pulls = (p for p in pulls if p.created_at >= since)
+
+        def make_job(pull):
+            async def job(session):
+                return await self.fetch_pull_request_details(session, repo, pull, files, comments)
+
+            return job
+
+        # merged_by, файлы и комментарии ревью есть только в отдельных запросах на PR -- они идут конкурентно,
+        # а PR отдаются в порядке списка (от новых к старым)
+        jobs = ((p, make_job(p)) for p in pulls)
+        for p, details, error in async_engine.iter_ordered(jobs):
+            if error is not None:
+                raise error
+            merged_by, changed_files = details
+            yield PullRequest(
                 _id=p.number,
                 title=p.title,
                 author=self.get_user_data(p.user),
@@ -132,18 +219,68 @@ class ForgejoRepoAPI(IRepositoryAPI):
                 base_label=p.base.ref,
                 head_ref=p.head.ref,
                 base_ref=p.base.ref,
-                merged_by=self.get_user_data(self.get_pull_request(repo, p.number).merged_by) if p.merged else None,
-                # TODO: merged_by always empty in result of repo_list_pull_requests
-                # (but merged and merged_at are usable)
+                merged_by=merged_by,
                 merged=p.merged,
-                files=[],   # TODO нужен отдельный запрос на /repos/{owner}/{repo}/pulls/{index}/files,
-                # иначе есть только кол-во измененных файлов в changed_files
+                files=changed_files,
                 issue_url=None,  # TODO если возможно - пока не нашел
                 labels=[label.name for label in p.labels] if p.labels else [],
                 milestone=p.milestone.title if p.milestone else None,
             )
-            for p in pulls
-        ]
+
+    async def fetch_pull_request_details(
+        self, session: AsyncHttpSession, repo: Repository, pull, files: bool, comments: bool
+    ) -> tuple[User | None, list[str]]:
+        """
+        Дозапросы по одному PR, только нужные: карточка PR -- ради merged_by (в списке PR он всегда пуст),
+        /files -- ради путей файлов, /reviews и их комментарии -- для get_comments.
+        """
+        pull_url = f"{self.get_base_url()}/repos/{repo.owner.login}/{repo.name}/pulls/{pull.number}"
+
+        merged_by = None
+        if pull.merged:
+            details = await self.fetch_json(session, pull_url)
+            if details.get("merged_by"):
+                merged_by = self.get_user_data(SimpleNamespace(**details["merged_by"]))
+
+        changed_files = []
+        if files:
+            changed_files = [f["filename"] for f in await self.fetch_all_pages(session, f"{pull_url}/files")]
+
+        if comments:
+            review_comments = []
+            for review in await self.fetch_all_pages(session, f"{pull_url}/reviews"):
+                if not review.get("comments_count"):
+                    continue
+                review_comments += [
+                    Comment(
+                        body=c["body"],
+                        created_at=isodate.parse_datetime(c["created_at"]),
+                        author=self.get_user_data(SimpleNamespace(**c["user"])),
+                    )
+                    for c in await self.fetch_json(session, f"{pull_url}/reviews/{review['id']}/comments")
+                ]
+            with self._comments_lock:
+                self._review_comments[(repo._id, pull.number)] = review_comments
+
+        return merged_by, changed_files
+
+    async def fetch_json(self, session: AsyncHttpSession, url: str, **params):
+        # заголовки pyforgejo несут токен; лимитов у Forgejo нет, бюджет в src.pacing ведётся по хосту
+        response = await session.request(
+            'GET', url, self.get_base_url(), headers=self.client._client_wrapper.get_headers(), params=params
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def fetch_all_pages(self, session: AsyncHttpSession, url: str) -> list:
+        result = []
+        page = 1
+        while True:
+            data = await self.fetch_json(session, url, page=page, limit=self.get_max_page_size())
+            result += data or []
+            if not data or len(data) < self.get_max_page_size():
+                return result
+            page += 1
 
     @log_exceptions(default_return={}, message="Failed to get pull request data from Forgejo")
     def get_pull_request(self, repo: Repository, pr_index: int) -> PullRequest:
@@ -184,6 +321,13 @@ class ForgejoRepoAPI(IRepositoryAPI):
 
         return result
 
+    @log_exceptions(default_return=[], message="Failed to get branch names from Forgejo")
+    def get_branch_names(self, repo: Repository) -> list[str]:
+        branches = self.iter_all_data_from_pages(
+            self.client.repository.repo_list_branches, repo.owner.login, repo.name
+        )
+        return [branch.name for branch in branches]
+
     @log_exceptions(default_return=[], message="Failed to get wiki pages from Forgejo")
     def get_wiki_pages(self, repo: Repository) -> list[WikiPage]:
         pages = self.client.repository.repo_get_wiki_pages(
@@ -204,59 +348,96 @@ class ForgejoRepoAPI(IRepositoryAPI):
 
         return result
 
-    @log_exceptions(default_return=[], message="Failed to get forks from Forgejo")
-    def get_forks(self, repo: Repository) -> list[Repository]:
-        forks = self.client.repository.list_forks(repo.owner.login, repo.name)
-        result = []
+    @log_exceptions(message="Failed to get forks from Forgejo")
+    def iter_forks(self, repo: Repository) -> Iterator[Repository]:
+        forks = self.iter_all_data_from_pages(self.client.repository.list_forks, repo.owner.login, repo.name)
 
         for fork in forks:
             default_branch = Branch(name=fork.default_branch, last_commit=None)
             owner = fork.owner
 
-            result.append(
-                Repository(
-                    _id=fork.full_name,
-                    name=fork.name,
-                    url=fork.html_url,
-                    default_branch=default_branch,
-                    owner=owner,
-                )
+            yield Repository(
+                _id=fork.full_name,
+                name=fork.name,
+                url=fork.html_url,
+                default_branch=default_branch,
+                owner=owner,
             )
-        return result
 
     @log_exceptions(default_return=[], message="Failed to get comments for Forgejo")
     def get_comments(self, repo, obj) -> list[Comment]:
         result = []
         if isinstance(obj, Issue):
-            comments = self.client.issue.get_repo_comments(
-                repo.owner.login, repo.name
-            )
-            result = [
-                Comment(
-                    body=c.body,
-                    created_at=c.created_at,
-                    author=self.get_user_data(c.user),
-                )
-                for c in comments
-            ]
+            result = self.get_comments_index(repo).get(obj.number, [])
 
         elif isinstance(obj, PullRequest):
-            comments = self.client.repository.repo_get_pull_review_comments(
-                repo.owner.login, repo.name, obj._id, 100000
-            )
-            # нет id комментария - сейчас не работает, т.к. требуется ID ревью - нужно сначала получить \
-            # список ревью /repos/{owner}/{repo}/pulls/{index}/reviews
-            # TODO: нужны отдельные запросы для получения комментариев и комментариев ревью #163, \
-            # в основной сущности PullRequest есть поля "comments": int, "review_comments": int
-            result = [
+            # обсуждение PR -- в общем потоке комментариев, комментарии ревью собраны при
+            # iter_pull_requests(comments=True)
+            with self._comments_lock:
+                review_comments = self._review_comments.pop((repo._id, obj._id), [])
+            result = self.get_comments_index(repo).get(obj._id, []) + review_comments
+        return result
+
+    def get_comments_index(self, repo: Repository) -> dict[int, list[Comment]]:
+        """
+        Комментарии репозитория по номерам issues/PR. У Forgejo есть только общий поток комментариев
+        репозитория: он листается один раз, дальше комментарии к каждому issue берутся из индекса.
+        """
+        with self._comments_lock:
+            index = self._comments_index.get(repo._id)
+        if index is not None:
+            return index
+
+        index = defaultdict(list)
+        comments = self.iter_all_data_from_pages(
+            self.client.issue.get_repo_comments, repo.owner.login, repo.name
+        )
+        for c in comments:
+            number = get_index_from_url(c.issue_url or c.pull_request_url)
+            if number is None:
+                continue
+            index[number].append(
                 Comment(
                     body=c.body,
                     created_at=c.created_at,
                     author=self.get_user_data(c.user),
                 )
-                for c in comments
-            ]
-        return result
+            )
+        index = dict(index)
+        with self._comments_lock:
+            self._comments_index[repo._id] = index
+        return index
+
+    @log_exceptions(default_return={}, message="Failed to index pull request references for Forgejo")
+    def get_pull_request_references(self, repo: Repository) -> dict[int, list[str]]:
+        """
+        PR, связанные с issue: PR упоминает issue в описании или в комментариях issue есть ссылка на PR.
+        Строится один раз на репозиторий из всех PR и общего потока комментариев.
+        """
+        with self._comments_lock:
+            index = self._references_index.get(repo._id)
+        if index is not None:
+            return index
+
+        pulls = {
+            pull.number: pull
+            for pull in self.iter_all_data_from_pages(
+                self.client.repository.repo_list_pull_requests, repo.owner.login, repo.name, state='all'
+            )
+        }
+        references = defaultdict(set)
+        for pull in pulls.values():
+            for number in get_references(pull.body):
+                references[number].add(pull.html_url)
+        for number, comments in self.get_comments_index(repo).items():
+            for comment in comments:
+                for pull_number in get_references(comment.body) & pulls.keys():
+                    references[number].add(pulls[pull_number].html_url)
+
+        index = {number: sorted(urls) for number, urls in references.items()}
+        with self._comments_lock:
+            self._references_index[repo._id] = index
+        return index
 
     @log_exceptions(default_return=[], message="Failed to simulate invites for Forgejo")
     def get_invites(self, repo: Repository, users: list[User] = None) -> list[Invite]:
@@ -282,20 +463,79 @@ class ForgejoRepoAPI(IRepositoryAPI):
 
     @log_exceptions(default_return=[], message="Failed to get_all_data_from_pages")
     def get_all_data_from_pages(self, method, *method_args, **kw_method_args):
-        all_data = []
-        page_index = 1
-        data = method(*method_args, page=page_index, **kw_method_args)
-        while data:
-            page_index += 1
-            all_data += data
+        return list(self.iter_all_data_from_pages(method, *method_args, **kw_method_args))
+
+    def get_max_page_size(self) -> int:
+        """
+        Наибольший limit, который отдаёт инстанс (MAX_RESPONSE_ITEMS), запрашивается один раз.
+        Если настройки недоступны (старый инстанс, нет прав), запоминается FORGEJO_MAX_PAGE_SIZE.
+        """
+        if self._max_page_size is None:
+            try:
+                page_size = self.client.settings.get_general_api_settings().max_response_items
+            except Exception as e:
+                logging.warning(f"Failed to get API settings from Forgejo, using limit={FORGEJO_MAX_PAGE_SIZE}: {e}")
+                page_size = None
+            self._max_page_size = page_size or FORGEJO_MAX_PAGE_SIZE
+        return self._max_page_size
+
+    @log_exceptions(message="Failed to iter_all_data_from_pages")
+    def iter_all_data_from_pages(self, method, *method_args, **kw_method_args):
+        """
+        Элементы всех страниц method по порядку. Страницы берутся максимального размера; если первая
+        страница сообщила X-Total-Count, остальные запрашиваются параллельно (не больше FORGEJO_PAGE_WORKERS
+        одновременно и с таким же запасом вперёд), иначе -- по одной по мере чтения.
+        """
+        kw_method_args.setdefault('limit', self.get_max_page_size())
+        limit = kw_method_args['limit']
+        raw_client = getattr(getattr(method, '__self__', None), 'with_raw_response', None)
+        raw_method = getattr(raw_client, method.__name__, None)
+
+        if raw_method is not None:
+            response = raw_method(*method_args, page=1, **kw_method_args)
+            data, total = response.data, response.headers.get('x-total-count')
+        else:
+            data, total = method(*method_args, page=1, **kw_method_args), None
+        yield from data or []
+        if not data or len(data) < limit:
+            return
+
+        page_index = 2
+        if total is not None and total.isdigit():
+            last_page = -(-int(total) // limit)
+            pages = iter(range(2, last_page + 1))
+            # запросы страниц в пуле засчитываются репозиторию вызывающего потока
+            get_page = progress.bind(method)
+            with ThreadPoolExecutor(max_workers=FORGEJO_PAGE_WORKERS, thread_name_prefix='forgejo-pages') as executor:
+                pending = deque(
+                    executor.submit(get_page, *method_args, page=page, **kw_method_args)
+                    for page in islice(pages, 2 * FORGEJO_PAGE_WORKERS)
+                )
+                while pending:
+                    data = pending.popleft().result()
+                    for page in islice(pages, 1):
+                        pending.append(executor.submit(get_page, *method_args, page=page, **kw_method_args))
+                    yield from data or []
+            if not data or len(data) < limit:
+                return
+            # за время выгрузки могли добавиться элементы -- дальше страницы читаются по одной
+            page_index = last_page + 1
+
+        while True:
             data = method(*method_args, page=page_index, **kw_method_args)
-        return all_data
+            yield from data or []
+            if not data or len(data) < limit:
+                return
+            page_index += 1
 
     def get_rate_limiting(self) -> tuple[int, int]:
         return sys.maxsize, sys.maxsize
 
-    def get_workflow_runs(self, repo) -> list[WorkflowRun]:
-        return []
+    def get_rate_limiting_reset(self) -> int:
+        return 0
+
+    def iter_workflow_runs(self, repo, since: datetime | None = None) -> Iterator[WorkflowRun]:
+        return iter(())
 
     def get_base_url(self) -> str:
         return self.client._client_wrapper.get_base_url()
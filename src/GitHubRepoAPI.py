@@ -1,5 +1,12 @@
+from datetime import datetime, timezone
+from itertools import takewhile
+from typing import Container, Iterator
+
 from github import Github
+from github.GithubObject import NotSet
 
+from src.progress import progress
+from src.user_cache import user_cache
 from src.utils import (
     log_exceptions,
 )
@@ -8,6 +15,7 @@ from src.interface_wrapper import (
     Comment,
     Commit,
     Contributor,
+    ContributorStats,
     Invite,
     IRepositoryAPI,
     Issue,
@@ -19,6 +27,23 @@ from src.interface_wrapper import (
 )
 
 
+def get_legacy_permission(permissions) -> str:
+    if permissions.admin:
+        return 'admin'
+    if permissions.push or permissions.maintain:
+        return 'write'
+    if permissions.pull or permissions.triage:
+        return 'read'
+    return 'none'
+
+
+def to_utc(moment: datetime | None):
+    """PyGithub форматирует since/until как '%Y-%m-%dT%H:%M:%SZ', не учитывая часовой пояс."""
+    if moment is None:
+        return NotSet
+    return moment.astimezone(timezone.utc)
+
+
 class GitHubRepoAPI(IRepositoryAPI):
     def __init__(self, client: Github):
         self.client = self._client_validation(client)
@@ -34,29 +59,49 @@ class GitHubRepoAPI(IRepositoryAPI):
         return client
 
     def get_user_data(self, user) -> User:
-        return User(
-            login=user.login,
-            username=user.name,
-            email=user.email,  # always None
-            html_url=user.html_url,
-            node_id=user.node_id,
-            type=user.type,
-            bio=user.bio,
-            site_admin=user.site_admin,
-            _id=user.id,
+        # у NamedUser из списков name/email/bio подгружаются отдельным запросом -- профиль берётся из кэша
+        return user_cache.get_or_load(
+            f'{self.get_base_url()}#{user.id}',
+            lambda: User(
+                login=user.login,
+                username=user.name,
+                email=user.email,  # always None
+                html_url=user.html_url,
+                node_id=user.node_id,
+                type=user.type,
+                bio=user.bio,
+                site_admin=user.site_admin,
+                _id=user.id,
+            ),
         )
 
     def get_commit_data(self, commit, files=False) -> Commit:
         return Commit(
             _id=commit.sha,
             message=commit.commit.message,
-            author=self.get_user_data(commit.author),
+            # author -- None, если почта коммита не привязана к аккаунту GitHub
+            author=self.get_user_data(commit.author) if commit.author else None,
             date=commit.commit.author.date,
+            committed_at=commit.commit.committer.date,
             files=[f.filename for f in commit.files] if files else None,
             additions=commit.stats.additions,
             deletions=commit.stats.deletions,
         )
 
+    @staticmethod
+    def get_known_commit_data(commit) -> Commit:
+        # только поля из страницы списка: files, stats и автор требуют запроса на каждый коммит
+        return Commit(
+            _id=commit.sha,
+            message=commit.commit.message,
+            author=None,
+            date=commit.commit.author.date,
+            committed_at=commit.commit.committer.date,
+            files=None,
+            additions=None,
+            deletions=None,
+        )
+
     @log_exceptions(default_return=None, message="Failed to get repository from GitHub")
     def get_repository(self, id: str) -> Repository | None:
         repo = self.client.get_repo(id)
@@ -69,22 +114,53 @@ class GitHubRepoAPI(IRepositoryAPI):
         )
 
     def get_collaborator_permission(self, repo: Repository, user: User) -> str:
-        return self.client.get_repo(repo._id).get_collaborator_permission(user.login)
-
-    @log_exceptions(default_return=[], message="Failed to get commits from GitHub")
-    def get_commits(self, repo: Repository, files: bool = True) -> list[Commit]:
-        commits = self.client.get_repo(repo._id).get_commits()
-        return [self.get_commit_data(c, files) for c in commits]
+        # lazy: объект репозитория нужен только для URL, отдельный запрос get_repo не делается
+        return self.client.get_repo(repo._id, lazy=True).get_collaborator_permission(user.login)
+
+    # без push-доступа список коллабораторов недоступен (403) -- тогда права запрашиваются поштучно
+    @log_exceptions(default_return={}, message="Failed to get collaborators from GitHub", print_stacktrace=False)
+    def get_collaborator_permissions(self, repo: Repository) -> dict[str, str]:
+        # список коллабораторов несёт permissions; они сводятся к admin/write/read, как у get_collaborator_permission
+        collaborators = self.client.get_repo(repo._id, lazy=True).get_collaborators()
+        return {c.login: get_legacy_permission(c.permissions) for c in collaborators}
+
+    @log_exceptions(message="Failed to get commits from GitHub")
+    def iter_commits(
+        self,
+        repo: Repository,
+        files: bool = True,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        sha: str | None = None,
+        known_shas: Container[str] = (),
+    ) -> Iterator[Commit]:
+        commits = self.client.get_repo(repo._id).get_commits(
+            sha=sha or NotSet, since=to_utc(since), until=to_utc(until)
+        )
+        yield from (
+            self.get_known_commit_data(c) if c.sha in known_shas else self.get_commit_data(c, files)
+            for c in commits
+        )
 
     @log_exceptions(default_return=[], message="Failed to get contributors from GitHub")
     def get_contributors(self, repo: Repository) -> list[Contributor]:
         contributors = self.client.get_repo(repo._id).get_contributors()
         return [Contributor(c.login, c.email or "") for c in contributors]
 
-    @log_exceptions(default_return=[], message="Failed to get issues from GitHub")
-    def get_issues(self, repo: Repository) -> list[Issue]:
-        issues = self.client.get_repo(repo._id).get_issues(state='all')
-        return [
+    @log_exceptions(default_return=[], message="Failed to get contributors stats from GitHub")
+    def get_contributors_stats(self, repo: Repository) -> list[ContributorStats]:
+        # contributions считает сам GitHub: страница на 100 контрибьюторов вместо обхода всех коммитов
+        contributors = self.client.get_repo(repo._id).get_contributors()
+        return [ContributorStats(self.get_user_data(c), c.contributions) for c in contributors]
+
+    @log_exceptions(message="Failed to get issues from GitHub")
+    def iter_issues(self, repo: Repository, since: datetime | None = None) -> Iterator[Issue]:
+        # since у GitHub фильтрует по updated_at, поэтому созданные раньше отсекаются здесь
+        issues = self.client.get_repo(repo._id).get_issues(state='all', since=to_utc(since))
+        if since is None:
+            # totalCount -- один запрос с per_page=1; при since часть issues отсекается, и ETA был бы неверен
+            progress.set_total(issues.totalCount)
+        yield from (
             Issue(
                 _id=i.number,
                 number=i.number,
@@ -99,12 +175,20 @@ class GitHubRepoAPI(IRepositoryAPI):
                 milestone=i.milestone.title if i.milestone else None,
             )
             for i in issues
-        ]
+            if since is None or i.created_at >= since
+        )
 
-    @log_exceptions(default_return=[], message="Failed to get pull requests from GitHub")
-    def get_pull_requests(self, repo: Repository) -> list[PullRequest]:
-        pulls = self.client.get_repo(repo._id).get_pulls(state='all')
-        return [
+    @log_exceptions(message="Failed to get pull requests from GitHub")
+    def iter_pull_requests(
+        self, repo: Repository, since: datetime | None = None, files: bool = True, comments: bool = False
+    ) -> Iterator[PullRequest]:
+        pulls = self.client.get_repo(repo._id).get_pulls(state='all', sort='created', direction='desc')
+        if since is None:
+            progress.set_total(pulls.totalCount)
+        else:
+            # у pulls нет since: страницы идут от новых к старым и дальше отметки не запрашиваются
+            pulls = takewhile(lambda p: p.created_at >= since, pulls)
+        yield from (
             PullRequest(
                 _id=p.number,
                 title=p.title,
@@ -117,13 +201,13 @@ class GitHubRepoAPI(IRepositoryAPI):
                 base_ref=p.base.ref,
                 merged_by=self.get_user_data(p.merged_by) if p.merged_by else None,
                 merged=bool(p.merged_by),
-                files=[file.filename for file in p.get_files()],
+                files=[file.filename for file in p.get_files()] if files else [],
                 issue_url=p.issue_url,
                 labels=[label.name for label in p.labels],
                 milestone=p.milestone.title if p.milestone else None,
             )
             for p in pulls
-        ]
+        )
 
     @log_exceptions(default_return=[], message="Failed to get branches from GitHub")
     def get_branches(self, repo: Repository) -> list[Branch]:
@@ -138,30 +222,29 @@ class GitHubRepoAPI(IRepositoryAPI):
 
         return result
 
+    @log_exceptions(default_return=[], message="Failed to get branch names from GitHub")
+    def get_branch_names(self, repo: Repository) -> list[str]:
+        return [branch.name for branch in self.client.get_repo(repo._id, lazy=True).get_branches()]
+
     def get_wiki_pages(self, repo: Repository) -> list[WikiPage]:
         raise Exception('not implemented')
 
-    @log_exceptions(default_return=[], message="Failed to get forks from GitHub")
-    def get_forks(self, repo: Repository) -> list[Repository]:
+    @log_exceptions(message="Failed to get forks from GitHub")
+    def iter_forks(self, repo: Repository) -> Iterator[Repository]:
         repo_client = self.client.get_repo(repo._id)
-        result = []
 
         for r in repo_client.get_forks():
             default_branch = Branch(name=r.default_branch, last_commit=None)
             owner = self.get_user_data(r.owner)
 
-            result.append(
-                Repository(
-                    _id=r.full_name,
-                    name=r.name,
-                    url=r.html_url,
-                    default_branch=default_branch,
-                    owner=owner,
-                )
+            yield Repository(
+                _id=r.full_name,
+                name=r.name,
+                url=r.html_url,
+                default_branch=default_branch,
+                owner=owner,
             )
 
-        return result
-
     @log_exceptions(default_return=[], message="Failed to get comments")
     def get_comments(self, repo, obj) -> list[Comment]:
         repo_client = self.client.get_repo(repo._id)
@@ -200,10 +283,16 @@ class GitHubRepoAPI(IRepositoryAPI):
     def get_rate_limiting(self) -> tuple[int, int]:
         return self.client.rate_limiting
 
-    @log_exceptions(default_return=[], message="Failed to get workflow runs from GitHub")
-    def get_workflow_runs(self, repo) -> list[WorkflowRun]:
-        runs = self.client.get_repo(repo._id).get_workflow_runs()
-        return [
+    def get_rate_limiting_reset(self) -> int:
+        return self.client.rate_limiting_resettime
+
+    @log_exceptions(message="Failed to get workflow runs from GitHub")
+    def iter_workflow_runs(self, repo, since: datetime | None = None) -> Iterator[WorkflowRun]:
+        # >=: запуски в ту же секунду, что и отметка, отсеивает по id сама отметка
+        created = f'>={to_utc(since).isoformat()}' if since is not None else NotSet
+        runs = self.client.get_repo(repo._id).get_workflow_runs(created=created)
+        progress.set_total(runs.totalCount)
+        yield from (
             WorkflowRun(
                 display_title=r.display_title,
                 event=r.event,
@@ -219,7 +308,7 @@ class GitHubRepoAPI(IRepositoryAPI):
                 url=r.url,
             )
             for r in runs
-        ]
+        )
 
     def get_base_url(self) -> str:
         return 'https://api.github.com'
@@ -0,0 +1,149 @@
+import asyncio
+import atexit
+import logging
+import queue
+import threading
+from typing import Any, Awaitable, Callable, Iterable, Iterator
+
+import httpx
+
+from src.constants import ASYNC_HTTP_CONCURRENCY, RATE_LIMIT_MAX_RETRIES
+from src.http_transport import transport
+from src.pacing import is_rate_limited, pacer
+
+
+class AsyncHttpSession:
+    """Сессия одного вызова iter_completed: общий httpx-клиент и семафор на число запросов в полёте."""
+
+    def __init__(self, client: httpx.AsyncClient, concurrency: int):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(self, method: str, url: str, key, **kwargs) -> httpx.Response:
+        """Запрос с учётом бюджета key (см. src.pacing) и повтором после исчерпания лимита."""
+        async with self.semaphore:
+            for _ in range(RATE_LIMIT_MAX_RETRIES):
+                delay = pacer.get_delay(key)
+                if delay > 0:
+                    logging.info(f"Rate limit: waiting {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                pacer.mark_request(key)
+
+                response = await self.client.request(method, url, **kwargs)
+                pacer.update_from_response(key, response)
+                if not is_rate_limited(response):
+                    return response
+                logging.warning(f"Rate limit exceeded for {url}, retrying")
+            return response
+
+
+AsyncJob = Callable[[AsyncHttpSession], Awaitable[Any]]
+
+
+class AsyncHttpEngine:
+    """
+    Выполняет async-задачи обогащения (запросы по issue/PR) конкурентно,
+    не более concurrency запросов одновременно на вызов iter_completed. Цикл событий
+    работает в отдельном потоке, а результаты отдаются синхронному коду по мере готовности.
+    Задачи берутся из jobs по мере освобождения мест, поэтому jobs может быть
+    потоком элементов, которые ещё догружаются постранично.
+    Цикл и httpx-клиент создаются при первом вызове и живут до close(), поэтому
+    соединения и TLS-сессии переиспользуются между репозиториями.
+    """
+
+    def __init__(self, concurrency: int = ASYNC_HTTP_CONCURRENCY):
+        self.concurrency = concurrency
+        # запас задач сверх concurrency, чтобы семафор не простаивал, пока вызывающий разбирает результат
+        self.max_pending = concurrency * 2
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    def _start(self) -> tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='async-http', daemon=True)
+                thread.start()
+                # клиент привязан к циклу событий, поэтому создаётся внутри него
+                self._client = asyncio.run_coroutine_threadsafe(self._open_client(), loop).result()
+                self._loop, self._thread = loop, thread
+                atexit.register(self.close)
+            return self._loop, self._client
+
+    def close(self):
+        """Закрывает клиент и останавливает цикл; следующий iter_completed запустит их заново."""
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = None
+        if loop is None:
+            return
+        atexit.unregister(self.close)
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    def iter_completed(self, jobs: Iterable[tuple[Any, AsyncJob]]) -> Iterator[tuple[Any, Any, Exception | None]]:
+        """
+        jobs -- пары (tag, job), где job(session) -- корутина.
+        Отдаёт (tag, result, error) в порядке завершения задач.
+        jobs читается в потоке вызывающего, не более max_pending задач в работе.
+        """
+        loop, client = self._start()
+        # семафор -- на вызов: параллельные воркеры делят клиент, но не лимит запросов друг друга
+        session = AsyncHttpSession(client, self.concurrency)
+        results = queue.Queue()
+        pending = {}
+        try:
+            for job_id, (tag, job) in enumerate(jobs):
+                while len(pending) >= self.max_pending:
+                    yield self._take_result(results, pending)
+                pending[job_id] = asyncio.run_coroutine_threadsafe(
+                    self._run_job(session, job_id, tag, job, results), loop
+                )
+            while pending:
+                yield self._take_result(results, pending)
+        finally:
+            # при досрочном выходе незавершённые задачи этого вызова отменяются
+            for future in pending.values():
+                future.cancel()
+
+    def iter_ordered(self, jobs: Iterable[tuple[Any, AsyncJob]]) -> Iterator[tuple[Any, Any, Exception | None]]:
+        """Как iter_completed, но (tag, result, error) отдаются в порядке jobs: готовые раньше очереди ждут."""
+        done = {}
+        next_index = 0
+        numbered_jobs = (((index, tag), job) for index, (tag, job) in enumerate(jobs))
+        for (index, tag), result, error in self.iter_completed(numbered_jobs):
+            done[index] = (tag, result, error)
+            while next_index in done:
+                yield done.pop(next_index)
+                next_index += 1
+
+    @staticmethod
+    def _take_result(results: queue.Queue, pending: dict):
+        job_id, item = results.get()
+        del pending[job_id]
+        return item
+
+    @staticmethod
+    async def _open_client() -> httpx.AsyncClient:
+        return transport.async_client()
+
+    @staticmethod
+    async def _run_job(session: AsyncHttpSession, job_id: int, tag, job: AsyncJob, results: queue.Queue):
+        try:
+            results.put((job_id, (tag, await job(session), None)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            results.put((job_id, (tag, None, e)))
+
+
+# общий движок: один цикл событий и один пул соединений на весь запуск
+async_engine = AsyncHttpEngine()
+
+
+def run_async_jobs(jobs: Iterable[tuple[Any, AsyncJob]]) -> Iterator[tuple[Any, Any, Exception | None]]:
+    return async_engine.iter_completed(jobs)
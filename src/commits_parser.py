@@ -1,13 +1,17 @@
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime
-from time import sleep
 from typing import Generator
 
 import pytz
 
-from src.constants import EMPTY_FIELD, GOOGLE_MAX_CELL_LEN, TIMEDELTA, TIMEZONE
+from src.constants import EMPTY_FIELD, GOOGLE_MAX_CELL_LEN, TIMEZONE
 from src.interface_wrapper import IRepositoryAPI, Repository
+from src.pacing import pacer
+from src.progress import progress
+from src.sinks import CSV_FORMAT, BufferedSink, open_sink
+from src.sync_state import SyncState
 from src.utils import logger
+from src.workers import process_repositories
 
 
 @dataclass(kw_only=True, frozen=True)
@@ -25,48 +29,74 @@ class CommitData:
 
 
 def log_repository_commits(
-    client: IRepositoryAPI, repository: Repository, csv_name, start, finish, branch
+    client: IRepositoryAPI, repository: Repository, sink: BufferedSink, start, finish, branch,
+    sync_state: SyncState | None = None,
 ):
-    branches = []
+    timezone = pytz.timezone(TIMEZONE)
     match branch:
         case 'all':
-            for branch in client.get_branches(repository):
-                branches.append(branch.name)
+            branches = client.get_branch_names(repository)
         case None:
-            branches.append(repository.default_branch.name)
+            branches = [repository.default_branch.name]
         case _:
-            branches.append(branch)
+            branches = [branch]
 
+    # окно дат уходит на сервер; будущий finish (по умолчанию 2400 год) не передаётся
+    until = finish if finish < datetime.now(timezone) else None
+    # коммит, достижимый из нескольких веток, дозапрашивается один раз; для остальных веток
+    # пишется та же строка с другой веткой
+    seen_commits: dict[str, CommitData] = {}
     for branch in branches:
-        print(f'Processing branch {branch}')
-        commits = client.get_commits(repository)
+        logger.log_to_stdout(f'Processing branch {branch}')
+        state_key = f'{repository._id}@{branch}'
+        mark = sync_state.get_mark('commits', state_key) if sync_state else None
+        since = max(start, mark.since) if mark and mark.since else start
+
+        pacer.pace_client(client)
+        commits = client.iter_commits(repository, since=since, until=until, sha=branch, known_shas=seen_commits)
         for commit in commits:
-            if (
-                commit.date.astimezone(pytz.timezone(TIMEZONE)) < start
-                or commit.date.astimezone(pytz.timezone(TIMEZONE)) > finish
-            ):
+            # stats, files и автор коммита дозапрашиваются по одному запросу на коммит -- темп на каждый
+            pacer.pace_client(client)
+            progress.advance()
+            # данные коммита запоминаются до проверок окна и отметки: на других ветках он
+            # уже не дозапрашивается, даже если здесь пропущен
+            if commit._id in seen_commits:
+                commit_data = replace(seen_commits[commit._id], branch=branch)
+            else:
+                changed_files = '; '.join([file for file in commit.files])
+                changed_files = changed_files[:GOOGLE_MAX_CELL_LEN]
+                commit_data = CommitData(
+                    repository_name=repository.name,
+                    author_name=commit.author.username if commit.author else EMPTY_FIELD,
+                    author_login=commit.author.login if commit.author else EMPTY_FIELD,
+                    author_email=commit.author.email if commit.author else EMPTY_FIELD,
+                    date_and_time=commit.date.astimezone(timezone).isoformat(),
+                    changed_files=changed_files,
+                    commit_id=commit._id,
+                    branch=branch,
+                    additions=commit.additions,
+                    deletions=commit.deletions,
+                )
+                seen_commits[commit._id] = commit_data
+
+            # сервер фильтрует по дате коммиттера, а в выгрузке дата автора -- окно проверяется и здесь
+            commit_date = commit.date.astimezone(timezone)
+            if commit_date < start or commit_date > finish:
                 continue
+            if mark:
+                # отметка -- по дате коммиттера, как since на сервере: перенесённые rebase/cherry-pick
+                # коммиты со старой датой автора не отбрасываются
+                committed_at = commit.committed_at or commit.date
+                if not mark.is_new(committed_at, commit._id):
+                    continue
+                mark.add(committed_at, commit._id)
 
-            changed_files = '; '.join([file for file in commit.files])
-            changed_files = changed_files[:GOOGLE_MAX_CELL_LEN]
-            commit_data = CommitData(
-                repository_name=repository.name,
-                author_name=commit.author.username if commit.author else EMPTY_FIELD,
-                author_login=commit.author.login if commit.author else EMPTY_FIELD,
-                author_email=commit.author.email if commit.author else EMPTY_FIELD,
-                date_and_time=commit.date.astimezone(pytz.timezone(TIMEZONE)).isoformat(),
-                changed_files=changed_files,
-                commit_id=commit._id,
-                branch=branch,
-                additions=commit.additions,
-                deletions=commit.deletions,
-            )
             info = asdict(commit_data)
+            sink.write(info)
+            progress.add_item(info)
 
-            logger.log_to_csv(csv_name, list(info.keys()), info)
-            logger.log_to_stdout(info)
-
-            sleep(TIMEDELTA)
+        if sync_state:
+            sync_state.set_mark('commits', state_key, mark)
 
 
 def log_commits(
@@ -76,18 +106,25 @@ def log_commits(
     finish: datetime,
     branch: str,
     fork_flag: bool,
+    output_format: str = CSV_FORMAT,
+    workers: int = 1,
+    sync_state: SyncState | None = None,
 ):
-    info = asdict(CommitData())
-    logger.log_to_csv(csv_name, list(info.keys()))
-
-    for client, repo, token in binded_repos:
-        logger.log_title(repo.name)
-        log_repository_commits(client, repo, csv_name, start, finish, branch)
+    def log_repository(client, repo, token, sink):
+        progress.start_repository(repo.name)
+        log_repository_commits(client, repo, sink, start, finish, branch, sync_state)
         if fork_flag:
-            for forked_repo in client.get_forks(repo):
-                logger.log_title(f"FORKED: {forked_repo.name}")
+            for forked_repo in client.iter_forks(repo):
+                progress.start_repository(f"FORKED: {forked_repo.name}")
                 log_repository_commits(
-                    client, forked_repo, csv_name, start, finish, branch
+                    client, forked_repo, sink, start, finish, branch, sync_state
                 )
-                sleep(TIMEDELTA)
-        sleep(TIMEDELTA)
+
+    try:
+        with open_sink(csv_name, CommitData, output_format, append=sync_state is not None) as sink:
+            process_repositories(binded_repos, sink, log_repository, workers, sync_state)
+    finally:
+        # отметки ставятся только за полностью выгруженные репозитории, их строки уже в файле
+        if sync_state:
+            sync_state.save()
+    progress.finish()
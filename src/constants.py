@@ -1,3 +1,5 @@
+import os
+
 EMPTY_FIELD = 'Empty field'
 TIMEDELTA = 0.05
 TIMEZONE = 'Europe/Moscow'
@@ -16,3 +18,42 @@ WIKI_FIELDNAMES = [
     'added lines',
     'deleted lines',
 ]
+# одновременных git clone/fetch вики-зеркал
+WIKI_SYNC_WORKERS = 8
+CSV_BUFFER_SIZE = 1000
+ARROW_BATCH_SIZE = 10000
+ARROW_DICTIONARY_COLUMNS = (
+    'repository name',
+    'branch',
+    'state',
+    'event',
+    'status',
+    'conclusion',
+    'permissions',
+    'type',
+    'action',
+)
+PROGRESS_REFRESH_INTERVAL = 2.0
+RATE_LIMIT_RESERVE = 10
+RATE_LIMIT_SPREAD_THRESHOLD = 0.2
+RATE_LIMIT_MAX_RETRIES = 5
+ASYNC_HTTP_CONCURRENCY = 16
+HTTP_TIMEOUT = 30
+HTTP_POOL_SIZE = 32
+HTTP_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'github_repo_commitment_calc', 'http.sqlite')
+HTTP_CACHE_MAX_SIZE = 512 * 1024 * 1024
+HTTP_CACHE_TTL = 7 * 24 * 60 * 60
+USER_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'github_repo_commitment_calc', 'users.sqlite')
+USER_CACHE_TTL = 7 * 24 * 60 * 60
+USER_CACHE_MAX_ENTRIES = 10_000
+# MAX_RESPONSE_ITEMS по умолчанию у Forgejo: больший limit сервер урезает; настоящий предел читается из /settings/api
+FORGEJO_MAX_PAGE_SIZE = 50
+FORGEJO_PAGE_WORKERS = 8
+GRAPHQL_URL = 'https://api.github.com/graphql'
+GRAPHQL_MAX_RETRIES = 5
+GRAPHQL_PAGE_SIZE = 100
+# issues на страницу и вложенных комментариев/событий на issue: 50 * (50 + 50) узлов укладываются в лимит запроса
+GRAPHQL_ISSUES_PAGE_SIZE = 50
+GRAPHQL_NESTED_PAGE_SIZE = 50
+# узлов на запрос при склейке репозиториев алиасами (предел GitHub -- 500 000, большие запросы упираются в таймаут)
+GRAPHQL_NODE_BUDGET = 100_000
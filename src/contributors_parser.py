@@ -1,10 +1,12 @@
 from dataclasses import asdict, dataclass
-from time import sleep
 from typing import Generator
 
-from src.constants import EMPTY_FIELD, TIMEDELTA
+from src.constants import EMPTY_FIELD
 from src.interface_wrapper import IRepositoryAPI, Repository
-from src.utils import logger
+from src.pacing import pacer
+from src.progress import progress
+from src.sinks import CSV_FORMAT, BufferedSink, open_sink
+from src.workers import process_repositories
 
 
 @dataclass(kw_only=True, frozen=True)
@@ -23,27 +25,33 @@ class ContributorData:
 
 
 def log_repository_contributors(
-    client: IRepositoryAPI, repository: Repository, csv_name: str
+    client: IRepositoryAPI, repository: Repository, sink: BufferedSink
 ):
-    contributors_stats = get_contributors_stats(client, repository)
+    pacer.pace_client(client)
+    contributors_stats = client.get_contributors_stats(repository)
+    # права коллабораторов -- одним списком на репозиторий; поштучно только для остальных контрибьюторов
+    permissions = client.get_collaborator_permissions(repository)
 
     def nvl(val):
         return val or EMPTY_FIELD
 
-    for contributor_stat in contributors_stats.values():
-        contributor = contributor_stat["contributor_object"]
-        contributor_permissions = client.get_collaborator_permission(
-            repository, contributor
-        )
+    progress.set_total(len(contributors_stats))
+    for contributor_stat in contributors_stats:
+        progress.advance()
+        pacer.pace_client(client)
+        contributor = contributor_stat.user
+        contributor_permissions = permissions.get(contributor.login)
+        if contributor_permissions is None:
+            contributor_permissions = client.get_collaborator_permission(repository, contributor)
 
         contributor_data = ContributorData(
             repository_name=repository.name,
             login=contributor.login,
             name=nvl(contributor.username),
-            email=nvl(contributor_stat['email']),
+            email=nvl(contributor.email),
             url=contributor.html_url,
             permissions=nvl(contributor_permissions),
-            total_commits=contributor_stat['total_commits'],
+            total_commits=contributor_stat.total_commits,
             node_id=contributor.node_id,
             type=contributor.type,
             bio=nvl(contributor.bio),
@@ -52,50 +60,26 @@ def log_repository_contributors(
 
         info_dict = asdict(contributor_data)
 
-        logger.log_to_csv(csv_name, list(info_dict.keys()), info_dict)
-        logger.log_to_stdout(info_dict)
-
-        sleep(TIMEDELTA)
-
-
-def get_contributors_stats(client: IRepositoryAPI, repository: Repository) -> dict:
-    contributors_stats = dict()
-    commits = client.get_commits(repository, False)
-
-    for commit in commits:
-        contributor = commit.author
-
-        if not contributor:
-            continue
-
-        if contributor.login not in contributors_stats:
-            contributors_stats[contributor.login] = {
-                'total_commits': 0,
-                'email': contributor.email,
-                'contributor_object': contributor,
-            }
-
-        contributors_stats[contributor.login]['total_commits'] += 1
-
-        sleep(TIMEDELTA)
-
-    return contributors_stats
+        sink.write(info_dict)
+        progress.add_item(info_dict)
 
 
 def log_contributors(
     binded_repos: Generator[tuple[IRepositoryAPI, Repository, str], None, None],
     csv_name: str,
     fork_flag: bool,
+    output_format: str = CSV_FORMAT,
+    workers: int = 1,
 ):
-    info = asdict(ContributorData())
-    logger.log_to_csv(csv_name, list(info.keys()))
-
-    for client, repo, token in binded_repos:
-        logger.log_title(repo.name)
-        log_repository_contributors(client, repo, csv_name)
+    def log_repository(client, repo, token, sink):
+        progress.start_repository(repo.name)
+        log_repository_contributors(client, repo, sink)
 
         if fork_flag:
-            for forked_repo in client.get_forks(repo):
-                logger.log_title(f"FORKED: {forked_repo.name}")
-                log_repository_contributors(client, forked_repo, csv_name)
-                sleep(TIMEDELTA)
+            for forked_repo in client.iter_forks(repo):
+                progress.start_repository(f"FORKED: {forked_repo.name}")
+                log_repository_contributors(client, forked_repo, sink)
+
+    with open_sink(csv_name, ContributorData, output_format) as sink:
+        process_repositories(binded_repos, sink, log_repository, workers)
+    progress.finish()
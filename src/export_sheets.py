@@ -1,10 +1,33 @@
 import pandas as pd
 import pygsheets
 
+from src.sinks import ARROW_FORMAT, CSV_FORMAT, PARQUET_FORMAT
+
 INT_MASS = [{"one": 1, "two": 2, "what?": 3}]
 
 
-def write_data_to_table(csv_path, google_token, table_id, sheet_name, start_cell="A1", clear_content=False):
+def read_output_table(path, output_format=CSV_FORMAT) -> pd.DataFrame:
+    if output_format == CSV_FORMAT:
+        return pd.read_csv(path, delimiter=',', encoding='utf-8')
+
+    if output_format == PARQUET_FORMAT:
+        df = pd.read_parquet(path)
+    elif output_format == ARROW_FORMAT:
+        import pyarrow as pa
+
+        with pa.ipc.open_stream(path) as reader:
+            df = reader.read_pandas()
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    # словарные колонки читаются как category, а set_dataframe не умеет заполнять в них пропуски
+    categorical = df.select_dtypes('category').columns
+    return df.astype({column: object for column in categorical})
+
+
+def write_data_to_table(
+    csv_path, google_token, table_id, sheet_name, start_cell="A1", clear_content=False, output_format=CSV_FORMAT
+):
     if google_token and sheet_name and table_id:
         gc = pygsheets.authorize(service_file=google_token)
         sh = gc.open_by_key(table_id)
@@ -17,7 +40,7 @@ def write_data_to_table(csv_path, google_token, table_id, sheet_name, start_cell
     wk_content = sh.worksheet_by_title(sheet_name)
 
     if csv_path:
-        df = pd.read_csv(csv_path, delimiter=',', encoding='utf-8')
+        df = read_output_table(csv_path, output_format)
     else:
         df = pd.DataFrame(INT_MASS)
 
@@ -1,10 +1,11 @@
+import heapq
 import re
-from time import sleep
 import logging
+import threading
+import time
 import traceback
 
-import requests
-
+from src.async_http import AsyncHttpSession
 from src.GitHubRepoAPI import GitHubRepoAPI
 from src.interface_wrapper import (
     RepositoryFactory,
@@ -12,7 +13,6 @@ from src.interface_wrapper import (
 )
 from src.constants import (
     EMPTY_FIELD,
-    TIMEDELTA,
 )
 
 
@@ -46,9 +46,26 @@ def get_repos_from_file(repos_path: str) -> list[str]:
 
 
 class Clients:
+    """
+    Пул клиентов по токенам. Следующим выдаётся клиент с наибольшим остатком лимита:
+    остатки берутся из уже полученных заголовков (get_rate_limiting) и хранятся в куче.
+    Перечитываются лениво -- только у выданных с прошлого выбора клиентов
+    и у тех, чьё окно лимита успело сброситься.
+    """
+
     def __init__(self, tokens: list[str], base_url: str | None = None):
         self.clients = []
         self.token_map = {}
+        self._worker_local = threading.local()
+        self._worker_lock = threading.Lock()
+        self._next_worker_client = 0
+
+        self._heap_lock = threading.Lock()
+        self._heap = []
+        self._resets = []
+        self._versions = {}
+        self._order = {}
+        self._dirty = set()
 
         for token in tokens:
             client = login(token, base_url)
@@ -61,29 +78,69 @@ class Clients:
                 raise Exception("No valid tokens for either GitHub or Forgejo")
             raise Exception("Make sure that base_url is provided")
 
-    def _get_next_client(self) -> tuple[IRepositoryAPI, str]:
-        client = None
-        max_remaining_limit = -1
+        for order, client in enumerate(self.clients):
+            self._order[client] = order
+            self._versions[client] = 0
+            self._dirty.add(client)
 
-        for c in self.clients:
-            remaining, _ = c.get_rate_limiting()
-            if remaining > max_remaining_limit:
-                client = c
-                max_remaining_limit = remaining
-            sleep(TIMEDELTA)
+    def _refresh(self, client: IRepositoryAPI, now: float):
+        remaining, limit = client.get_rate_limiting()
+        reset_at = client.get_rate_limiting_reset()
+        if reset_at and reset_at <= now:
+            # окно сбросилось, а заголовков нового окна ещё не видели
+            remaining = max(remaining, limit)
 
-        if client is None:
-            raise Exception("No git clients available")
+        self._versions[client] += 1
+        entry = (-remaining, self._order[client], self._versions[client], client)
+        heapq.heappush(self._heap, entry)
+        if reset_at and reset_at > now:
+            heapq.heappush(self._resets, (reset_at,) + entry[1:])
+
+    def _is_current(self, entry) -> bool:
+        *_, version, client = entry
+        return self._versions[client] == version
+
+    def _get_next_client(self) -> tuple[IRepositoryAPI, str]:
+        with self._heap_lock:
+            now = time.time()
+            for client in self._dirty:
+                self._refresh(client, now)
+            self._dirty.clear()
+
+            while self._resets and self._resets[0][0] <= now:
+                entry = heapq.heappop(self._resets)
+                if self._is_current(entry):
+                    self._refresh(entry[-1], now)
+
+            while self._heap and not self._is_current(self._heap[0]):
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                raise Exception("No git clients available")
+
+            client = self._heap[0][-1]
+            # клиент потратит лимит на выданный репозиторий -- перечитать при следующем выборе
+            self._dirty.add(client)
         return client, self.token_map[client]
 
     def get_next_client(self) -> tuple[IRepositoryAPI, str]:
         return self._get_next_client()
 
+    def get_worker_client(self) -> tuple[IRepositoryAPI, str]:
+        """Клиент, закреплённый за текущим потоком: воркеры получают токены по кругу."""
+        client = getattr(self._worker_local, 'client', None)
+        if client is None:
+            with self._worker_lock:
+                client = self.clients[self._next_worker_client % len(self.clients)]
+                self._next_worker_client += 1
+            self._worker_local.client = client
+        return client, self.token_map[client]
+
 
-def get_next_binded_repo(clients: Clients, repositories: list[str]):
+def get_next_binded_repo(clients: Clients, repositories: list[str], bind_to_worker: bool = False):
     for repo_name in repositories:
         try:
-            client, token = clients.get_next_client()
+            client, token = clients.get_worker_client() if bind_to_worker else clients.get_next_client()
             repo = client.get_repository(repo_name)
         except Exception as err:
             print(f'git_logger.get_next_binded_repo(): error {err}')
@@ -92,7 +149,7 @@ def get_next_binded_repo(clients: Clients, repositories: list[str]):
             yield client, repo, token
 
 
-def get_assignee_story(git_object, client, token, repository):
+async def fetch_assignee_story(session: AsyncHttpSession, git_object, client, token, repository):
     assignee_result = ""
 
     repo_owner = repository.owner.login
@@ -107,13 +164,13 @@ def get_assignee_story(git_object, client, token, repository):
     base_url = client.get_base_url().rstrip('/')
 
     url = f"{base_url}/repos/{repo_owner}/{repo_name}/issues/{issue_index}/timeline"
-    logging.info(url)
+    logging.debug(url)
     headers = {
         "Authorization": f"Bearer {token}" if client is GitHubRepoAPI else f"token {token}",
         "Accept": "application/json"
     }
 
-    response = requests.get(url, headers=headers)
+    response = await session.request('GET', url, token, headers=headers)
     if response.status_code != 200:
         raise Exception(f"Failed to fetch issue timeline: {response.status_code}, {response.text}")
 
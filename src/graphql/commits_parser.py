@@ -0,0 +1,255 @@
+from dataclasses import asdict, replace
+from datetime import datetime
+from typing import Generator
+
+import pytz
+
+from src.async_http import AsyncHttpSession, async_engine
+from src.commits_parser import CommitData
+from src.constants import EMPTY_FIELD, GOOGLE_MAX_CELL_LEN, GRAPHQL_PAGE_SIZE, TIMEZONE
+from src.graphql.request import run_graphql_query
+from src.interface_wrapper import IRepositoryAPI, Repository
+from src.progress import progress
+from src.sinks import CSV_FORMAT, BufferedSink, open_sink
+from src.sync_state import SyncState
+from src.utils import logger
+from src.workers import process_repositories
+
+
+# -----------GraphQLAPI block--------------
+
+HISTORY_QUERY = """
+query GetCommitHistory($owner: String!, $repo: String!, $ref: String!, $first: Int!, $after: String,
+                       $since: GitTimestamp, $until: GitTimestamp) {
+    repository(owner: $owner, name: $repo) {
+        ref(qualifiedName: $ref) {
+            target {
+                ... on Commit {
+                    history(first: $first, after: $after, since: $since, until: $until) {
+                        totalCount
+                        pageInfo {
+                            hasNextPage
+                            endCursor
+                        }
+                        nodes {
+                            oid
+                            authoredDate
+                            committedDate
+                            additions
+                            deletions
+                            author {
+                                name
+                                email
+                                user {
+                                    login
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
+BRANCHES_QUERY = """
+query GetBranches($owner: String!, $repo: String!, $first: Int!, $after: String) {
+    repository(owner: $owner, name: $repo) {
+        refs(refPrefix: "refs/heads/", first: $first, after: $after) {
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                name
+            }
+        }
+    }
+}
+"""
+
+
+def get_branch_names_by_graphql(owner: str, repo_name: str, token: str) -> list[str]:
+    names = []
+    after_cursor = None
+    while True:
+        variables = {"owner": owner, "repo": repo_name, "first": GRAPHQL_PAGE_SIZE, "after": after_cursor}
+        refs = run_graphql_query(BRANCHES_QUERY, variables, token)["repository"]["refs"]
+        names += [node["name"] for node in refs["nodes"]]
+        if not refs["pageInfo"]["hasNextPage"]:
+            return names
+        after_cursor = refs["pageInfo"]["endCursor"]
+
+
+def iter_commit_history_by_graphql(
+    owner: str, repo_name: str, branch: str, token: str, since: datetime | None, until: datetime | None
+) -> Generator[dict, None, None]:
+    """Коммиты ветки страницами по GRAPHQL_PAGE_SIZE: дата, автор и additions/deletions без запроса на коммит."""
+    after_cursor = None
+    while True:
+        variables = {
+            "owner": owner,
+            "repo": repo_name,
+            "ref": f"refs/heads/{branch}",
+            "first": GRAPHQL_PAGE_SIZE,
+            "after": after_cursor,
+            "since": since.isoformat() if since else None,
+            "until": until.isoformat() if until else None,
+        }
+        ref = run_graphql_query(HISTORY_QUERY, variables, token)["repository"]["ref"]
+        if ref is None:
+            logger.log_warning(f"Branch {branch} not found in {owner}/{repo_name}")
+            return
+
+        history = ref["target"]["history"]
+        progress.set_total(history["totalCount"])
+        yield from history["nodes"]
+
+        if not history["pageInfo"]["hasNextPage"]:
+            return
+        after_cursor = history["pageInfo"]["endCursor"]
+
+
+async def fetch_commit_files(session: AsyncHttpSession, owner: str, repo_name: str, sha: str, token: str) -> str:
+    response = await session.request(
+        'GET',
+        f"https://api.github.com/repos/{owner}/{repo_name}/commits/{sha}",
+        token,
+        headers={"Authorization": f"Bearer {token}", "Accept": "application/vnd.github+json"},
+    )
+    response.raise_for_status()
+    return '; '.join(file["filename"] for file in response.json().get("files", []))
+
+
+def log_repository_commits_by_graphql(
+    repository: Repository,
+    token: str,
+    sink: BufferedSink,
+    start: datetime,
+    finish: datetime,
+    branch: str | None,
+    commit_files: bool = False,
+    sync_state: SyncState | None = None,
+):
+    timezone = pytz.timezone(TIMEZONE)
+    owner = repository.owner.login
+
+    match branch:
+        case 'all':
+            branches = get_branch_names_by_graphql(owner, repository.name, token)
+        case None:
+            branches = [repository.default_branch.name]
+        case _:
+            branches = [branch]
+
+    until = finish if finish < datetime.now(timezone) else None
+    seen_commits: dict[str, CommitData] = {}
+    for branch in branches:
+        logger.log_to_stdout(f'Processing branch {branch}')
+        state_key = f'{repository._id}@{branch}'
+        mark = sync_state.get_mark('commits', state_key) if sync_state else None
+        since = max(start, mark.since) if mark and mark.since else start
+
+        # с --commit_files строки ветки ждут путей файлов, иначе пишутся сразу
+        branch_rows = [] if commit_files else None
+        for node in iter_commit_history_by_graphql(owner, repository.name, branch, token, since, until):
+            progress.advance()
+            commit_date = datetime.fromisoformat(node["authoredDate"]).astimezone(timezone)
+            if commit_date < start or commit_date > finish:
+                continue
+            if mark:
+                # отметка -- по дате коммиттера: по ней history(since:) фильтрует на сервере
+                committed_at = datetime.fromisoformat(node["committedDate"])
+                if not mark.is_new(committed_at, node["oid"]):
+                    continue
+                mark.add(committed_at, node["oid"])
+
+            if node["oid"] in seen_commits:
+                write_commit_row(sink, branch_rows, replace(seen_commits[node["oid"]], branch=branch))
+                continue
+
+            author = node["author"] or {}
+            commit_data = CommitData(
+                repository_name=repository.name,
+                author_name=author.get("name") or EMPTY_FIELD,
+                author_login=(author.get("user") or {}).get("login") or EMPTY_FIELD,
+                author_email=author.get("email") or EMPTY_FIELD,
+                date_and_time=commit_date.isoformat(),
+                changed_files=EMPTY_FIELD,
+                commit_id=node["oid"],
+                branch=branch,
+                additions=node["additions"],
+                deletions=node["deletions"],
+            )
+            seen_commits[node["oid"]] = commit_data
+            write_commit_row(sink, branch_rows, commit_data)
+
+        if commit_files:
+            fill_commit_files(owner, repository.name, token, seen_commits, branch_rows)
+            for commit_data in branch_rows:
+                write_commit_row(sink, None, commit_data)
+
+        if sync_state:
+            sync_state.set_mark('commits', state_key, mark)
+
+
+def write_commit_row(sink: BufferedSink, branch_rows: list[CommitData] | None, commit_data: CommitData):
+    if branch_rows is not None:
+        branch_rows.append(commit_data)
+        return
+    info = asdict(commit_data)
+    sink.write(info)
+    progress.add_item(info)
+
+
+def fill_commit_files(owner, repo_name, token, seen_commits: dict[str, CommitData], branch_rows: list[CommitData]):
+    """Пути изменённых файлов есть только в REST: по запросу на коммит, конкурентно и один раз на SHA."""
+
+    def make_job(sha):
+        async def job(session):
+            return await fetch_commit_files(session, owner, repo_name, sha, token)
+
+        return job
+
+    missing = {row.commit_id for row in branch_rows if seen_commits[row.commit_id].changed_files == EMPTY_FIELD}
+    jobs = ((sha, make_job(sha)) for sha in missing)
+    for sha, changed_files, error in async_engine.iter_completed(jobs):
+        if error is not None:
+            raise error
+        seen_commits[sha] = replace(seen_commits[sha], changed_files=changed_files[:GOOGLE_MAX_CELL_LEN])
+
+    for index, row in enumerate(branch_rows):
+        branch_rows[index] = replace(row, changed_files=seen_commits[row.commit_id].changed_files)
+
+
+def log_commits_by_graphql(
+    binded_repos: Generator[tuple[IRepositoryAPI, Repository, str], None, None],
+    csv_name: str,
+    start: datetime,
+    finish: datetime,
+    branch: str,
+    fork_flag: bool,
+    output_format: str = CSV_FORMAT,
+    workers: int = 1,
+    sync_state: SyncState | None = None,
+    commit_files: bool = False,
+):
+    def log_repository(client, repo, token, sink):
+        progress.start_repository(repo.name)
+        log_repository_commits_by_graphql(repo, token, sink, start, finish, branch, commit_files, sync_state)
+        if fork_flag:
+            for forked_repo in client.iter_forks(repo):
+                progress.start_repository(f"FORKED: {forked_repo.name}")
+                log_repository_commits_by_graphql(
+                    forked_repo, token, sink, start, finish, branch, commit_files, sync_state
+                )
+
+    try:
+        with open_sink(csv_name, CommitData, output_format, append=sync_state is not None) as sink:
+            process_repositories(binded_repos, sink, log_repository, workers, sync_state)
+    finally:
+        # отметки ставятся только за полностью выгруженные репозитории, их строки уже в файле
+        if sync_state:
+            sync_state.save()
+    progress.finish()
@@ -0,0 +1,317 @@
+from datetime import datetime
+from typing import Generator
+
+import pytz
+
+from src.constants import EMPTY_FIELD, GRAPHQL_ISSUES_PAGE_SIZE, GRAPHQL_NESTED_PAGE_SIZE, TIMEZONE
+from src.graphql.request import run_graphql_query
+from src.interface_wrapper import Comment, IRepositoryAPI, Repository, User
+from src.issues_parser import IssueData, log_issue_and_comments
+from src.progress import progress
+from src.sinks import CSV_FORMAT, BufferedSink, open_sink
+from src.sync_state import SyncState
+from src.workers import process_repositories
+
+
+# -----------GraphQLAPI block--------------
+
+# так GitHub показывает удалённых пользователей
+GHOST = {"login": "ghost"}
+
+CONNECTION_FRAGMENTS = """
+fragment CommentsPage on IssueCommentConnection {
+    pageInfo {
+        hasNextPage
+        endCursor
+    }
+    nodes {
+        body
+        createdAt
+        author {
+            login
+            ... on User {
+                name
+                email
+            }
+        }
+    }
+}
+
+fragment TimelinePage on IssueTimelineItemsConnection {
+    pageInfo {
+        hasNextPage
+        endCursor
+    }
+    nodes {
+        __typename
+        ... on AssignedEvent {
+            createdAt
+            actor { login }
+            assignee { ... on Actor { login } }
+        }
+        ... on UnassignedEvent {
+            createdAt
+            actor { login }
+            assignee { ... on Actor { login } }
+        }
+        ... on ClosedEvent {
+            createdAt
+            actor {
+                login
+                ... on User {
+                    name
+                    email
+                }
+            }
+        }
+        ... on ConnectedEvent {
+            subject { ... on PullRequest { url } }
+        }
+        ... on CrossReferencedEvent {
+            source { ... on PullRequest { url } }
+        }
+    }
+}
+"""
+
+TIMELINE_ITEM_TYPES = "[ASSIGNED_EVENT, UNASSIGNED_EVENT, CLOSED_EVENT, CONNECTED_EVENT, CROSS_REFERENCED_EVENT]"
+
+ISSUES_QUERY = """
+query GetIssues($owner: String!, $repo: String!, $first: Int!, $after: String, $since: DateTime, $nested: Int!) {
+    repository(owner: $owner, name: $repo) {
+        issues(first: $first, after: $after, filterBy: {since: $since},
+               orderBy: {field: CREATED_AT, direction: DESC}) {
+            totalCount
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                number
+                title
+                state
+                body
+                createdAt
+                closedAt
+                author {
+                    login
+                    ... on User {
+                        name
+                        email
+                    }
+                }
+                labels(first: 20) {
+                    nodes {
+                        name
+                    }
+                }
+                milestone {
+                    title
+                }
+                comments(first: $nested) {
+                    ...CommentsPage
+                }
+                timelineItems(first: $nested, itemTypes: %s) {
+                    ...TimelinePage
+                }
+            }
+        }
+    }
+}
+""" % TIMELINE_ITEM_TYPES + CONNECTION_FRAGMENTS
+
+ISSUE_CONNECTIONS_QUERY = """
+query GetIssueConnections($owner: String!, $repo: String!, $number: Int!, $first: Int!,
+                          $commentsAfter: String, $timelineAfter: String,
+                          $withComments: Boolean!, $withTimeline: Boolean!) {
+    repository(owner: $owner, name: $repo) {
+        issue(number: $number) {
+            comments(first: $first, after: $commentsAfter) @include(if: $withComments) {
+                ...CommentsPage
+            }
+            timelineItems(first: $first, after: $timelineAfter, itemTypes: %s) @include(if: $withTimeline) {
+                ...TimelinePage
+            }
+        }
+    }
+}
+""" % TIMELINE_ITEM_TYPES + CONNECTION_FRAGMENTS
+
+
+def complete_issue_connections(owner: str, repo_name: str, token: str, issue: dict):
+    """Дозапрашивает комментарии и события issue, только если они не поместились в страницу issues."""
+    comments, timeline = issue["comments"], issue["timelineItems"]
+    while comments["pageInfo"]["hasNextPage"] or timeline["pageInfo"]["hasNextPage"]:
+        variables = {
+            "owner": owner,
+            "repo": repo_name,
+            "number": issue["number"],
+            "first": GRAPHQL_NESTED_PAGE_SIZE,
+            "commentsAfter": comments["pageInfo"]["endCursor"],
+            "timelineAfter": timeline["pageInfo"]["endCursor"],
+            "withComments": comments["pageInfo"]["hasNextPage"],
+            "withTimeline": timeline["pageInfo"]["hasNextPage"],
+        }
+        data = run_graphql_query(ISSUE_CONNECTIONS_QUERY, variables, token)["repository"]["issue"]
+        for name, connection in (("comments", comments), ("timelineItems", timeline)):
+            page = data.get(name)
+            if page is not None:
+                connection["nodes"] += page["nodes"]
+                connection["pageInfo"] = page["pageInfo"]
+
+
+def iter_issues_by_graphql(
+    owner: str, repo_name: str, token: str, since: datetime | None
+) -> Generator[dict, None, None]:
+    """
+    Issues от новых к старым страницами по GRAPHQL_ISSUES_PAGE_SIZE, вместе с комментариями
+    и событиями назначения/закрытия/связи с PR. since сервер применяет к времени обновления.
+    """
+    after_cursor = None
+    while True:
+        variables = {
+            "owner": owner,
+            "repo": repo_name,
+            "first": GRAPHQL_ISSUES_PAGE_SIZE,
+            "after": after_cursor,
+            "since": since.isoformat() if since else None,
+            "nested": GRAPHQL_NESTED_PAGE_SIZE,
+        }
+        issues = run_graphql_query(ISSUES_QUERY, variables, token)["repository"]["issues"]
+        progress.set_total(issues["totalCount"])
+
+        for issue in issues["nodes"]:
+            complete_issue_connections(owner, repo_name, token, issue)
+            yield issue
+
+        if not issues["pageInfo"]["hasNextPage"]:
+            return
+        after_cursor = issues["pageInfo"]["endCursor"]
+
+
+def get_user_data(actor: dict | None) -> User | None:
+    if actor is None:
+        return None
+    return User(
+        _id=None,
+        login=actor["login"],
+        username=actor.get("name"),
+        email=actor.get("email"),
+        html_url=None,
+        node_id=None,
+        type=None,
+        bio=None,
+        site_admin=False,
+    )
+
+
+def get_assignee_story(timeline: list[dict]) -> str:
+    # тот же формат, что у REST-версии (src.git_logger.fetch_assignee_story)
+    return ''.join(
+        f"{event['createdAt']}: {(event['actor'] or {}).get('login', 'unknown')} -"
+        + ("/" if event['__typename'] == "UnassignedEvent" else "")
+        + f"> {(event['assignee'] or {}).get('login', 'unknown')}; "
+        for event in timeline
+        if event['__typename'] in ("AssignedEvent", "UnassignedEvent")
+    )
+
+
+def get_connected_pulls(timeline: list[dict]) -> str:
+    urls = []
+    for event in timeline:
+        pull = event.get("subject") or event.get("source") or {}
+        if pull.get("url") and pull["url"] not in urls:
+            urls.append(pull["url"])
+    return ';'.join(urls) if urls else EMPTY_FIELD
+
+
+def log_repository_issues_by_graphql(
+    repository: Repository,
+    token: str,
+    sink: BufferedSink,
+    start: datetime,
+    finish: datetime,
+    sync_state: SyncState | None = None,
+):
+    timezone = pytz.timezone(TIMEZONE)
+    mark = sync_state.get_mark('issues', repository._id) if sync_state else None
+    since = max(start, mark.since) if mark and mark.since else start
+
+    for issue in iter_issues_by_graphql(repository.owner.login, repository.name, token, since):
+        progress.advance()
+        created_at = datetime.fromisoformat(issue["createdAt"])
+        if created_at.astimezone(timezone) > finish:
+            continue
+        if created_at < since:
+            # issues идут от новых к старым: дальше только более старые
+            break
+        if mark:
+            if not mark.is_new(created_at, issue["number"]):
+                continue
+            mark.add(created_at, issue["number"])
+
+        timeline = issue["timelineItems"]["nodes"]
+        closed_events = [event for event in timeline if event["__typename"] == "ClosedEvent"]
+        closer = get_user_data(closed_events[-1]["actor"]) if closed_events and issue["closedAt"] else None
+        author = get_user_data(issue["author"])
+
+        issue_data = IssueData(
+            repository_name=repository.name,
+            number=issue["number"],
+            title=issue["title"],
+            state=issue["state"].lower(),
+            task=issue["body"],
+            created_at=str(created_at),
+            creator_name=author.username if author else None,
+            creator_login=author.login if author else None,
+            creator_email=author.email if author else None,
+            closed_at=str(datetime.fromisoformat(issue["closedAt"])) if issue["closedAt"] else EMPTY_FIELD,
+            closer_name=closer.username if closer else None,
+            closer_login=closer.login if closer else None,
+            closer_email=closer.email if closer else None,
+            assignee_story=get_assignee_story(timeline),
+            connected_pull_requests=get_connected_pulls(timeline),
+            labels=';'.join(label["name"] for label in issue["labels"]["nodes"]) or EMPTY_FIELD,
+            milestone=issue["milestone"]["title"] if issue["milestone"] else None,
+        )
+
+        comments = [
+            Comment(
+                body=comment["body"],
+                created_at=datetime.fromisoformat(comment["createdAt"]),
+                author=get_user_data(comment["author"] or GHOST),
+            )
+            for comment in issue["comments"]["nodes"]
+        ]
+        log_issue_and_comments(sink, issue_data, comments)
+
+    if sync_state:
+        sync_state.set_mark('issues', repository._id, mark)
+
+
+def log_issues_by_graphql(
+    binded_repos: Generator[tuple[IRepositoryAPI, Repository, str], None, None],
+    csv_name: str,
+    start: datetime,
+    finish: datetime,
+    fork_flag: bool,
+    output_format: str = CSV_FORMAT,
+    workers: int = 1,
+    sync_state: SyncState | None = None,
+):
+    def log_repository(client, repo, token, sink):
+        progress.start_repository(repo.name)
+        log_repository_issues_by_graphql(repo, token, sink, start, finish, sync_state)
+        if fork_flag:
+            for forked_repo in client.iter_forks(repo):
+                progress.start_repository(f"FORKED: {forked_repo.name}")
+                log_repository_issues_by_graphql(forked_repo, token, sink, start, finish, sync_state)
+
+    try:
+        with open_sink(csv_name, IssueData, output_format, append=sync_state is not None) as sink:
+            process_repositories(binded_repos, sink, log_repository, workers, sync_state)
+    finally:
+        # отметки ставятся только за полностью выгруженные репозитории, их строки уже в файле
+        if sync_state:
+            sync_state.save()
+    progress.finish()
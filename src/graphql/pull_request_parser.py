@@ -1,204 +1,302 @@
 from dataclasses import asdict
-from typing import Generator
-from time import sleep
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Generator, Iterable
 
-import requests
-
-from src.constants import TIMEDELTA
+from src.constants import GRAPHQL_NODE_BUDGET
+from src.graphql.request import GraphQLError, run_graphql_query
 from src.repo_dataclasses import PullRequestData
 from src.interface_wrapper import IRepositoryAPI, Repository
+from src.progress import progress
+from src.sinks import CSV_FORMAT, BufferedSink, open_sink
+from src.sync_state import HighWaterMark, SyncState
 from src.utils import logger
+from src.workers import process_repositories
 
 
 # -----------GraphQLAPI block--------------
 
-def log_repositories_pr_by_graphql(owner, repo_name, token, csv_name, first_n=100):
-    HEADERS = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-
-    query = """
-    query GetPRData($owner: String!, $repo: String!, $first: Int!, $after: String) {
-        repository(owner: $owner, name: $repo) {
-            nameWithOwner
-            pullRequests(first: $first, after: $after, states: [OPEN, CLOSED, MERGED],
-                            orderBy: {field: CREATED_AT, direction: DESC}) {
-                totalCount
-                pageInfo {
-                    hasNextPage
-                    endCursor
-                }
-                nodes {
-                    title
-                    number
-                    state
-                    createdAt
-
-                    author {
-                        login
-                        ... on User {
-                        name
-                        email
-                        }
-                    }
-
-                    baseRef {
-                        name
-                        target {
-                        oid
-                        }
-                    }
-
-                    headRef {
-                        name
-                        target {
-                        oid
-                        }
-                    }
-
-                    changedFiles
-                    additions
-                    deletions
-
-                    mergedAt
-                    mergedBy {
-                        login
-                        ... on User {
-                        name
-                        email
-                        }
-                    }
-
-                    assignees(first: 10) {
-                        nodes {
-                        login
-                        name
-                        }
-                    }
-
-                    labels(first: 20) {
-                        nodes {
-                        name
-                        color
-                        }
-                    }
-                }
+ASSIGNEES_PAGE_SIZE = 10
+LABELS_PAGE_SIZE = 20
+# узлов на один PR в ответе: сам PR, assignees и labels
+PULL_REQUEST_NODES = 1 + ASSIGNEES_PAGE_SIZE + LABELS_PAGE_SIZE
+
+PULL_REQUESTS_PAGE_FRAGMENT = """
+fragment PullRequestsPage on PullRequestConnection {
+    totalCount
+    pageInfo {
+        hasNextPage
+        endCursor
+    }
+    nodes {
+        title
+        number
+        state
+        createdAt
+
+        author {
+            login
+            ... on User {
+            name
+            email
             }
         }
-    }
-    """
 
-    has_next_page = True
-    after_cursor = None
-    processed_count = 0
+        baseRef {
+            name
+            target {
+            oid
+            }
+        }
+
+        headRef {
+            name
+            target {
+            oid
+            }
+        }
 
-    while has_next_page:
+        changedFiles
+        additions
+        deletions
 
-        variables = {
-            "owner": owner,
-            "repo": repo_name,
-            "first": first_n,
-            "after": after_cursor,
+        mergedAt
+        mergedBy {
+            login
+            ... on User {
+            name
+            email
+            }
         }
 
-        response = requests.post(
-            "https://api.github.com/graphql",
-            headers=HEADERS,
-            json={"query": query, "variables": variables},
-        )
+        assignees(first: %d) {
+            nodes {
+            login
+            name
+            }
+        }
+
+        labels(first: %d) {
+            nodes {
+            name
+            color
+            }
+        }
+    }
+}
+""" % (ASSIGNEES_PAGE_SIZE, LABELS_PAGE_SIZE)
+
+REPOSITORY_FRAGMENT = """
+fragment RepositoryPullRequests on Repository {
+    nameWithOwner
+    pullRequests(first: $first, states: [OPEN, CLOSED, MERGED], orderBy: {field: CREATED_AT, direction: DESC}) {
+        ...PullRequestsPage
+    }
+}
+"""
+
+PULL_REQUESTS_QUERY = """
+query GetPRData($owner: String!, $repo: String!, $first: Int!, $after: String) {
+    repository(owner: $owner, name: $repo) {
+        nameWithOwner
+        pullRequests(first: $first, after: $after, states: [OPEN, CLOSED, MERGED],
+                        orderBy: {field: CREATED_AT, direction: DESC}) {
+            ...PullRequestsPage
+        }
+    }
+}
+""" + PULL_REQUESTS_PAGE_FRAGMENT
 
-        if response.status_code != 200:
-            logger.log_error(f"GraphQL request failed: {response.status_code} - {response.text}")
-            logger.log_to_stdout(f"Sleep to {100*TIMEDELTA} and retry")
-            sleep(100*TIMEDELTA)
-            continue
 
-        graphql_data = response.json()
+def build_batch_query(count: int) -> str:
+    """Запрос первых страниц PR сразу для count репозиториев: по алиасу r{i} на репозиторий."""
+    params = ', '.join(f'$owner{i}: String!, $repo{i}: String!' for i in range(count))
+    aliases = '\n'.join(
+        f'    r{i}: repository(owner: $owner{i}, name: $repo{i}) {{ ...RepositoryPullRequests }}'
+        for i in range(count)
+    )
+    query = f'query GetPRDataBatch($first: Int!, {params}) {{\n{aliases}\n}}\n'
+    return query + REPOSITORY_FRAGMENT + PULL_REQUESTS_PAGE_FRAGMENT
 
-        if "errors" in graphql_data:
-            logger.log_error(f"GraphQL errors: {graphql_data['errors']}")
-            logger.log_to_stdout(f"Sleep to {100*TIMEDELTA} and retry")
-            sleep(100*TIMEDELTA)
-            continue
 
-        repo_data = graphql_data["data"]["repository"]
+def get_batch_size(first_n: int) -> int:
+    """Сколько репозиториев помещается в один запрос, не превышая GRAPHQL_NODE_BUDGET узлов."""
+    return max(1, GRAPHQL_NODE_BUDGET // (first_n * PULL_REQUEST_NODES))
+
+
+def get_first_pages_by_graphql(repositories: list[Repository], token: str, first_n: int = 100) -> dict[str, dict]:
+    """
+    Первые страницы PR пачки репозиториев. Недоступный репозиторий (переименован, удалён, закрыт)
+    даёт ошибку только своего алиаса: его страницы в ответе нет, и он запрашивается отдельно.
+    """
+    variables = {"first": first_n}
+    for i, repo in enumerate(repositories):
+        variables[f"owner{i}"] = repo.owner.login
+        variables[f"repo{i}"] = repo.name
+
+    try:
+        data = run_graphql_query(build_batch_query(len(repositories)), variables, token, allow_partial=True)
+    except GraphQLError as e:
+        logger.log_warning(f"Batch request failed, repositories are requested one by one: {e}")
+        return {}
+    return {repo._id: data[f"r{i}"] for i, repo in enumerate(repositories) if data.get(f"r{i}")}
+
+
+def prefetch_first_pages(
+    binded_repos: Iterable[tuple[IRepositoryAPI, Repository, str]],
+    first_pages: dict[str, dict],
+    first_n: int = 100,
+    get_worker_client: Callable[[], tuple[IRepositoryAPI, str]] | None = None,
+) -> Generator[tuple[IRepositoryAPI, Repository, str], None, None]:
+    """
+    Пропускает binded_repos дальше, заранее запрашивая первые страницы PR пачками
+    по get_batch_size репозиториев (токеном первого в пачке) и складывая их в first_pages.
+    get_worker_client -- при --workers: пачку читает один воркер, и её репозитории привязаны к его токену,
+    поэтому каждый репозиторий перепривязывается к клиенту воркера, которому он достался.
+    """
+    binded_repos = iter(binded_repos)
+    batch_size = get_batch_size(first_n)
+    while batch := list(islice(binded_repos, batch_size)):
+        first_pages.update(get_first_pages_by_graphql([repo for _, repo, _ in batch], batch[0][2], first_n))
+        for client, repo, token in batch:
+            if get_worker_client is not None:
+                client, token = get_worker_client()
+            yield client, repo, token
+
+
+def log_repositories_pr_by_graphql(
+    owner, repo_name, token, sink: BufferedSink, first_n=100, first_page=None, mark: HighWaterMark | None = None
+):
+    """
+    first_page -- уже полученная первая страница (см. prefetch_first_pages): дозапрашиваются только следующие.
+    mark -- отметка --incremental: PR идут от новых к старым, страницы старше отметки не запрашиваются.
+    """
+    repo_data = first_page
+    after_cursor = None
+
+    while True:
+        if repo_data is None:
+            variables = {
+                "owner": owner,
+                "repo": repo_name,
+                "first": first_n,
+                "after": after_cursor,
+            }
+            repo_data = run_graphql_query(PULL_REQUESTS_QUERY, variables, token)["repository"]
+
+        reached_mark = log_pull_requests_page(repo_data, sink, mark)
 
         page_info = repo_data["pullRequests"]["pageInfo"]
-        has_next_page = page_info["hasNextPage"]
+        if reached_mark or not page_info["hasNextPage"]:
+            return
         after_cursor = page_info["endCursor"]
+        repo_data = None
 
-        prs = repo_data["pullRequests"]["nodes"]
-
-        processed_count += len(prs)
-        logger.log_to_stdout(f"Processing {processed_count} / {repo_data["pullRequests"]['totalCount']}")
-
-        for pr in prs:
-            pr_data = PullRequestData(
-                repository_name=repo_data["nameWithOwner"],
-                title=pr["title"],
-                id=pr["number"],
-                state=str(pr["state"]).lower(),
-                commit_into=(
-                    pr["baseRef"]["target"]["oid"]
-                    if pr["baseRef"] and pr["baseRef"]["target"]
-                    else None
-                ),
-                commit_from=(
-                    pr["headRef"]["target"]["oid"]
-                    if pr["headRef"] and pr["headRef"]["target"]
-                    else None
-                ),
-                created_at=pr["createdAt"],
-                creator_name=(
-                    pr["author"]["name"]
-                    if pr["author"] and "name" in pr["author"]
-                    else None
-                ),
-                creator_login=pr["author"]["login"] if pr["author"] else None,
-                creator_email=(
-                    pr["author"]["email"]
-                    if pr["author"] and "email" in pr["author"]
-                    else None
-                ),
-                changed_files=pr["changedFiles"],
-                comment_body=None,
-                comment_created_at=None,
-                comment_author_name=None,
-                comment_author_login=None,
-                comment_author_email=None,
-                merger_name=(
-                    pr["mergedBy"]["name"]
-                    if pr["mergedBy"] and "name" in pr["mergedBy"]
-                    else None
-                ),
-                merger_login=pr["mergedBy"]["login"] if pr["mergedBy"] else None,
-                merger_email=(
-                    pr["mergedBy"]["email"]
-                    if pr["mergedBy"] and "email" in pr["mergedBy"]
-                    else None
-                ),
-                merged=pr["mergedBy"] and "name" in pr["mergedBy"],  # TODO: refactor?
-                source_branch=pr["headRef"]["name"] if pr["headRef"] else None,
-                target_branch=pr["baseRef"]["name"] if pr["baseRef"] else None,
-                assignee_story=None,
-                related_issues=None,
-                labels=", ".join([label["name"] for label in pr["labels"]["nodes"]]),
-                milestone=None,
-            )
 
-            pr_info = asdict(pr_data)
-            logger.log_to_csv(csv_name, list(pr_info.keys()), pr_info)
-            logger.log_to_stdout(pr_info)
+def log_pull_requests_page(repo_data: dict, sink: BufferedSink, mark: HighWaterMark | None = None) -> bool:
+    """Пишет PR страницы новее mark; True -- встретился PR старше отметки, дальше только более старые."""
+    prs = repo_data["pullRequests"]["nodes"]
+    progress.set_total(repo_data["pullRequests"]["totalCount"])
+    progress.advance(len(prs))
+
+    for pr in prs:
+        if mark:
+            created_at = datetime.fromisoformat(pr["createdAt"])
+            if mark.is_older(created_at):
+                return True
+            if not mark.is_new(created_at, pr["number"]):
+                continue
+            mark.add(created_at, pr["number"])
+
+        pr_data = PullRequestData(
+            repository_name=repo_data["nameWithOwner"],
+            title=pr["title"],
+            id=pr["number"],
+            state=str(pr["state"]).lower(),
+            commit_into=(
+                pr["baseRef"]["target"]["oid"]
+                if pr["baseRef"] and pr["baseRef"]["target"]
+                else None
+            ),
+            commit_from=(
+                pr["headRef"]["target"]["oid"]
+                if pr["headRef"] and pr["headRef"]["target"]
+                else None
+            ),
+            created_at=pr["createdAt"],
+            creator_name=(
+                pr["author"]["name"]
+                if pr["author"] and "name" in pr["author"]
+                else None
+            ),
+            creator_login=pr["author"]["login"] if pr["author"] else None,
+            creator_email=(
+                pr["author"]["email"]
+                if pr["author"] and "email" in pr["author"]
+                else None
+            ),
+            changed_files=pr["changedFiles"],
+            comment_body=None,
+            comment_created_at=None,
+            comment_author_name=None,
+            comment_author_login=None,
+            comment_author_email=None,
+            merger_name=(
+                pr["mergedBy"]["name"]
+                if pr["mergedBy"] and "name" in pr["mergedBy"]
+                else None
+            ),
+            merger_login=pr["mergedBy"]["login"] if pr["mergedBy"] else None,
+            merger_email=(
+                pr["mergedBy"]["email"]
+                if pr["mergedBy"] and "email" in pr["mergedBy"]
+                else None
+            ),
+            merged=pr["mergedBy"] and "name" in pr["mergedBy"],  # TODO: refactor?
+            source_branch=pr["headRef"]["name"] if pr["headRef"] else None,
+            target_branch=pr["baseRef"]["name"] if pr["baseRef"] else None,
+            assignee_story=None,
+            related_issues=None,
+            labels=", ".join([label["name"] for label in pr["labels"]["nodes"]]),
+            milestone=None,
+        )
+
+        pr_info = asdict(pr_data)
+        sink.write(pr_info)
+        progress.add_item(pr_info)
+    return False
 
 
 def log_pull_requests_by_graphql(
     binded_repos: Generator[tuple[IRepositoryAPI, Repository, str], None, None],
     csv_name: str,
+    output_format: str = CSV_FORMAT,
+    workers: int = 1,
+    sync_state: SyncState | None = None,
+    get_worker_client: Callable[[], tuple[IRepositoryAPI, str]] | None = None,
 ):
-    info = asdict(PullRequestData())
-    logger.log_to_csv(csv_name, list(info.keys()))
+    """get_worker_client -- Clients.get_worker_client при --workers (см. prefetch_first_pages)."""
+    # мелкие репозитории укладываются в первую страницу, которая приходит одним запросом на пачку
+    first_pages = {}
 
-    for _, repo, token in binded_repos:
-        logger.log_title(repo.name)
+    def log_repository(client, repo, token, sink):
+        progress.start_repository(repo.name)
+        mark = sync_state.get_mark('pull_requests', repo._id) if sync_state else None
         log_repositories_pr_by_graphql(
-            owner=repo.owner.login, repo_name=repo.name, csv_name=csv_name, token=token
+            owner=repo.owner.login, repo_name=repo.name, sink=sink, token=token,
+            first_page=first_pages.pop(repo._id, None), mark=mark,
         )
-        sleep(100*TIMEDELTA)
+        if sync_state:
+            sync_state.set_mark('pull_requests', repo._id, mark)
+
+    try:
+        with open_sink(csv_name, PullRequestData, output_format, append=sync_state is not None) as sink:
+            process_repositories(
+                prefetch_first_pages(binded_repos, first_pages, get_worker_client=get_worker_client),
+                sink, log_repository, workers, sync_state,
+            )
+    finally:
+        # отметки ставятся только за полностью выгруженные репозитории, их строки уже в файле
+        if sync_state:
+            sync_state.save()
+    progress.finish()
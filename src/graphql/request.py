@@ -0,0 +1,46 @@
+from time import sleep
+
+from src.constants import GRAPHQL_MAX_RETRIES, GRAPHQL_URL, TIMEDELTA
+from src.pacing import pacer
+from src.utils import logger
+
+
+class GraphQLError(Exception):
+    """Запрос GraphQL не удался и после GRAPHQL_MAX_RETRIES попыток."""
+
+
+def run_graphql_query(query: str, variables: dict, token: str, allow_partial: bool = False) -> dict:
+    """
+    POST запроса GraphQL с темпом по бюджету токена; при ошибке -- пауза и повтор, не больше
+    GRAPHQL_MAX_RETRIES попыток, затем GraphQLError. Возвращает data.
+    allow_partial -- ошибки отдельных полей (например, алиаса недоступного репозитория в пакетном
+    запросе) не повторяются: возвращается data, где у таких полей null.
+    """
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+
+    for attempt in range(1, GRAPHQL_MAX_RETRIES + 1):
+        response = pacer.request(
+            'POST',
+            GRAPHQL_URL,
+            token,
+            headers=headers,
+            json={"query": query, "variables": variables},
+        )
+
+        if response.status_code != 200:
+            error = f"GraphQL request failed: {response.status_code} - {response.text}"
+        else:
+            graphql_data = response.json()
+            if "errors" not in graphql_data:
+                return graphql_data["data"]
+            if allow_partial and graphql_data.get("data"):
+                logger.log_warning(f"GraphQL errors, using partial data: {graphql_data['errors']}")
+                return graphql_data["data"]
+            error = f"GraphQL errors: {graphql_data['errors']}"
+
+        logger.log_error(error)
+        if attempt < GRAPHQL_MAX_RETRIES:
+            logger.log_to_stdout(f"Sleep to {100*TIMEDELTA} and retry")
+            sleep(100*TIMEDELTA)
+
+    raise GraphQLError(error)
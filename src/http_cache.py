@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from src.constants import HTTP_CACHE_MAX_SIZE, HTTP_CACHE_TTL
+
+# заголовки, которые не переносятся из сохранённого ответа: тело хранится уже распакованным
+_SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: list[tuple[str, str]]
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+
+
+def get_cache_key(method: str, url: str, headers) -> str:
+    """Ключ записи: метод, URL, Accept и область токена (хэш Authorization, сам токен не хранится)."""
+    parts = [method.upper(), str(url), headers.get('Accept', ''), headers.get('Authorization', '')]
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+
+def merge_headers(cached: list[tuple[str, str]], fresh) -> list[tuple[str, str]]:
+    """Заголовки сохранённого ответа, обновлённые заголовками 304 (в т.ч. X-RateLimit-*)."""
+    merged = {name.lower(): (name, value) for name, value in cached}
+    for name, value in fresh.items():
+        if name.lower() not in _SKIPPED_HEADERS:
+            merged[name.lower()] = (name, value)
+    return list(merged.values())
+
+
+class HttpCache:
+    """
+    Дисковый кэш GET-ответов с ETag/Last-Modified (sqlite).
+    Записи старше ttl удаляются, при превышении max_size вытесняются давно не читанные.
+    Пока запись жива, запрос уходит условным (If-None-Match/If-Modified-Since),
+    а на 304 Not Modified тело берётся из кэша -- такие ответы GitHub не списывает с лимита.
+    """
+
+    def __init__(self, path: str, max_size: int = HTTP_CACHE_MAX_SIZE, ttl: float = HTTP_CACHE_TTL):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, '
+            'etag TEXT, last_modified TEXT, size INTEGER, stored_at REAL, accessed_at REAL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        self._db.commit()
+
+    def get(self, key: str) -> CachedResponse | None:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT status, headers, body, etag, last_modified, stored_at FROM responses WHERE key = ?',
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            status, headers, body, etag, last_modified, stored_at = row
+            if stored_at + self.ttl < now:
+                self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._db.commit()
+                return None
+            self._db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+            self._db.commit()
+        return CachedResponse(status, [tuple(h) for h in json.loads(headers)], body, etag, last_modified)
+
+    def put(self, key: str, status: int, headers, body: bytes):
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        stored_headers = [(name, value) for name, value in headers.items() if name.lower() not in _SKIPPED_HEADERS]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, status, json.dumps(stored_headers), body, etag, last_modified, len(body), now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, key: str):
+        """Ответ подтверждён сервером (304): отсчёт ttl начинается заново."""
+        with self._lock:
+            self._db.execute('UPDATE responses SET stored_at = ? WHERE key = ?', (time.time(), key))
+            self._db.commit()
+
+    def _evict(self):
+        total_size = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total_size <= self.max_size:
+            return
+        rows = self._db.execute('SELECT key, size FROM responses ORDER BY accessed_at').fetchall()
+        evicted = []
+        for key, size in rows:
+            if total_size <= self.max_size:
+                break
+            evicted.append((key,))
+            total_size -= size
+        self._db.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def conditional_headers(self, entry: CachedResponse) -> dict:
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CachingAdapter(HTTPAdapter):
+    """HTTPAdapter для requests.Session, отправляющий GET условно через HttpCache."""
+
+    def __init__(self, cache: HttpCache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request: requests.PreparedRequest, stream=False, **kwargs) -> requests.Response:
+        if request.method != 'GET' or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        key = get_cache_key(request.method, request.url, request.headers)
+        entry = self.cache.get(key)
+        if entry is not None:
+            request.headers.update(self.cache.conditional_headers(entry))
+
+        response = super().send(request, stream=stream, **kwargs)
+        if entry is not None and response.status_code == 304:
+            self.cache.record(hit=True)
+            self.cache.refresh(key)
+            # дочитать пустое тело 304, чтобы соединение вернулось в пул
+            response.content
+            response.headers = CaseInsensitiveDict(merge_headers(entry.headers, response.headers))
+            response.status_code = entry.status
+            response._content = entry.body
+            return response
+
+        self.cache.record(hit=False)
+        if response.status_code == 200:
+            self.cache.put(key, response.status_code, response.headers, response.content)
+        return response
+
+
+class _HttpxCacheMixin:
+    cache: HttpCache
+
+    def _prepare(self, request: httpx.Request):
+        if request.method != 'GET':
+            return None, None
+        key = get_cache_key(request.method, request.url, request.headers)
+        entry = self.cache.get(key)
+        if entry is not None:
+            request.headers.update(self.cache.conditional_headers(entry))
+        return key, entry
+
+    def _from_cache(self, key, entry: CachedResponse, request: httpx.Request, response: httpx.Response):
+        self.cache.record(hit=True)
+        self.cache.refresh(key)
+        return httpx.Response(
+            entry.status,
+            headers=merge_headers(entry.headers, response.headers),
+            content=entry.body,
+            request=request,
+        )
+
+    def _store(self, key, request: httpx.Request, response: httpx.Response, body: bytes) -> httpx.Response:
+        self.cache.record(hit=False)
+        self.cache.put(key, response.status_code, response.headers, body)
+        headers = [(name, value) for name, value in response.headers.items() if name.lower() not in _SKIPPED_HEADERS]
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+
+class CachingTransport(_HttpxCacheMixin, httpx.BaseTransport):
+    """Транспорт httpx.Client с условными GET через HttpCache."""
+
+    def __init__(self, cache: HttpCache, transport: httpx.BaseTransport):
+        self.cache = cache
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key, entry = self._prepare(request)
+        response = self.transport.handle_request(request)
+        if key is None:
+            return response
+        if entry is not None and response.status_code == 304:
+            response.close()
+            return self._from_cache(key, entry, request, response)
+        if response.status_code != 200:
+            self.cache.record(hit=False)
+            return response
+        return self._store(key, request, response, response.read())
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncCachingTransport(_HttpxCacheMixin, httpx.AsyncBaseTransport):
+    """Транспорт httpx.AsyncClient с условными GET через HttpCache."""
+
+    def __init__(self, cache: HttpCache, transport: httpx.AsyncBaseTransport):
+        self.cache = cache
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key, entry = self._prepare(request)
+        response = await self.transport.handle_async_request(request)
+        if key is None:
+            return response
+        if entry is not None and response.status_code == 304:
+            await response.aclose()
+            return self._from_cache(key, entry, request, response)
+        if response.status_code != 200:
+            self.cache.record(hit=False)
+            return response
+        return self._store(key, request, response, await response.aread())
+
+    async def aclose(self):
+        await self.transport.aclose()
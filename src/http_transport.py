@@ -0,0 +1,147 @@
+import threading
+from collections import Counter
+from typing import Callable
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+from requests.adapters import HTTPAdapter
+
+from src.constants import HTTP_POOL_SIZE, HTTP_TIMEOUT
+from src.http_cache import AsyncCachingTransport, CachingAdapter, CachingTransport, HttpCache
+
+
+ResponseHook = Callable[[requests.Response | httpx.Response], None]
+
+
+class HttpTransport:
+    """
+    Общий HTTP-транспорт: keep-alive пулы соединений по хостам и таймауты
+    для PyGithub, pyforgejo и сырых запросов (REST/GraphQL).
+    Через add_response_hook подключаются метрики: хук вызывается
+    для каждого ответа, прошедшего через транспорт; set_cache включает
+    условные запросы через HttpCache.
+    """
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT, pool_size: int = HTTP_POOL_SIZE):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.cache: HttpCache | None = None
+        self.request_counts = Counter()
+        self._hooks: list[ResponseHook] = []
+        self._lock = threading.Lock()
+        self._session = None
+        self._github_session = None
+        self._sync_client = None
+
+    def set_cache(self, cache: HttpCache | None):
+        """Вызывается до первого запроса: сессии и клиенты создаются лениво и кэш запоминают."""
+        self.cache = cache
+
+    def add_response_hook(self, hook: ResponseHook):
+        self._hooks.append(hook)
+
+    def _on_response(self, response: requests.Response | httpx.Response):
+        host = urlsplit(str(response.url)).netloc
+        with self._lock:
+            self.request_counts[host] += 1
+        for hook in self._hooks:
+            hook(response)
+
+    def _create_session(self, **adapter_options) -> requests.Session:
+        session = requests.Session()
+        adapter_options.update(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        if self.cache is not None:
+            adapter = CachingAdapter(self.cache, **adapter_options)
+        else:
+            adapter = HTTPAdapter(**adapter_options)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.hooks['response'].append(lambda response, *args, **kwargs: self._on_response(response))
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def github_session(self, retry) -> requests.Session:
+        """Сессия для PyGithub: отдельная, т.к. несёт его политику повторов (GithubRetry)."""
+        with self._lock:
+            if self._github_session is None:
+                session = self._create_session(max_retries=retry if retry is not None else 0)
+                # иначе requests подставит учётные данные из .netrc поверх токена
+                session.auth = Requester.noopAuth
+                self._github_session = session
+            return self._github_session
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+
+    def sync_client(self) -> httpx.Client:
+        """Общий httpx-клиент (pyforgejo принимает его через httpx_client)."""
+        with self._lock:
+            if self._sync_client is None:
+                http_transport = httpx.HTTPTransport(limits=self._limits())
+                if self.cache is not None:
+                    http_transport = CachingTransport(self.cache, http_transport)
+                self._sync_client = httpx.Client(
+                    timeout=self.timeout,
+                    transport=http_transport,
+                    follow_redirects=True,
+                    event_hooks={'response': [self._on_response]},
+                )
+            return self._sync_client
+
+    def async_client(self) -> httpx.AsyncClient:
+        """Новый async-клиент: он привязан к циклу событий, AsyncHttpEngine создаёт его один раз в своём цикле."""
+
+        async def on_response(response):
+            self._on_response(response)
+
+        http_transport = httpx.AsyncHTTPTransport(limits=self._limits())
+        if self.cache is not None:
+            http_transport = AsyncCachingTransport(self.cache, http_transport)
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            transport=http_transport,
+            follow_redirects=True,
+            event_hooks={'response': [on_response]},
+        )
+
+    def github_options(self) -> dict:
+        """Параметры для Github(); сами запросы PyGithub идут через GithubConnection."""
+        Requester.injectConnectionClasses(HTTPRequestsConnectionClass, GithubConnection)
+        return {'timeout': self.timeout, 'pool_size': self.pool_size}
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+
+class GithubConnection(HTTPSRequestsConnectionClass):
+    """
+    Соединение PyGithub поверх общей сессии транспорта. PyGithub создаёт его
+    на каждый запрос (injectConnectionClasses отключает переиспользование),
+    поэтому потоки не делят одно соединение, а пул остаётся общим.
+    """
+
+    def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+        self.host = host
+        self.port = port if port else 443
+        self.protocol = 'https'
+        self.timeout = timeout
+        self.verify = kwargs.get('verify', True)
+        self.retry = retry
+        self.pool_size = pool_size
+        self.session = transport.github_session(retry)
+
+    def close(self):
+        # сессия общая и живёт до конца работы
+        pass
+
+
+transport = HttpTransport()
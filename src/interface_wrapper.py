@@ -2,10 +2,13 @@ import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
+from typing import Container, Iterator
 
 from github import Auth, Github
 from pyforgejo import PyforgejoApi
 
+from src.http_transport import transport
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -32,15 +35,23 @@ class User:
     site_admin: bool
 
 
+@dataclass
+class ContributorStats:
+    user: User
+    total_commits: int
+
+
 @dataclass
 class Commit:
     _id: str
     message: str
-    author: User
+    author: User | None
     date: datetime
     files: list[str]
     additions: int
     deletions: int
+    # дата коммиттера: по ней сервер фильтрует since/until (date -- дата автора)
+    committed_at: datetime | None = None
 
 
 @dataclass
@@ -145,9 +156,42 @@ class IRepositoryAPI(ABC):
     def get_collaborator_permission(self, repo: Repository, user: User) -> str:
         pass
 
+    def get_collaborator_permissions(self, repo: Repository) -> dict[str, str]:
+        """
+        Права всех коллабораторов репозитория одним списком: login -> право в тех же значениях,
+        что у get_collaborator_permission. Пустой словарь -- массового способа нет, права
+        запрашиваются по одному через get_collaborator_permission.
+        """
+        return {}
+
+    def get_commits(
+        self,
+        repo: Repository,
+        files: bool = True,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        sha: str | None = None,
+        known_shas: Container[str] = (),
+    ) -> list[Commit]:
+        """Получить список коммитов для репозитория (см. iter_commits)."""
+        return list(self.iter_commits(repo, files, since, until, sha, known_shas))
+
     @abstractmethod
-    def get_commits(self, repo: Repository, files: bool = True) -> list[Commit]:
-        """Получить список коммитов для репозитория."""
+    def iter_commits(
+        self,
+        repo: Repository,
+        files: bool = True,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        sha: str | None = None,
+        known_shas: Container[str] = (),
+    ) -> Iterator[Commit]:
+        """
+        Коммиты репозитория по мере получения страниц. Фильтры применяются на сервере:
+        since/until -- окно по дате коммита, sha -- ветка или коммит, от которого идёт история.
+        Коммиты из known_shas (уже выгруженные, например с другой ветки) не дозапрашиваются:
+        у них заполнены только _id и date.
+        """
         pass
 
     @abstractmethod
@@ -156,13 +200,37 @@ class IRepositoryAPI(ABC):
         pass
 
     @abstractmethod
-    def get_issues(self, repo: Repository) -> list[Issue]:
-        """Получить список issues для репозитория."""
+    def get_contributors_stats(self, repo: Repository) -> list[ContributorStats]:
+        """Контрибьюторы ветки по умолчанию с числом их коммитов, без запроса на каждый коммит."""
         pass
 
+    def get_issues(self, repo: Repository, since: datetime | None = None) -> list[Issue]:
+        """Получить список issues для репозитория (см. iter_issues)."""
+        return list(self.iter_issues(repo, since))
+
     @abstractmethod
-    def get_pull_requests(self, repo: Repository) -> list[PullRequest]:
-        """Получить список pull requests для репозитория."""
+    def iter_issues(self, repo: Repository, since: datetime | None = None) -> Iterator[Issue]:
+        """
+        Issues репозитория по мере получения страниц (since -- только созданные не раньше этого момента:
+        созданные в ту же секунду, что и отметка, отсеивает HighWaterMark по id).
+        """
+        pass
+
+    def get_pull_requests(
+        self, repo: Repository, since: datetime | None = None, files: bool = True, comments: bool = False
+    ) -> list[PullRequest]:
+        """Получить список pull requests для репозитория (см. iter_pull_requests)."""
+        return list(self.iter_pull_requests(repo, since, files, comments))
+
+    @abstractmethod
+    def iter_pull_requests(
+        self, repo: Repository, since: datetime | None = None, files: bool = True, comments: bool = False
+    ) -> Iterator[PullRequest]:
+        """
+        Pull requests репозитория по мере получения страниц (since -- только созданные не раньше этого момента).
+        files -- заполнять files (отдельный запрос на PR), comments -- будут запрошены get_comments для PR:
+        API, которым для этого нужны дополнительные запросы, делают их только по этим флагам.
+        """
         pass
 
     @abstractmethod
@@ -171,7 +239,15 @@ class IRepositoryAPI(ABC):
         pass
 
     @abstractmethod
+    def get_branch_names(self, repo: Repository) -> list[str]:
+        """Только имена веток: без запросов последних коммитов, которые делает get_branches."""
+        pass
+
     def get_forks(self, repo: Repository) -> list[Repository]:
+        return list(self.iter_forks(repo))
+
+    @abstractmethod
+    def iter_forks(self, repo: Repository) -> Iterator[Repository]:
         pass
 
     @abstractmethod
@@ -183,6 +259,13 @@ class IRepositoryAPI(ABC):
     def get_comments(self, obj) -> list[Comment]:
         pass
 
+    def get_pull_request_references(self, repo: Repository) -> dict[int, list[str]]:
+        """
+        Ссылки на PR по номерам issues: номер issue -> html_url ссылающихся на него PR.
+        Пустой словарь -- индекса нет, связанные PR ищутся для каждого issue отдельно.
+        """
+        return {}
+
     @abstractmethod
     def get_invites(self, repo: Repository) -> list[Invite]:
         pass
@@ -192,7 +275,15 @@ class IRepositoryAPI(ABC):
         pass
 
     @abstractmethod
-    def get_workflow_runs(self, repo: Repository) -> list[WorkflowRun]:
+    def get_rate_limiting_reset(self) -> int:
+        """Время сброса лимита запросов (unix timestamp), 0 -- если неизвестно."""
+        pass
+
+    def get_workflow_runs(self, repo: Repository, since: datetime | None = None) -> list[WorkflowRun]:
+        return list(self.iter_workflow_runs(repo, since))
+
+    @abstractmethod
+    def iter_workflow_runs(self, repo: Repository, since: datetime | None = None) -> Iterator[WorkflowRun]:
         pass
 
     @abstractmethod
@@ -209,7 +300,10 @@ class RepositoryFactory:
         errors = []
 
         try:
-            client = GitHubRepoAPI(Github(auth=Auth.Token(token)))
+            # темп запросов задаёт src.pacing по заголовкам лимита, а не фиксированная пауза PyGithub
+            client = GitHubRepoAPI(
+                Github(auth=Auth.Token(token), seconds_between_requests=None, **transport.github_options())
+            )
             if client.client:
                 return client
         except Exception as e:
@@ -217,7 +311,9 @@ class RepositoryFactory:
 
         if base_url:
             try:
-                return ForgejoRepoAPI(PyforgejoApi(api_key=token, base_url=base_url))
+                return ForgejoRepoAPI(
+                    PyforgejoApi(api_key=token, base_url=base_url, httpx_client=transport.sync_client())
+                )
             except Exception as e:
                 errors.append(f"Forgejo login failed: {e}")
 
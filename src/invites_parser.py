@@ -1,10 +1,11 @@
 from dataclasses import asdict, dataclass
-from time import sleep
 from typing import Generator
 
-from src.constants import TIMEDELTA
 from src.interface_wrapper import IRepositoryAPI, Repository
-from src.utils import logger
+from src.pacing import pacer
+from src.progress import progress
+from src.sinks import CSV_FORMAT, BufferedSink, open_sink
+from src.workers import process_repositories
 
 
 @dataclass(kw_only=True, frozen=True)
@@ -16,10 +17,13 @@ class InviteData:
 
 
 def log_repository_invitations(
-    client: IRepositoryAPI, repository: Repository, csv_name: str
+    client: IRepositoryAPI, repository: Repository, sink: BufferedSink
 ):
+    pacer.pace_client(client)
     invitations = client.get_invites(repository)
+    progress.set_total(len(invitations))
     for invite in invitations:
+        progress.advance()
         invite_data = InviteData(
             repository_name=repository.name,
             invited_login=invite.invitee.login,
@@ -27,19 +31,20 @@ def log_repository_invitations(
             invitation_url=invite.html_url,
         )
         invite_dict = asdict(invite_data)
-        logger.log_to_csv(csv_name, list(invite_dict.keys()), invite_dict)
-        logger.log_to_stdout(invite_dict)
-        sleep(TIMEDELTA)
+        sink.write(invite_dict)
+        progress.add_item(invite_dict)
 
 
 def log_invitations(
     binded_repos: Generator[tuple[IRepositoryAPI, Repository, str], None, None],
     csv_name: str,
+    output_format: str = CSV_FORMAT,
+    workers: int = 1,
 ):
-    info = asdict(InviteData())
-    logger.log_to_csv(csv_name, list(info.keys()))
+    def log_repository(client, repo, token, sink):
+        progress.start_repository(repo.name)
+        log_repository_invitations(client, repo, sink)
 
-    for client, repo, token in binded_repos:
-        print(client, repo, token)
-        logger.log_title(repo.name)
-        log_repository_invitations(client, repo, csv_name)
+    with open_sink(csv_name, InviteData, output_format) as sink:
+        process_repositories(binded_repos, sink, log_repository, workers)
+    progress.finish()
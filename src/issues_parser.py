@@ -1,15 +1,18 @@
 import json
 from dataclasses import asdict, dataclass
 from datetime import datetime
-from time import sleep
 from typing import Generator
 import pytz
-import requests
 
-from src.constants import EMPTY_FIELD, TIMEDELTA, TIMEZONE
-from src.git_logger import get_assignee_story
-from src.interface_wrapper import IRepositoryAPI, Repository
-from src.utils import logger
+from src.async_http import AsyncHttpSession, async_engine
+from src.constants import EMPTY_FIELD, TIMEZONE
+from src.git_logger import fetch_assignee_story
+from src.interface_wrapper import IRepositoryAPI, Repository, User
+from src.pacing import pacer
+from src.progress import progress
+from src.sinks import CSV_FORMAT, BufferedSink, open_sink
+from src.sync_state import SyncState
+from src.workers import process_repositories
 
 
 @dataclass(kw_only=True, frozen=True)
@@ -38,139 +41,93 @@ class IssueData:
     milestone: str = ''
 
 
-def get_connected_pulls(
+async def fetch_connected_pulls(
+    session: AsyncHttpSession,
     token: str,
     issue_number: int,
-    repo_owner: str,
+    repo_owner: User,
     repo_name: str,
-    base_url: str | None = None
 ) -> str:
-
-    if base_url:  # Forgejo
-        headers = {
-            "Authorization": f"token {token}",
-            "Accept": "application/json"
-        }
-
-        connected_prs = set()
-        api_base = f"{base_url}/api/v1/repos/{repo_owner}/{repo_name}"
-
-        try:
-            comments_response = requests.get(
-                f"{api_base}/issues/{issue_number}/comments",
-                headers=headers
-            )
-            comments_response.raise_for_status()
-
-            for comment in comments_response.json():
-                body = comment.get("body", "")
-                if not body:
-                    continue
-
-            for word in body.split():
-                clean_word = word.strip(".,:;!?()[]{}")
-                if len(clean_word) > 1 and clean_word[1:].isdigit():
-                    if clean_word.startswith('#'):
-                        pr_num = clean_word[1:]
-                        connected_prs.add(f"{base_url}/{repo_owner}/{repo_name}/pulls/{pr_num}")
-                    elif clean_word.startswith('!'):
-                        pr_num = clean_word[1:]
-                        connected_prs.add(f"{base_url}/{repo_owner}/{repo_name}/pulls/{pr_num}")
-
-            prs_response = requests.get(
-                f"{api_base}/pulls?state=all",
-                headers=headers
-            )
-            prs_response.raise_for_status()
-
-            for pr in prs_response.json():
-                if f"#{issue_number}" in pr.get("body", ""):
-                    connected_prs.add(pr.get("html_url"))
-
-        except requests.exceptions.RequestException as e:
-            print(f"[Warning] Failed to fetch connected PRs: {str(e)}")
-            return 'Empty field'
-
-        return ';'.join(sorted(connected_prs)) if connected_prs else 'Empty field'
-
-    else:  # PyGithub
-        repo_owner = repo_owner.login
-        # Формирование запроса GraphQL
-        query = """
-        {
-          repository(owner: "%s", name: "%s") {
-            issue(number: %d) {
-              timelineItems(first: 50, itemTypes:[CONNECTED_EVENT,CROSS_REFERENCED_EVENT]) {
-                filteredCount
-                nodes {
-                  ... on ConnectedEvent {
-                    ConnectedEvent: subject {
-                      ... on PullRequest {
-                        number
-                        title
-                        url
-                      }
-                    }
+    repo_owner = repo_owner.login
+    # Формирование запроса GraphQL
+    query = """
+    {
+      repository(owner: "%s", name: "%s") {
+        issue(number: %d) {
+          timelineItems(first: 50, itemTypes:[CONNECTED_EVENT,CROSS_REFERENCED_EVENT]) {
+            filteredCount
+            nodes {
+              ... on ConnectedEvent {
+                ConnectedEvent: subject {
+                  ... on PullRequest {
+                    number
+                    title
+                    url
                   }
-                  ... on CrossReferencedEvent {
-                    CrossReferencedEvent: source {
-                      ... on PullRequest {
-                        number
-                        title
-                        url
-                      }
-                    }
+                }
+              }
+              ... on CrossReferencedEvent {
+                CrossReferencedEvent: source {
+                  ... on PullRequest {
+                    number
+                    title
+                    url
                   }
                 }
               }
             }
           }
-        }""" % (
-            repo_owner,
-            repo_name,
-            issue_number,
-        )
-
-        # Формирование заголовков запроса
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
         }
+      }
+    }""" % (
+        repo_owner,
+        repo_name,
+        issue_number,
+    )
 
-        # Отправка запроса GraphQL
-        response = requests.post(
-            "https://api.github.com/graphql",
-            headers=headers,
-            data=json.dumps({"query": query}),
-        )
-        response_data = response.json()
-        # Обработка полученных данных
-        pull_request_data = response_data["data"]["repository"]["issue"]
-        list_url = []
-        if pull_request_data is not None:
-            issues_data = pull_request_data["timelineItems"]["nodes"]
-            for pulls in issues_data:
-                if (
-                    pulls.get("CrossReferencedEvent") is not None
-                    and pulls.get("CrossReferencedEvent").get("url") is not None
-                    and pulls.get("CrossReferencedEvent").get("url") not in list_url
-                ):
-                    list_url.append(pulls.get("CrossReferencedEvent").get("url"))
-                if (
-                    pulls.get("ConnectedEvent") is not None
-                    and pulls.get("ConnectedEvent").get("url") is not None
-                    and pulls.get("ConnectedEvent").get("url") not in list_url
-                ):
-                    list_url.append(pulls.get("ConnectedEvent").get("url"))
-            if list_url == []:
-                return 'Empty field'
-            else:
-                return ';'.join(list_url)
+    # Формирование заголовков запроса
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    }
+
+    # Отправка запроса GraphQL
+    response = await session.request(
+        'POST',
+        "https://api.github.com/graphql",
+        token,
+        headers=headers,
+        content=json.dumps({"query": query}),
+    )
+    response_data = response.json()
+    # Обработка полученных данных
+    pull_request_data = response_data["data"]["repository"]["issue"]
+    list_url = []
+    if pull_request_data is not None:
+        issues_data = pull_request_data["timelineItems"]["nodes"]
+        for pulls in issues_data:
+            if (
+                pulls.get("CrossReferencedEvent") is not None
+                and pulls.get("CrossReferencedEvent").get("url") is not None
+                and pulls.get("CrossReferencedEvent").get("url") not in list_url
+            ):
+                list_url.append(pulls.get("CrossReferencedEvent").get("url"))
+            if (
+                pulls.get("ConnectedEvent") is not None
+                and pulls.get("ConnectedEvent").get("url") is not None
+                and pulls.get("ConnectedEvent").get("url") not in list_url
+            ):
+                list_url.append(pulls.get("ConnectedEvent").get("url"))
+        if list_url == []:
+            return 'Empty field'
+        else:
+            return ';'.join(list_url)
     return 'Empty field'
 
 
 def log_repository_issues(
-    client: IRepositoryAPI, repository: Repository, csv_name, token, start, finish, base_url,
+    client: IRepositoryAPI, repository: Repository, sink: BufferedSink, token, start, finish, base_url,
+    sync_state: SyncState | None = None,
 ):
     def nvl(val):
         return val or EMPTY_FIELD
@@ -178,15 +135,50 @@ def log_repository_issues(
     def get_info(obj, attr):
         return EMPTY_FIELD if obj is None else getattr(obj, attr)
 
-    issues = client.get_issues(repository)
+    mark = sync_state.get_mark('issues', repository._id) if sync_state else None
+
+    def select_issues():
+        pacer.pace_client(client)
+        for issue in client.iter_issues(repository, since=mark.since if mark else None):
+            progress.advance()
+            if (
+                issue.created_at.astimezone(pytz.timezone(TIMEZONE)) < start
+                or issue.created_at.astimezone(pytz.timezone(TIMEZONE)) > finish
+            ):
+                continue
+            if mark:
+                if not mark.is_new(issue.created_at, issue.number):
+                    continue
+                mark.add(issue.created_at, issue.number)
+            yield issue
+
+    def make_job(issue):
+        async def job(session):
+            assignee_story = await fetch_assignee_story(session, issue, client, token, repository)
+            if base_url:
+                connected_pulls = ';'.join(sorted(pull_references.get(issue.number, []))) or EMPTY_FIELD
+            elif issue._id is None:
+                connected_pulls = EMPTY_FIELD
+            else:
+                connected_pulls = await fetch_connected_pulls(
+                    session, token, issue._id, repository.owner, repository.name
+                )
+            return assignee_story, connected_pulls
+
+        return job
 
-    for issue in issues:
-        if (
-            issue.created_at.astimezone(pytz.timezone(TIMEZONE)) < start
-            or issue.created_at.astimezone(pytz.timezone(TIMEZONE)) > finish
-        ):
-            continue
+    # на Forgejo связанные PR ищутся по ссылкам #N/!N, индекс строится один раз на репозиторий
+    pull_references = client.get_pull_request_references(repository) if base_url else {}
 
+    # запросы истории назначений и связанных PR идут конкурентно уже во время листинга,
+    # строки пишутся в порядке листинга: готовые раньше очереди ждут, пока завершится голова
+    jobs = ((issue, make_job(issue)) for issue in select_issues())
+    for issue, result, error in async_engine.iter_ordered(jobs):
+        if error is not None:
+            raise error
+        assignee_story, connected_pulls = result
+
+        pacer.pace_client(client)
         issue_data = IssueData(
             repository_name=repository.name,
             number=issue._id,
@@ -201,22 +193,20 @@ def log_repository_issues(
             closer_name=issue.closed_by.username if issue.closed_by else None,
             closer_login=issue.closed_by.login if issue.closed_by else None,
             closer_email=issue.closed_by.email if issue.closed_by else None,
-            assignee_story=get_assignee_story(issue, client, token, repository),
-            connected_pull_requests=(
-                get_connected_pulls(token, issue._id, repository.owner, repository.name, base_url)
-                if issue._id is not None
-                else EMPTY_FIELD
-            ),
+            assignee_story=assignee_story,
+            connected_pull_requests=connected_pulls,
             labels=';'.join(issue.labels) if issue.labels else EMPTY_FIELD,
             milestone=issue.milestone,
         )
 
         comments = client.get_comments(repository, issue)
-        log_issue_and_comments(csv_name, issue_data, comments)
-        sleep(TIMEDELTA)
+        log_issue_and_comments(sink, issue_data, comments)
+
+    if sync_state:
+        sync_state.set_mark('issues', repository._id, mark)
 
 
-def log_issue_and_comments(csv_name, issue_data: IssueData, comments):
+def log_issue_and_comments(sink: BufferedSink, issue_data: IssueData, comments):
     if comments:
         for comment in comments:
             comment_data = IssueData(
@@ -233,12 +223,12 @@ def log_issue_and_comments(csv_name, issue_data: IssueData, comments):
             )
             comment_data = asdict(comment_data)
 
-            logger.log_to_csv(csv_name, list(comment_data.keys()), comment_data)
-            logger.log_to_stdout(comment_data)
+            sink.write(comment_data)
+            progress.add_item(comment_data)
     else:
         info = asdict(issue_data)
-        logger.log_to_csv(csv_name, list(info.keys()), info)
-        logger.log_to_stdout(info)
+        sink.write(info)
+        progress.add_item(info)
 
 
 def log_issues(
@@ -248,19 +238,25 @@ def log_issues(
     finish: datetime,
     fork_flag: bool,
     base_url: str = None,
+    output_format: str = CSV_FORMAT,
+    workers: int = 1,
+    sync_state: SyncState | None = None,
 ):
-    info = asdict(IssueData())
-    logger.log_to_csv(csv_name, list(info.keys()))
-
-    for client, repo, token in binded_repos:
-        logger.log_title(repo.name)
-        log_repository_issues(client, repo, csv_name, token, start, finish, base_url)
+    def log_repository(client, repo, token, sink):
+        progress.start_repository(repo.name)
+        log_repository_issues(client, repo, sink, token, start, finish, base_url, sync_state)
         if fork_flag:
-            forked_repos = client.get_forks(repo)
-            for forked_repo in forked_repos:
-                logger.log_title(f"FORKED: {forked_repo.name}")
+            for forked_repo in client.iter_forks(repo):
+                progress.start_repository(f"FORKED: {forked_repo.name}")
                 log_repository_issues(
-                    client, forked_repo, csv_name, token, start, finish, base_url,
+                    client, forked_repo, sink, token, start, finish, base_url, sync_state,
                 )
-                sleep(TIMEDELTA)
-        sleep(TIMEDELTA)
+
+    try:
+        with open_sink(csv_name, IssueData, output_format, append=sync_state is not None) as sink:
+            process_repositories(binded_repos, sink, log_repository, workers, sync_state)
+    finally:
+        # отметки ставятся только за полностью выгруженные репозитории, их строки уже в файле
+        if sync_state:
+            sync_state.save()
+    progress.finish()
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+import httpx
+import requests
+
+from src.constants import (
+    RATE_LIMIT_MAX_RETRIES,
+    RATE_LIMIT_RESERVE,
+    RATE_LIMIT_SPREAD_THRESHOLD,
+)
+from src.http_transport import transport
+
+
+@dataclass
+class RateLimitState:
+    remaining: int | None = None
+    limit: int | None = None
+    reset_at: float | None = None
+    blocked_until: float = 0.0
+    last_request_at: float = 0.0
+
+
+class RequestPacer:
+    """
+    Темп запросов по заголовкам X-RateLimit-Remaining/Limit/Reset и Retry-After.
+    Пока бюджета токена больше spread_threshold от лимита, запросы идут без задержек;
+    дальше остаток равномерно растягивается до момента сброса, а при остатке
+    не больше reserve (или после Retry-After) ждём сброса окна.
+    Состояние хранится по ключу бюджета: токен для сырых запросов или клиент API.
+    """
+
+    def __init__(
+        self,
+        reserve: int = RATE_LIMIT_RESERVE,
+        spread_threshold: float = RATE_LIMIT_SPREAD_THRESHOLD,
+    ):
+        self.reserve = reserve
+        self.spread_threshold = spread_threshold
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _get_state(self, key) -> RateLimitState:
+        return self._states.setdefault(key, RateLimitState())
+
+    def update(self, key, remaining: int | None, limit: int | None, reset_at: float | None):
+        with self._lock:
+            state = self._get_state(key)
+            state.remaining = remaining
+            state.limit = limit
+            state.reset_at = reset_at
+
+    def update_from_response(self, key, response: requests.Response | httpx.Response):
+        headers = response.headers
+        with self._lock:
+            state = self._get_state(key)
+            if 'X-RateLimit-Remaining' in headers:
+                state.remaining = int(headers['X-RateLimit-Remaining'])
+            if 'X-RateLimit-Limit' in headers:
+                state.limit = int(headers['X-RateLimit-Limit'])
+            if 'X-RateLimit-Reset' in headers:
+                state.reset_at = float(headers['X-RateLimit-Reset'])
+
+            retry_after = _parse_retry_after(headers.get('Retry-After'))
+            if retry_after is not None:
+                state.blocked_until = max(state.blocked_until, time.time() + retry_after)
+            elif is_rate_limited(response) and state.reset_at:
+                state.blocked_until = max(state.blocked_until, state.reset_at)
+
+    def get_delay(self, key) -> float:
+        with self._lock:
+            state = self._get_state(key)
+            now = time.time()
+
+            if state.blocked_until > now:
+                return state.blocked_until - now
+            if state.remaining is None or not state.reset_at or state.reset_at <= now:
+                return 0.0
+            if state.remaining <= self.reserve:
+                return state.reset_at - now
+            if state.limit and state.remaining > state.limit * self.spread_threshold:
+                return 0.0
+
+            interval = (state.reset_at - now) / (state.remaining - self.reserve)
+            return max(0.0, state.last_request_at + interval - now)
+
+    def wait(self, key):
+        delay = self.get_delay(key)
+        if delay > 0:
+            logging.info(f"Rate limit: waiting {delay:.1f}s")
+            time.sleep(delay)
+        self.mark_request(key)
+
+    def mark_request(self, key):
+        """Учесть отправленный запрос до прихода заголовков ответа."""
+        with self._lock:
+            state = self._get_state(key)
+            state.last_request_at = time.time()
+            if state.remaining:
+                state.remaining -= 1
+
+    def pace_client(self, client):
+        """Темп для клиента IRepositoryAPI по закэшированным заголовкам его последнего ответа."""
+        remaining, limit = client.get_rate_limiting()
+        self.update(client, remaining, limit, client.get_rate_limiting_reset())
+        self.wait(client)
+
+    def request(self, method: str, url: str, key, **kwargs) -> requests.Response:
+        """HTTP-запрос с учётом бюджета key и повтором после исчерпания лимита."""
+        for _ in range(RATE_LIMIT_MAX_RETRIES):
+            self.wait(key)
+            response = transport.request(method, url, **kwargs)
+            self.update_from_response(key, response)
+            if not is_rate_limited(response):
+                return response
+            logging.warning(f"Rate limit exceeded for {url}, retrying")
+        return response
+
+
+def is_rate_limited(response: requests.Response | httpx.Response) -> bool:
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        'Retry-After' in response.headers or response.headers.get('X-RateLimit-Remaining') == '0'
+    )
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+pacer = RequestPacer()
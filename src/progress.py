@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+
+from src.constants import PROGRESS_REFRESH_INTERVAL
+from src.http_transport import transport
+from src.utils import logger
+
+
+QUIET = 'quiet'
+SUMMARY = 'summary'
+VERBOSE = 'verbose'
+VERBOSITY_LEVELS = (QUIET, SUMMARY, VERBOSE)
+
+
+@dataclass
+class RepositoryProgress:
+    name: str
+    total: int | None = None
+    processed: int = 0
+    items: int = 0
+    requests: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    last_report: float = field(default_factory=time.monotonic)
+
+    def elapsed(self) -> float:
+        return max(time.monotonic() - self.started_at, 1e-9)
+
+    def rate(self) -> float:
+        return self.items / self.elapsed()
+
+    def eta(self) -> float | None:
+        if self.total is None or not self.processed:
+            return None
+        return max(self.total - self.processed, 0) * self.elapsed() / self.processed
+
+
+class ProgressReporter:
+    """
+    Отчёт о ходе выгрузки вместо вывода каждой строки в stdout.
+    quiet   -- только предупреждения и ошибки;
+    summary -- не чаще refresh_interval строка прогресса по репозиторию
+               (строк/сек, HTTP-запросов, ETA) и итог по репозиторию;
+    verbose -- как summary, плюс каждая выгруженная строка целиком.
+    Текущий репозиторий свой у каждого потока (см. --workers) и переходит в его async-задачи,
+    поэтому запросы обогащения тоже засчитываются своему репозиторию.
+    HTTP-запросы считает on_response -- хук общего транспорта (см. HttpTransport.add_response_hook).
+    """
+
+    def __init__(self, level: str = SUMMARY, refresh_interval: float = PROGRESS_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.total_items = 0
+        self.total_requests = 0
+        self._repository = ContextVar('progress_repository', default=None)
+        self._lock = threading.Lock()
+        self.set_level(level)
+
+    @property
+    def repository(self) -> RepositoryProgress | None:
+        return self._repository.get()
+
+    @repository.setter
+    def repository(self, value: RepositoryProgress | None):
+        self._repository.set(value)
+
+    def bind(self, func):
+        """func для пула потоков: его запросы засчитываются текущему репозиторию вызывающего потока."""
+        repository = self.repository
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            token = self._repository.set(repository)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._repository.reset(token)
+
+        return wrapper
+
+    def set_level(self, level: str):
+        if level not in VERBOSITY_LEVELS:
+            raise ValueError(f"Unknown verbosity level: {level}")
+        self.level = level
+        logging.getLogger().setLevel(logging.WARNING if level == QUIET else logging.INFO)
+
+    @property
+    def verbose(self) -> bool:
+        return self.level == VERBOSE
+
+    def start_repository(self, name: str, total: int | None = None):
+        self.finish_repository()
+        logger.log_title(name)
+        self.repository = RepositoryProgress(name=name, total=total)
+
+    def set_total(self, total: int | None):
+        """Сколько исходных объектов (коммитов, issues, ...) предстоит обработать в репозитории."""
+        if self.repository is not None:
+            self.repository.total = total
+
+    def advance(self, count: int = 1):
+        """Отметить обработанные исходные объекты (по ним считается ETA)."""
+        if self.repository is not None:
+            self.repository.processed += count
+
+    def add_item(self, row=None):
+        """Отметить записанную строку; сама строка форматируется только в verbose."""
+        with self._lock:
+            self.total_items += 1
+        if self.repository is not None:
+            self.repository.items += 1
+        if self.verbose and row is not None:
+            logging.info(f"{row}")
+        self._maybe_report()
+
+    def add_requests(self, count: int = 1):
+        repository = self.repository
+        with self._lock:
+            self.total_requests += count
+            if repository is not None:
+                repository.requests += count
+        self._maybe_report()
+
+    def on_response(self, response):
+        self.add_requests()
+
+    def finish_repository(self):
+        repository, self.repository = self.repository, None
+        if repository is None or self.level == QUIET:
+            return
+        logging.info(
+            f"{repository.name}: {repository.items} items in {repository.elapsed():.1f}s "
+            f"({repository.rate():.1f} items/s, {repository.requests} requests)"
+        )
+
+    def finish(self):
+        self.finish_repository()
+        if self.level != QUIET:
+            logging.info(f"Total: {self.total_items} items, {self.total_requests} requests")
+            self._report_transport()
+        self.total_items = 0
+        self.total_requests = 0
+
+    @staticmethod
+    def _report_transport():
+        if transport.request_counts:
+            hosts = ', '.join(f"{host}: {count}" for host, count in transport.request_counts.most_common())
+            logging.info(f"Requests by host: {hosts}")
+        if transport.cache is not None:
+            logging.info(f"HTTP cache: {transport.cache.hits} hits, {transport.cache.misses} misses")
+
+    def _maybe_report(self):
+        repository = self.repository
+        if self.level == QUIET or repository is None:
+            return
+        now = time.monotonic()
+        if now - repository.last_report < self.refresh_interval:
+            return
+        repository.last_report = now
+
+        message = f"{repository.name}: {repository.items} items, {repository.rate():.1f} items/s"
+        if repository.total is not None:
+            message += f", {repository.processed}/{repository.total} processed"
+        message += f", {repository.requests} requests"
+        eta = repository.eta()
+        if eta is not None:
+            message += f", ETA {eta:.0f}s"
+        logging.info(message)
+
+
+progress = ProgressReporter()
@@ -1,17 +1,20 @@
 import json
 from dataclasses import asdict
 from datetime import datetime
-from time import sleep
 from typing import Generator
 
 import pytz
-import requests
 
-from src.constants import EMPTY_FIELD, TIMEDELTA, TIMEZONE
-from src.git_logger import get_assignee_story
+from src.async_http import async_engine
+from src.constants import EMPTY_FIELD, TIMEZONE
+from src.git_logger import fetch_assignee_story
 from src.interface_wrapper import IRepositoryAPI, Repository
-from src.utils import logger
+from src.pacing import pacer
+from src.progress import progress
 from src.repo_dataclasses import PullRequestData
+from src.sinks import CSV_FORMAT, BufferedSink, open_sink
+from src.sync_state import SyncState
+from src.workers import process_repositories
 
 
 def get_related_issues(pull_request_number, repo_owner, repo_name, token):
@@ -53,8 +56,10 @@ def get_related_issues(pull_request_number, repo_owner, repo_name, token):
     }
 
     # Отправка запроса GraphQL
-    response = requests.post(
+    response = pacer.request(
+        'POST',
         "https://api.github.com/graphql",
+        access_token,
         headers=headers,
         data=json.dumps({"query": query}),
     )
@@ -84,11 +89,12 @@ def get_info(obj, attr):
 def log_repositories_pr(
     client: IRepositoryAPI,
     repository: Repository,
-    csv_name,
+    sink: BufferedSink,
     token,
     start,
     finish,
     log_comments=False,
+    sync_state: SyncState | None = None,
 ):
     def nvl(val):
         return val or EMPTY_FIELD
@@ -96,14 +102,38 @@ def log_repositories_pr(
     def get_info(obj, attr):
         return EMPTY_FIELD if obj is None else getattr(obj, attr)
 
-    pulls = client.get_pull_requests(repository)
-    for pull in pulls:
-        if (
-            pull.created_at.astimezone(pytz.timezone(TIMEZONE)) < start
-            or pull.created_at.astimezone(pytz.timezone(TIMEZONE)) > finish
-        ):
-            continue
-
+    mark = sync_state.get_mark('pull_requests', repository._id) if sync_state else None
+
+    def select_pulls():
+        pacer.pace_client(client)
+        pulls = client.iter_pull_requests(repository, since=mark.since if mark else None, comments=log_comments)
+        for pull in pulls:
+            progress.advance()
+            if (
+                pull.created_at.astimezone(pytz.timezone(TIMEZONE)) < start
+                or pull.created_at.astimezone(pytz.timezone(TIMEZONE)) > finish
+            ):
+                continue
+            if mark:
+                if not mark.is_new(pull.created_at, pull._id):
+                    continue
+                mark.add(pull.created_at, pull._id)
+            yield pull
+
+    def make_job(pull):
+        async def job(session):
+            return await fetch_assignee_story(session, pull, client, token, repository)
+
+        return job
+
+    # истории назначений запрашиваются конкурентно уже во время листинга,
+    # строки пишутся в порядке листинга: готовые раньше очереди ждут, пока завершится голова
+    jobs = ((pull, make_job(pull)) for pull in select_pulls())
+    for pull, assignee_story, error in async_engine.iter_ordered(jobs):
+        if error is not None:
+            raise error
+
+        pacer.pace_client(client)
         pr_data = PullRequestData(
             repository_name=repository.name,
             title=pull.title,
@@ -122,7 +152,7 @@ def log_repositories_pr(
             merged=pull.merged,
             source_branch=pull.head_ref,
             target_branch=pull.base_ref,
-            assignee_story=get_assignee_story(pull, client, token, repository),
+            assignee_story=assignee_story,
             related_issues=(
                 get_related_issues(pull._id, repository.owner, repository.name, token)
                 if pull.issue_url is not None
@@ -150,18 +180,19 @@ def log_repositories_pr(
                     )
                     comment_data = asdict(comment_data)
 
-                    logger.log_to_csv(csv_name, list(comment_data.keys()), comment_data)
-                    logger.log_to_stdout(comment_data)
+                    sink.write(comment_data)
+                    progress.add_item(comment_data)
             else:
                 base_pr_info = asdict(pr_data)
-                logger.log_to_csv(csv_name, list(base_pr_info.keys()), base_pr_info)
-                logger.log_to_stdout(base_pr_info)
+                sink.write(base_pr_info)
+                progress.add_item(base_pr_info)
         else:
             base_pr_info = asdict(pr_data)
-            logger.log_to_csv(csv_name, list(base_pr_info.keys()), base_pr_info)
-            logger.log_to_stdout(base_pr_info)
+            sink.write(base_pr_info)
+            progress.add_item(base_pr_info)
 
-        sleep(TIMEDELTA)
+    if sync_state:
+        sync_state.set_mark('pull_requests', repository._id, mark)
 
 
 def log_pull_requests(
@@ -171,27 +202,34 @@ def log_pull_requests(
     finish: datetime,
     fork_flag: bool,
     log_comments=False,
+    output_format: str = CSV_FORMAT,
+    workers: int = 1,
+    sync_state: SyncState | None = None,
 ):
-    info = asdict(PullRequestData())
-    logger.log_to_csv(csv_name, list(info.keys()))
-
-    for client, repo, token in binded_repos:
-        logger.log_title(repo.name)
+    def log_repository(client, repo, token, sink):
+        progress.start_repository(repo.name)
         log_repositories_pr(
-            client, repo, csv_name, token, start, finish, log_comments
+            client, repo, sink, token, start, finish, log_comments, sync_state
         )
         if fork_flag:
-            forked_repos = client.get_repo(repo._id).get_forks()
-            for forked_repo in forked_repos:
-                logger.log_title(f"FORKED: {forked_repo.name}")
+            for forked_repo in client.iter_forks(repo):
+                progress.start_repository(f"FORKED: {forked_repo.name}")
                 log_repositories_pr(
                     client,
                     forked_repo,
-                    csv_name,
+                    sink,
                     token,
                     start,
                     finish,
                     log_comments,
+                    sync_state,
                 )
-                sleep(TIMEDELTA)
-        sleep(TIMEDELTA)
+
+    try:
+        with open_sink(csv_name, PullRequestData, output_format, append=sync_state is not None) as sink:
+            process_repositories(binded_repos, sink, log_repository, workers, sync_state)
+    finally:
+        # отметки ставятся только за полностью выгруженные репозитории, их строки уже в файле
+        if sync_state:
+            sync_state.save()
+    progress.finish()
@@ -0,0 +1,305 @@
+import atexit
+import csv
+import os
+import signal
+import sys
+import threading
+import types
+import typing
+import weakref
+from abc import ABC, abstractmethod
+from dataclasses import fields, is_dataclass
+from functools import lru_cache
+from typing import Iterable
+
+from src.constants import (
+    ARROW_BATCH_SIZE,
+    ARROW_DICTIONARY_COLUMNS,
+    CSV_BUFFER_SIZE,
+)
+
+
+CSV_FORMAT = 'csv'
+PARQUET_FORMAT = 'parquet'
+ARROW_FORMAT = 'arrow'
+OUTPUT_FORMATS = (CSV_FORMAT, PARQUET_FORMAT, ARROW_FORMAT)
+
+_open_sinks = weakref.WeakSet()
+_signal_handlers_installed = False
+
+
+@lru_cache(maxsize=None)
+def get_field_names(data_class) -> tuple[str, ...]:
+    """Имена полей dataclass'а строки в порядке объявления (вычисляются один раз)."""
+    return tuple(f.name for f in fields(data_class))
+
+
+@lru_cache(maxsize=None)
+def get_field_types(data_class) -> tuple[type, ...]:
+    """Типы полей dataclass'а строки; `str | None` сводится к `str`."""
+    result = []
+    for f in fields(data_class):
+        field_type = f.type
+        if isinstance(field_type, types.UnionType) or typing.get_origin(field_type) is typing.Union:
+            field_type = next(t for t in typing.get_args(field_type) if t is not type(None))
+        result.append(field_type)
+    return tuple(result)
+
+
+@lru_cache(maxsize=None)
+def get_header(field_names: tuple[str, ...]) -> tuple[str, ...]:
+    """Заголовок таблицы: ключи строки с '_' заменённым на пробел."""
+    return tuple(name.replace('_', ' ') for name in field_names)
+
+
+class BufferedSink(ABC):
+    """
+    Долгоживущий приёмник строк одного режима.
+    Файл открывается один раз, строки копятся в буфере и пишутся пачками
+    по buffer_size. Буфер сбрасывается при close(), выходе из интерпретатора
+    и по SIGTERM. Наследники реализуют _write_rows/_flush_file/_close_file.
+    """
+
+    def __init__(self, file_name: str, field_names: Iterable[str], buffer_size: int):
+        self.file_name = file_name
+        self.field_names = tuple(field_names)
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._closed = False
+        self._lock = threading.RLock()
+
+    def _register(self):
+        _open_sinks.add(self)
+        _install_signal_handlers()
+
+    def write(self, row: dict):
+        if not isinstance(row, dict):
+            raise TypeError(f"row has type {type(row)} but must be dict")
+
+        values = [row.get(name, '') for name in self.field_names]
+        with self._lock:
+            self._buffer.append(values)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_buffer()
+
+    def flush(self):
+        with self._lock:
+            self._flush_buffer()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_buffer()
+            self._close_file()
+            self._closed = True
+        _open_sinks.discard(self)
+
+    def _flush_buffer(self):
+        if self._closed:
+            return
+        if self._buffer:
+            self._write_rows(self._buffer)
+            self._buffer = []
+        self._flush_file()
+
+    @abstractmethod
+    def _write_rows(self, rows: list[list]):
+        pass
+
+    def _flush_file(self):
+        pass
+
+    @abstractmethod
+    def _close_file(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+class CsvSink(BufferedSink):
+    def __init__(
+        self,
+        csv_name: str,
+        field_names: Iterable[str],
+        buffer_size: int = CSV_BUFFER_SIZE,
+        append: bool = False,
+    ):
+        super().__init__(csv_name, field_names, buffer_size)
+        append = append and os.path.exists(csv_name) and os.path.getsize(csv_name) > 0
+        self._file = open(csv_name, 'a' if append else 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        if not append:
+            self._writer.writerow(get_header(self.field_names))
+            self._file.flush()
+        self._register()
+
+    def _write_rows(self, rows):
+        self._writer.writerows(rows)
+
+    def _flush_file(self):
+        self._file.flush()
+
+    def _close_file(self):
+        self._file.close()
+
+
+class ArrowSink(BufferedSink):
+    """
+    Колоночный вывод: буфер превращается в RecordBatch и пишется
+    в Parquet (row group на пачку) или в поток Arrow IPC.
+    Повторяющиеся колонки (имя репозитория, логины, ветки, статусы)
+    хранятся со словарным кодированием.
+    """
+
+    def __init__(
+        self,
+        file_name: str,
+        field_names: Iterable[str],
+        field_types: Iterable[type] | None = None,
+        output_format: str = PARQUET_FORMAT,
+        buffer_size: int = ARROW_BATCH_SIZE,
+        append: bool = False,
+    ):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                f"pyarrow is required for '--format {output_format}', install it with 'pip install pyarrow'"
+            ) from e
+
+        super().__init__(file_name, field_names, buffer_size)
+        self._pa = pa
+        self.field_types = (
+            tuple(field_types) if field_types is not None else (str,) * len(self.field_names)
+        )
+        self.schema = self._build_schema()
+
+        # Parquet и поток IPC нельзя дописать на месте: старые пачки читаются и пишутся заново
+        existing = None
+        if append and os.path.exists(file_name) and os.path.getsize(file_name) > 0:
+            # читаем в память целиком: pyarrow может отображать файл, который сейчас будет перезаписан
+            with open(file_name, 'rb') as file:
+                data = pa.py_buffer(file.read())
+            if output_format == PARQUET_FORMAT:
+                existing = pq.read_table(pa.BufferReader(data))
+            else:
+                with pa.ipc.open_stream(data) as reader:
+                    existing = reader.read_all()
+
+        if output_format == PARQUET_FORMAT:
+            self._writer = pq.ParquetWriter(file_name, self.schema)
+        elif output_format == ARROW_FORMAT:
+            # Потоковый IPC (в отличие от файлового) допускает разные словари в разных пачках
+            self._writer = pa.ipc.new_stream(file_name, self.schema)
+        else:
+            raise ValueError(f"Unknown columnar format: {output_format}")
+        if existing is not None:
+            for batch in existing.cast(self.schema).to_batches():
+                self._writer.write_batch(batch)
+        self._register()
+
+    def _build_schema(self):
+        pa = self._pa
+        arrow_types = {int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+        schema_fields = []
+        for header, field_type in zip(get_header(self.field_names), self.field_types):
+            if _is_dictionary_column(header):
+                arrow_type = pa.dictionary(pa.int32(), pa.string())
+            else:
+                arrow_type = arrow_types.get(field_type, pa.string())
+            schema_fields.append(pa.field(header, arrow_type))
+        return pa.schema(schema_fields)
+
+    def _write_rows(self, rows):
+        pa = self._pa
+        columns = []
+        for index, (field_type, schema_field) in enumerate(zip(self.field_types, self.schema)):
+            values = [_coerce(row[index], field_type) for row in rows]
+            if pa.types.is_dictionary(schema_field.type):
+                columns.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                columns.append(pa.array(values, type=schema_field.type))
+        self._writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=self.schema))
+
+    def _close_file(self):
+        self._writer.close()
+
+
+def open_sink(file_name: str, row_schema, output_format: str = CSV_FORMAT, append: bool = False) -> BufferedSink:
+    """
+    Создаёт приёмник строк нужного формата.
+    row_schema -- dataclass строки либо список имён колонок.
+    append -- дописывать строки к существующему файлу (инкрементальный режим).
+    """
+    if is_dataclass(row_schema):
+        field_names = get_field_names(row_schema)
+        field_types = get_field_types(row_schema)
+    else:
+        field_names = tuple(row_schema)
+        field_types = None
+
+    if output_format == CSV_FORMAT:
+        return CsvSink(file_name, field_names, append=append)
+    if output_format in (PARQUET_FORMAT, ARROW_FORMAT):
+        return ArrowSink(file_name, field_names, field_types, output_format, append=append)
+    raise ValueError(f"Unknown output format: {output_format}")
+
+
+def _is_dictionary_column(header: str) -> bool:
+    return header in ARROW_DICTIONARY_COLUMNS or header.endswith(' login')
+
+
+TRUE_STRINGS = ('true', 'yes', '1')
+FALSE_STRINGS = ('false', 'no', '0')
+
+
+def _coerce(value, field_type: type):
+    """
+    Значение строки к типу столбца. Что не приводится (EMPTY_FIELD в числовом столбце,
+    непонятная строка в логическом), пишется как null, а не прерывает выгрузку.
+    """
+    if value is None:
+        return None
+    if field_type is bool:
+        if not isinstance(value, str):
+            return bool(value)
+        value = value.strip().lower()
+        if value in TRUE_STRINGS:
+            return True
+        if value in FALSE_STRINGS:
+            return False
+        return None
+    if field_type in (int, float):
+        try:
+            return field_type(value)
+        except (TypeError, ValueError):
+            return None
+    return str(value)
+
+
+def flush_all_sinks():
+    for sink in list(_open_sinks):
+        sink.flush()
+
+
+def _handle_signal(signum, frame):
+    flush_all_sinks()
+    sys.exit(128 + signum)
+
+
+def _install_signal_handlers():
+    global _signal_handlers_installed
+    if _signal_handlers_installed:
+        return
+    _signal_handlers_installed = True
+
+    atexit.register(flush_all_sinks)
+    # обработчики сигналов можно ставить только из главного потока
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _handle_signal)
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+
+
+@dataclass
+class HighWaterMark:
+    """
+    Момент последнего выгруженного элемента и id элементов с этим же моментом.
+    is_new сравнивает с отметкой на момент создания: add за время выгрузки её не сдвигает,
+    поэтому порядок элементов (от новых к старым или наоборот) не важен.
+    """
+
+    since: datetime | None = None
+    ids: set = field(default_factory=set)
+    _start: tuple = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._start = (self.since, frozenset(self.ids))
+
+    def is_new(self, moment: datetime, item_id) -> bool:
+        since, ids = self._start
+        if since is None or moment > since:
+            return True
+        return moment == since and item_id not in ids
+
+    def is_older(self, moment: datetime) -> bool:
+        """Раньше отметки на начало выгрузки: в списке от новых к старым дальше новых элементов нет."""
+        since = self._start[0]
+        return since is not None and moment < since
+
+    def add(self, moment: datetime, item_id):
+        if self.since is None or moment > self.since:
+            self.since = moment
+            self.ids = {item_id}
+        elif moment == self.since:
+            self.ids.add(item_id)
+
+
+class SyncState:
+    """
+    Отметки инкрементальной выгрузки (--incremental) по сущностям и репозиториям.
+    Следующий запуск запрашивает только данные новее отметки и дописывает их в выходной файл.
+    Файл сохраняется после закрытия выходного файла, чтобы отметки не опережали данные.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = threading.local()
+        self._marks = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                self._marks = json.load(file)
+
+    def get_mark(self, entity: str, repo_id: str) -> HighWaterMark:
+        with self._lock:
+            mark = self._marks.get(entity, {}).get(repo_id)
+        if not mark:
+            return HighWaterMark()
+        return HighWaterMark(datetime.fromisoformat(mark['since']), set(mark['ids']))
+
+    def set_mark(self, entity: str, repo_id: str, mark: HighWaterMark):
+        if mark.since is None:
+            return
+        value = {
+            'since': mark.since.isoformat(),
+            'ids': sorted(mark.ids, key=str),
+        }
+        pending = getattr(self._pending, 'marks', None)
+        if pending is not None:
+            pending[entity, repo_id] = value
+            return
+        with self._lock:
+            self._marks.setdefault(entity, {})[repo_id] = value
+
+    @contextmanager
+    def transaction(self):
+        """
+        Отметки, поставленные в этом потоке внутри блока, применяются только если блок
+        завершился без ошибки: репозиторий, выгрузка которого упала, в следующий раз выгружается заново.
+        """
+        self._pending.marks = {}
+        try:
+            yield
+            pending = self._pending.marks
+        finally:
+            del self._pending.marks
+        with self._lock:
+            for (entity, repo_id), value in pending.items():
+                self._marks.setdefault(entity, {})[repo_id] = value
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._marks, ensure_ascii=False, indent=2)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(data)
+        os.replace(tmp_path, self.path)
+
+
+def get_state_path(out_path: str) -> str:
+    return f'{out_path}.state.json'
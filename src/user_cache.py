@@ -0,0 +1,83 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Callable
+
+from src.constants import USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL
+from src.interface_wrapper import User
+
+
+class UserCache:
+    """
+    Профили пользователей по ключу (хост API и id): LRU в памяти на max_entries записей
+    и, после set_store, sqlite с ttl, общий для всех режимов и запусков.
+    Профиль загружается не чаще раза за ttl, сколько бы коммитов, issues и комментариев у автора ни было.
+    """
+
+    def __init__(self, max_entries: int = USER_CACHE_MAX_ENTRIES, ttl: float = USER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: OrderedDict[str, tuple[User, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    def set_store(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute('CREATE TABLE IF NOT EXISTS users (key TEXT PRIMARY KEY, data TEXT, stored_at REAL)')
+        db.execute('DELETE FROM users WHERE stored_at < ?', (time.time() - self.ttl,))
+        db.commit()
+        with self._lock:
+            self._db = db
+
+    def get(self, key: str) -> User | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] + self.ttl >= now:
+                self._memory.move_to_end(key)
+                return entry[0]
+            if self._db is None:
+                return None
+            row = self._db.execute('SELECT data, stored_at FROM users WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] + self.ttl < now:
+                return None
+            user = User(**json.loads(row[0]))
+            self._remember(key, user, row[1])
+        return user
+
+    def put(self, key: str, user: User):
+        now = time.time()
+        with self._lock:
+            self._remember(key, user, now)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO users VALUES (?, ?, ?)', (key, json.dumps(asdict(user)), now)
+                )
+                self._db.commit()
+
+    def get_or_load(self, key: str, load: Callable[[], User]) -> User:
+        user = self.get(key)
+        if user is None:
+            user = load()
+            self.put(key, user)
+        return user
+
+    def _remember(self, key: str, user: User, stored_at: float):
+        self._memory[key] = (user, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+user_cache = UserCache()
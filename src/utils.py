@@ -1,6 +1,6 @@
-import csv
 from datetime import datetime
 from functools import wraps
+import inspect
 import traceback
 import re
 
@@ -17,7 +17,6 @@ logging.basicConfig(
 
 
 class logger:
-    # TODO: отключение вывода в stdout
     @staticmethod
     def log_title(title: str, title_len: int = TITLE_LEN):
         final_len = max(
@@ -27,22 +26,6 @@ class logger:
         formatted = f"{SIDE_WHITE_SPACES * ' ' + title + ' ' * SIDE_WHITE_SPACES:=^{final_len}}"
         logging.info(formatted)
 
-    @staticmethod
-    def log_to_csv(csv_name: str, field_names: tuple[str], row: dict | None = None):
-        field_names = list(map(lambda x: x.replace('_', ' '), field_names))
-        if row is not None:
-            row = {k.replace('_', ' '): v for k, v in row.items()}
-        if isinstance(row, dict):
-            with open(csv_name, 'a', encoding='utf-8', newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=field_names)
-                writer.writerow(row)
-        elif row is None:
-            with open(csv_name, 'w', encoding='utf-8', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(field_names)
-        else:
-            raise TypeError(f"row has type {type(row)} but must be [ dict | None ]")
-
     @staticmethod
     def log_to_stdout(info: dict):
         logging.info(f"{info}")
@@ -82,18 +65,35 @@ def log_exceptions(default_return=None, message="", print_stacktrace=True):
     """
     Декоратор обработки ошибок для методов класса.
     Логирует ошибки и возвращает default_return при исключении.
+    У генераторов ошибка логируется и пробрасывается дальше: оборванный поток нельзя
+    выдавать за полный (иначе --incremental сдвинет отметку за невыгруженные элементы).
     """
     def decorator(func):
+        def log_error(args, e):
+            class_name = args[0].__class__.__name__ if args else ""
+            logging.error(f"{class_name=}")
+            logging.error(f"{message} {func.__name__}: {e}")
+            if print_stacktrace:
+                logging.error(traceback.format_exc())
+
+        if inspect.isgeneratorfunction(func):
+            # у генератора ошибка возникает при итерации: отданные элементы уже у вызывающего,
+            # поэтому default_return не подставить -- ошибка пробрасывается
+            @wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                try:
+                    yield from func(*args, **kwargs)
+                except Exception as e:
+                    log_error(args, e)
+                    raise
+            return generator_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             try:
                 return func(*args, **kwargs)
             except Exception as e:
-                class_name = args[0].__class__.__name__ if args else ""
-                logging.error(f"{class_name=}")
-                logging.error(f"{message} {func.__name__}: {e}")
-                if print_stacktrace:
-                    logging.error(traceback.format_exc())
+                log_error(args, e)
                 return default_return
         return wrapper
     return decorator
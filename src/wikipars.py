@@ -1,98 +1,145 @@
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator
 
 from git import Repo, exc
 
-from src.constants import WIKI_FIELDNAMES
+from src.constants import WIKI_FIELDNAMES, WIKI_SYNC_WORKERS
+from src.progress import progress
+from src.sinks import CSV_FORMAT, open_sink
 from src.utils import logger
 
+ACTIVITY = {
+    "A": "Страница добавлена",
+    "M": "Страница изменена",
+    "D": "Страница удалена",
+    "R": "Страница переименована",
+}
+# eng_activity = {"A" : "Page added", "M" : "Page modified", "D" : "Page deleted", "R": "Page renamed"}
 
-def wikiparser(repositories: list[str], path_drepo: str, csv_name: str):
-    logger.log_to_csv(csv_name, WIKI_FIELDNAMES)
+# каждая ревизия начинается строкой "\0hexsha\0parents\0author name\0author email\0committed date"
+WIKI_LOG_FORMAT = '%x00%H%x00%P%x00%an%x00%ae%x00%ct'
 
-    error_repos = []
 
-    data_changes = []
-    for name_rep in repositories:
-        # Проверяем, есть ли репозиторий в папке
-        dir_path = path_drepo + "/" + name_rep
-        if os.path.exists(dir_path):
-            # Обновляем репозиторий
-            if len(os.listdir(dir_path)) > 0:
-                repo = Repo(dir_path)
-                repo.remotes.origin.pull()
-            else:
-                os.rmdir(dir_path)
-                error_repos.append(name_rep)
-                continue
-        else:
-            # Клонируем репозиторий в папку
-            dir_path = path_drepo + "/" + name_rep
-            os.makedirs(dir_path, exist_ok=True)
-            repo_url = f"git@github.com:{name_rep}.wiki.git"
-            try:
-                repo = Repo.clone_from(repo_url, dir_path)
-            except exc.GitCommandError:
-                os.rmdir(dir_path)
+@dataclass
+class WikiRevision:
+    hexsha: str
+    is_root: bool
+    author_name: str
+    author_email: str
+    committed_date: int
+    pages: list[str] = field(default_factory=list)
+    change_types: list[str] = field(default_factory=list)
+    added_lines: int = 0
+    deleted_lines: int = 0
+
+
+def iter_wiki_log(repo: Repo) -> Iterator[WikiRevision]:
+    """
+    Ревизии вики со всех веток за один проход git log: изменённые страницы и тип изменения
+    из --raw (относительно первого родителя, с поиском переименований), строки из --numstat.
+    Вывод читается потоком, в памяти только текущая ревизия.
+    """
+    process = repo.git(c='core.quotePath=false').log(
+        '--all', '--root', '--diff-merges=first-parent', '-M', '--raw', '--numstat',
+        f'--format={WIKI_LOG_FORMAT}', as_process=True,
+    )
+    revision = None
+    for raw_line in process.stdout:
+        line = raw_line.decode('utf-8', errors='replace').rstrip('\n')
+        if line.startswith('\0'):
+            if revision is not None:
+                yield revision
+            hexsha, parents, author_name, author_email, committed_date = line[1:].split('\0')
+            revision = WikiRevision(hexsha, not parents, author_name, author_email, int(committed_date))
+        elif line.startswith(':'):
+            # ":100644 100644 <sha> <sha> R100\told path\tnew path"
+            meta, *paths = line.split('\t')
+            revision.change_types.append(meta.split()[-1][0])
+            revision.pages.append(paths[-1])
+        elif line:
+            # "added\tdeleted\tpath", у бинарных файлов "-\t-\tpath"
+            added, deleted, _ = line.split('\t', 2)
+            revision.added_lines += int(added) if added.isdigit() else 0
+            revision.deleted_lines += int(deleted) if deleted.isdigit() else 0
+    if revision is not None:
+        yield revision
+    process.wait()
+
+
+def get_revision_data(name_rep: str, revision: WikiRevision) -> dict:
+    data_commit = dict()
+    data_commit["repository name"] = name_rep
+    data_commit["author name"] = revision.author_name
+    if revision.author_email and len(revision.author_email.split('+')) > 1:
+        data_commit["author login"] = revision.author_email.split('+')[1].split(
+            '@users'
+        )[0]
+    else:
+        data_commit["author login"] = "empty login"
+    data_commit["datetime"] = time.strftime(
+        "%Y-%m-%d %H:%M:%S%z", time.gmtime(revision.committed_date)
+    )
+    data_commit["page"] = ';'.join(revision.pages)
+    if revision.is_root:
+        # Первый коммит
+        data_commit["action"] = ACTIVITY["A"]
+    else:
+        data_commit["action"] = ';'.join(
+            ACTIVITY.get(change_type, ACTIVITY["M"]) for change_type in revision.change_types
+        )
+    data_commit["revision id"] = revision.hexsha
+    data_commit["added lines"] = revision.added_lines
+    data_commit["deleted lines"] = revision.deleted_lines
+    return data_commit
+
+
+def sync_wiki_mirror(name_rep: str, path_drepo: str) -> Repo | None:
+    """
+    Голое зеркало <name_rep>.wiki.git в path_drepo: клонируется один раз, дальше обновляется git fetch.
+    None -- у репозитория нет вики или она недоступна.
+    """
+    dir_path = f"{path_drepo}/{name_rep}.wiki.git"
+    try:
+        if os.path.isdir(dir_path) and os.listdir(dir_path):
+            repo = Repo(dir_path)
+            repo.git.fetch('--prune', 'origin')
+            return repo
+        return Repo.clone_from(f"git@github.com:{name_rep}.wiki.git", dir_path, mirror=True)
+    except (exc.GitCommandError, exc.InvalidGitRepositoryError):
+        return None
+
+
+def wikiparser(
+    repositories: list[str],
+    path_drepo: str,
+    csv_name: str,
+    output_format: str = CSV_FORMAT,
+    workers: int = WIKI_SYNC_WORKERS,
+):
+    error_repos = []
+    # зеркала обновляются параллельно, история выгружается в порядке списка репозиториев
+    with open_sink(csv_name, WIKI_FIELDNAMES, output_format) as sink, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        mirrors = executor.map(lambda name_rep: sync_wiki_mirror(name_rep, path_drepo), repositories)
+        for name_rep, repo in zip(repositories, mirrors):
+            if repo is None:
                 error_repos.append(name_rep)
                 continue
 
-        logger.log_title(name_rep)
-        # Вывод изменений
-        # Хэш пустого дерева для сравнения с первым коммитом. Способ был найден здесь:
-        # https://stackoverflow.com/questions/33916648/get-the-diff-details-of-first-commit-in-gitpython
-        EMPTY_TREE_SHA = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
-        wiki_commits = repo.iter_commits(all=True)
-        activity = {
-            "A": "Страница добавлена",
-            "M": "Страница изменена",
-            "D": "Страница удалена",
-            "R": "Страница переименована",
-        }
-        # eng_activity = {"A" : "Page added", "M" : "Page modified", "D" : "Page deleted", "R": "Page renamed"}
-        for commit in wiki_commits:
-            data_commit = dict()
-            parent = commit.parents
-            data_commit["repository name"] = name_rep
-            data_commit["author name"] = commit.author
-            if commit.author.email and len(commit.author.email.split('+')) > 1:
-                data_commit["author login"] = commit.author.email.split('+')[1].split(
-                    '@users'
-                )[0]
-            else:
-                data_commit["author login"] = "empty login"
-            data_commit["datetime"] = time.strftime(
-                "%Y-%m-%d %H:%M:%S%z", time.gmtime(commit.committed_date)
-            )
-            if parent:
-                data_commit["page"] = ';'.join(
-                    [diff.b_path for diff in parent[0].diff(commit)]
-                )
-                data_commit["action"] = ';'.join(
-                    [activity[diff.change_type] for diff in parent[0].diff(commit)]
-                )
-            else:
-                # Первый коммит
-                data_commit["page"] = ';'.join(
-                    [diff.b_path for diff in commit.diff(EMPTY_TREE_SHA)]
-                )
-                data_commit["action"] = ';'.join([activity["A"]])
-            data_commit["revision id"] = commit
-            data_commit["added lines"] = commit.stats.total["insertions"]
-            data_commit["deleted lines"] = commit.stats.total["deletions"]
-
-            for fieldname in data_commit:
-                print(fieldname, data_commit[fieldname], sep=': ')
-
-            logger.log_sep()
-            logger.log_to_csv(csv_name, data_commit)
-
-            data_changes.append(data_commit)
+            progress.start_repository(name_rep)
+            for revision in iter_wiki_log(repo):
+                data_commit = get_revision_data(name_rep, revision)
+                sink.write(data_commit)
+                progress.add_item(data_commit)
+            repo.close()
+
+    progress.finish()
 
     # Вывод репозиториев, с которыми возникли ошибки
     if error_repos:
         logger.log_title("! Проблемные репозитории !")
         for rep in error_repos:
-            logger.log_to_stdout(rep)
-
-    return data_changes
+            logger.log_warning(rep)
@@ -0,0 +1,133 @@
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Generator
+
+from src.interface_wrapper import IRepositoryAPI, Repository
+from src.progress import progress
+from src.sinks import BufferedSink
+from src.sync_state import SyncState
+from src.utils import logger
+
+
+class RepositoryBuffer:
+    """Строки одного репозитория, накопленные воркером до записи в общий приёмник."""
+
+    def __init__(self):
+        self.rows = []
+
+    def write(self, row: dict):
+        self.rows.append(row)
+
+
+def collect_repository_rows(
+    process_repository: Callable[[IRepositoryAPI, Repository, str, BufferedSink], None],
+    client: IRepositoryAPI,
+    repo: Repository,
+    token: str,
+    sync_state: SyncState | None = None,
+) -> list[dict] | None:
+    """
+    Строки одного репозитория либо None, если его обработка упала. Ошибка логируется,
+    а уже собранные строки и отметки --incremental репозитория отбрасываются:
+    иначе следующий инкрементальный запуск дописал бы их повторно.
+    """
+    buffer = RepositoryBuffer()
+    try:
+        with sync_state.transaction() if sync_state else nullcontext():
+            process_repository(client, repo, token, buffer)
+    except Exception as e:
+        logger.log_error(f"Failed to process repository {repo.name}: {e}")
+        logger.log_error(traceback.format_exc())
+        return None
+    return buffer.rows
+
+
+def process_repositories(
+    binded_repos: Generator[tuple[IRepositoryAPI, Repository, str], None, None],
+    sink: BufferedSink,
+    process_repository: Callable[[IRepositoryAPI, Repository, str, BufferedSink], None],
+    workers: int = 1,
+    sync_state: SyncState | None = None,
+):
+    """
+    Вызывает process_repository(client, repo, token, sink) для каждого репозитория.
+    Ошибка одного репозитория не прерывает остальные (см. collect_repository_rows),
+    упавшие репозитории перечисляются в конце.
+    При workers > 1 репозитории обрабатываются параллельно: каждый воркер сам берёт
+    следующий репозиторий из binded_repos (так клиент привязывается к потоку воркера,
+    см. get_next_binded_repo), пишет строки в свой буфер, а в sink буферы попадают
+    из основного потока строго в порядке списка репозиториев.
+    """
+    failed_repos = []
+    if workers <= 1:
+        for client, repo, token in binded_repos:
+            rows = collect_repository_rows(process_repository, client, repo, token, sync_state)
+            if rows is None:
+                failed_repos.append(repo.name)
+                continue
+            for row in rows:
+                sink.write(row)
+        log_failed_repositories(failed_repos)
+        return
+
+    numbered_repos = enumerate(binded_repos)
+    repos_lock = threading.Lock()
+    results = queue.Queue()
+    errors = []
+
+    def worker():
+        try:
+            while True:
+                with repos_lock:
+                    item = next(numbered_repos, None)
+                if item is None:
+                    return
+
+                index, (client, repo, token) = item
+                try:
+                    rows = collect_repository_rows(process_repository, client, repo, token, sync_state)
+                finally:
+                    progress.finish_repository()
+                if rows is None:
+                    failed_repos.append(repo.name)
+                results.put((index, rows or []))
+        except Exception as e:
+            # упал сам список репозиториев: дальше брать нечего
+            logger.log_error(f"Failed to get the next repository: {e}")
+            errors.append(e)
+        finally:
+            results.put(None)
+
+    pending = {}
+    next_index = 0
+    running = workers
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='repo-worker') as executor:
+        for _ in range(workers):
+            executor.submit(worker)
+
+        while running:
+            result = results.get()
+            if result is None:
+                running -= 1
+                continue
+
+            index, rows = result
+            pending[index] = rows
+            while next_index in pending:
+                for row in pending.pop(next_index):
+                    sink.write(row)
+                next_index += 1
+
+    log_failed_repositories(failed_repos)
+    if errors:
+        raise errors[0]
+
+
+def log_failed_repositories(failed_repos: list[str]):
+    if failed_repos:
+        logger.log_title("! Проблемные репозитории !")
+        for repo_name in failed_repos:
+            logger.log_warning(repo_name)
@@ -1,10 +1,12 @@
 from dataclasses import asdict, dataclass
-from time import sleep
 from typing import Generator
 
-from src.constants import TIMEDELTA
 from src.interface_wrapper import IRepositoryAPI, Repository
-from src.utils import logger
+from src.pacing import pacer
+from src.progress import progress
+from src.sinks import CSV_FORMAT, BufferedSink, open_sink
+from src.sync_state import SyncState
+from src.workers import process_repositories
 
 
 @dataclass(kw_only=True, frozen=True)
@@ -24,11 +26,19 @@ class WorkflowRunData:
 
 
 def log_repository_workflow_runs(
-    client: IRepositoryAPI, repository: Repository, csv_name: str
+    client: IRepositoryAPI, repository: Repository, sink: BufferedSink, sync_state: SyncState | None = None
 ):
-    workflow_runs = client.get_workflow_runs(repository)
+    mark = sync_state.get_mark('workflow_runs', repository._id) if sync_state else None
+
+    pacer.pace_client(client)
+    workflow_runs = client.iter_workflow_runs(repository, since=mark.since if mark else None)
 
     for run in workflow_runs:
+        progress.advance()
+        if mark:
+            if not mark.is_new(run.created_at, run.url):
+                continue
+            mark.add(run.created_at, run.url)
         total_duration = (run.updated_at - run.created_at).total_seconds()
 
         workflow_run_data = WorkflowRunData(
@@ -48,26 +58,35 @@ def log_repository_workflow_runs(
 
         info_dict = asdict(workflow_run_data)
 
-        logger.log_to_csv(csv_name, list(info_dict.keys()), info_dict)
-        logger.log_to_stdout(info_dict)
+        sink.write(info_dict)
+        progress.add_item(info_dict)
 
-        sleep(TIMEDELTA)
+    if sync_state:
+        sync_state.set_mark('workflow_runs', repository._id, mark)
 
 
 def log_workflow_runs(
     binded_repos: Generator[tuple[IRepositoryAPI, Repository, str], None, None],
     csv_name: str,
     fork_flag: bool,
+    output_format: str = CSV_FORMAT,
+    workers: int = 1,
+    sync_state: SyncState | None = None,
 ):
-    info = asdict(WorkflowRunData())
-    logger.log_to_csv(csv_name, list(info.keys()))
-
-    for client, repo, token in binded_repos:
-        logger.log_title(repo.name)
-        log_repository_workflow_runs(client, repo, csv_name)
+    def log_repository(client, repo, token, sink):
+        progress.start_repository(repo.name)
+        log_repository_workflow_runs(client, repo, sink, sync_state)
 
         if fork_flag:
-            for forked_repo in client.get_forks(repo):
-                logger.log_title(f"FORKED: {forked_repo.name}")
-                log_repository_workflow_runs(client, forked_repo, csv_name)
-                sleep(TIMEDELTA)
+            for forked_repo in client.iter_forks(repo):
+                progress.start_repository(f"FORKED: {forked_repo.name}")
+                log_repository_workflow_runs(client, forked_repo, sink, sync_state)
+
+    try:
+        with open_sink(csv_name, WorkflowRunData, output_format, append=sync_state is not None) as sink:
+            process_repositories(binded_repos, sink, log_repository, workers, sync_state)
+    finally:
+        # отметки ставятся только за полностью выгруженные репозитории, их строки уже в файле
+        if sync_state:
+            sync_state.save()
+    progress.finish()
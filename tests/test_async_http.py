@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from src.async_http import AsyncHttpEngine, AsyncHttpSession
+
+
+def make_job(delay, value):
+    async def job(session):
+        await asyncio.sleep(delay)
+        return value
+
+    return job
+
+
+class TestAsyncHttpEngine(unittest.TestCase):
+    def make_engine(self, **kwargs):
+        engine = AsyncHttpEngine(**kwargs)
+        self.addCleanup(engine.close)
+        return engine
+
+    def test_results_come_in_completion_order(self):
+        jobs = [
+            ('slow', make_job(0.05, 1)),
+            ('fast', make_job(0.0, 2)),
+            ('middle', make_job(0.02, 3)),
+        ]
+
+        results = list(self.make_engine(concurrency=3).iter_completed(jobs))
+
+        self.assertEqual([tag for tag, _, _ in results], ['fast', 'middle', 'slow'])
+        self.assertEqual({tag: result for tag, result, _ in results}, {'fast': 2, 'middle': 3, 'slow': 1})
+
+    def test_ordered_results_keep_jobs_order(self):
+        jobs = [('slow', make_job(0.05, 1)), ('fast', make_job(0.0, 2)), ('middle', make_job(0.02, 3))]
+
+        results = list(self.make_engine(concurrency=3).iter_ordered(jobs))
+
+        self.assertEqual([(tag, result) for tag, result, _ in results], [('slow', 1), ('fast', 2), ('middle', 3)])
+
+    def test_job_error_is_returned(self):
+        async def failing(session):
+            raise RuntimeError('boom')
+
+        results = list(self.make_engine().iter_completed([('ok', make_job(0.0, 1)), ('bad', failing)]))
+
+        errors = {tag: error for tag, _, error in results}
+        self.assertIsNone(errors['ok'])
+        self.assertIsInstance(errors['bad'], RuntimeError)
+
+    def test_early_exit_cancels_remaining_jobs(self):
+        jobs = [('fast', make_job(0.0, 1)), ('slow', make_job(10, 2))]
+
+        for tag, _, _ in self.make_engine().iter_completed(jobs):
+            break
+
+        self.assertEqual(tag, 'fast')
+
+    def test_jobs_are_taken_lazily(self):
+        taken = []
+
+        def jobs():
+            for index in range(10):
+                taken.append(index)
+                yield index, make_job(0.0, index)
+
+        engine = self.make_engine(concurrency=1)
+        results = engine.iter_completed(jobs())
+        first = next(results)
+
+        self.assertLessEqual(len(taken), engine.max_pending + 1)
+        tags = [first[0]] + [tag for tag, _, _ in results]
+        self.assertEqual(sorted(tags), list(range(10)))
+
+    def test_client_is_shared_between_calls_until_close(self):
+        engine = self.make_engine()
+        with patch('src.async_http.transport.async_client', side_effect=httpx.AsyncClient) as async_client:
+            list(engine.iter_completed([('first', make_job(0.0, 1))]))
+            list(engine.iter_completed([('second', make_job(0.0, 2))]))
+            self.assertEqual(async_client.call_count, 1)
+
+            engine.close()
+            list(engine.iter_completed([('third', make_job(0.0, 3))]))
+            self.assertEqual(async_client.call_count, 2)
+
+
+class TestAsyncHttpSession(unittest.TestCase):
+    def test_rate_limited_request_is_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(429, headers={'Retry-After': '0'})
+            return httpx.Response(200, json={'ok': True})
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                session = AsyncHttpSession(client, concurrency=2)
+                return await session.request('GET', 'https://example.com', 'test-session-key')
+
+        response = asyncio.run(run())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from src.git_logger import Clients
+
+
+class FakeClient:
+    def __init__(self, remaining, limit=5000, reset_at=0):
+        self.remaining = remaining
+        self.limit = limit
+        self.reset_at = reset_at
+        self.calls = 0
+
+    def get_rate_limiting(self):
+        self.calls += 1
+        return self.remaining, self.limit
+
+    def get_rate_limiting_reset(self):
+        return self.reset_at
+
+
+def make_clients(*fake_clients):
+    fake_by_token = {f'token{index}': client for index, client in enumerate(fake_clients)}
+    with patch('src.git_logger.login', side_effect=lambda token, base_url: fake_by_token[token]):
+        return Clients(list(fake_by_token))
+
+
+class TestClients(unittest.TestCase):
+    def test_picks_client_with_most_remaining(self):
+        low, high = FakeClient(100), FakeClient(4000)
+        clients = make_clients(low, high)
+
+        self.assertEqual(clients.get_next_client(), (high, 'token1'))
+
+        high.remaining = 50
+        self.assertEqual(clients.get_next_client(), (low, 'token0'))
+
+    def test_only_used_clients_are_refreshed(self):
+        fake_clients = [FakeClient(1000 + index) for index in range(5)]
+        clients = make_clients(*fake_clients)
+
+        clients.get_next_client()
+        clients.get_next_client()
+
+        self.assertEqual([client.calls for client in fake_clients], [1, 1, 1, 1, 2])
+
+    def test_reset_window_restores_budget(self):
+        exhausted = FakeClient(0, reset_at=time.time() + 0.05)
+        fresh = FakeClient(10)
+        clients = make_clients(exhausted, fresh)
+
+        self.assertIs(clients.get_next_client()[0], fresh)
+        time.sleep(0.1)
+        self.assertIs(clients.get_next_client()[0], exhausted)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+from dataclasses import replace
+from datetime import datetime, timezone
+
+from src.commits_parser import log_repository_commits
+from src.interface_wrapper import Branch, Commit, Repository, User
+from src.sync_state import HighWaterMark, SyncState
+from src.utils import log_exceptions, parse_time
+from src.workers import RepositoryBuffer
+
+
+AUTHOR = User(_id=1, login='dev', username='Dev', email='', html_url='', node_id='', type='', bio='', site_admin=False)
+REPOSITORY = Repository(
+    _id='owner/repo', name='repo', url='', default_branch=Branch(name='main', last_commit=None), owner=AUTHOR
+)
+
+
+def make_commit(sha, day):
+    return Commit(
+        _id=sha,
+        message='',
+        author=AUTHOR,
+        date=datetime(2024, 5, day, 12, tzinfo=timezone.utc),
+        files=['a.py'],
+        additions=1,
+        deletions=0,
+    )
+
+
+class FakeClient:
+    def __init__(self, commits, branch_commits=None):
+        self.commits = commits
+        self.branch_commits = branch_commits or {}
+        self.calls = []
+        self.enriched = []
+        self.rate_limit_checks = 0
+
+    def iter_commits(self, repo, files=True, since=None, until=None, sha=None, known_shas=()):
+        self.calls.append({'since': since, 'until': until, 'sha': sha})
+        for commit in self.branch_commits.get(sha, self.commits):
+            if commit._id not in known_shas:
+                self.enriched.append(commit._id)
+            yield commit
+
+    def get_branch_names(self, repo):
+        return list(self.branch_commits)
+
+    def get_rate_limiting(self):
+        self.rate_limit_checks += 1
+        return 5000, 5000
+
+    def get_rate_limiting_reset(self):
+        return 0
+
+
+class TestLogRepositoryCommits(unittest.TestCase):
+    def test_date_window_and_branch_are_sent_to_server(self):
+        client = FakeClient([make_commit('b', 3), make_commit('a', 1)])
+        start = parse_time(['2024/05/02'])
+        finish = parse_time(['2024/05/10'])
+        sink = RepositoryBuffer()
+
+        log_repository_commits(client, REPOSITORY, sink, start, finish, None)
+
+        self.assertEqual(client.calls, [{'since': start, 'until': finish, 'sha': 'main'}])
+        self.assertEqual([row['commit_id'] for row in sink.rows], ['b'])
+
+    def test_requests_are_paced_per_commit(self):
+        client = FakeClient([make_commit('c', 4), make_commit('b', 3), make_commit('a', 2)])
+
+        log_repository_commits(
+            client, REPOSITORY, RepositoryBuffer(), parse_time(['2024/05/01']), parse_time(['2400/01/01']), None
+        )
+
+        # перед листингом и перед каждым коммитом, который дозапрашивается отдельно
+        self.assertEqual(client.rate_limit_checks, 4)
+
+    def test_open_ended_finish_is_not_sent(self):
+        client = FakeClient([])
+
+        log_repository_commits(
+            client, REPOSITORY, RepositoryBuffer(), parse_time(['2000/01/01']), parse_time(['2400/01/01']), 'dev'
+        )
+
+        self.assertEqual(client.calls[0]['until'], None)
+        self.assertEqual(client.calls[0]['sha'], 'dev')
+
+    def test_shared_commits_are_enriched_once_per_repository(self):
+        shared, feature = make_commit('shared', 1), make_commit('feature', 2)
+        client = FakeClient([], branch_commits={'main': [shared], 'feature': [feature, shared]})
+        sink = RepositoryBuffer()
+
+        log_repository_commits(
+            client, REPOSITORY, sink, parse_time(['2000/01/01']), parse_time(['2400/01/01']), 'all'
+        )
+
+        self.assertEqual(client.enriched, ['shared', 'feature'])
+        self.assertEqual(
+            [(row['commit_id'], row['branch']) for row in sink.rows],
+            [('shared', 'main'), ('feature', 'feature'), ('shared', 'feature')],
+        )
+        self.assertEqual(sink.rows[0]['changed_files'], sink.rows[2]['changed_files'])
+
+    def test_commit_skipped_by_mark_is_not_enriched_again(self):
+        shared, feature = make_commit('shared', 1), make_commit('feature', 2)
+        client = FakeClient([], branch_commits={'main': [shared], 'feature': [feature, shared]})
+        sink = RepositoryBuffer()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            sync_state = SyncState(os.path.join(tmp, 'out.csv.state.json'))
+            sync_state.set_mark('commits', 'owner/repo@main', HighWaterMark(shared.date, {'shared'}))
+            log_repository_commits(
+                client, REPOSITORY, sink, parse_time(['2000/01/01']), parse_time(['2400/01/01']), 'all', sync_state
+            )
+
+        self.assertEqual(client.enriched, ['shared', 'feature'])
+        self.assertEqual(
+            [(row['commit_id'], row['branch']) for row in sink.rows], [('feature', 'feature'), ('shared', 'feature')]
+        )
+
+    def test_mark_follows_committer_date(self):
+        # перенесён rebase-ом: автор -- 1 мая, коммиттер -- 3 мая, после прошлой выгрузки 2 мая
+        rebased = replace(make_commit('rebased', 1), committed_at=datetime(2024, 5, 3, tzinfo=timezone.utc))
+        sink = RepositoryBuffer()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            sync_state = SyncState(os.path.join(tmp, 'out.csv.state.json'))
+            sync_state.set_mark(
+                'commits', 'owner/repo@main', HighWaterMark(datetime(2024, 5, 2, tzinfo=timezone.utc), {'old'})
+            )
+            log_repository_commits(
+                FakeClient([rebased]), REPOSITORY, sink, parse_time(['2000/01/01']), parse_time(['2400/01/01']),
+                None, sync_state,
+            )
+
+            self.assertEqual([row['commit_id'] for row in sink.rows], ['rebased'])
+            self.assertEqual(sync_state.get_mark('commits', 'owner/repo@main').since, rebased.committed_at)
+
+    def test_broken_listing_is_raised_and_keeps_mark(self):
+        class BrokenClient(FakeClient):
+            @log_exceptions(message="Failed to get commits")
+            def iter_commits(self, repo, **kwargs):
+                yield make_commit('newest', 3)
+                raise ConnectionError('page 2')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            sync_state = SyncState(os.path.join(tmp, 'out.csv.state.json'))
+            with self.assertRaises(ConnectionError), self.assertLogs(level='ERROR'):
+                log_repository_commits(
+                    BrokenClient([]), REPOSITORY, RepositoryBuffer(), parse_time(['2000/01/01']),
+                    parse_time(['2400/01/01']), None, sync_state,
+                )
+
+            self.assertIsNone(sync_state.get_mark('commits', 'owner/repo@main').since)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from src.contributors_parser import log_repository_contributors
+from src.interface_wrapper import Branch, ContributorStats, Repository, User
+from src.workers import RepositoryBuffer
+
+
+def make_user(login):
+    return User(
+        _id=1, login=login, username=login.title(), email='', html_url='', node_id='', type='User', bio='',
+        site_admin=False,
+    )
+
+
+REPOSITORY = Repository(
+    _id='owner/repo', name='repo', url='', default_branch=Branch(name='main', last_commit=None),
+    owner=make_user('owner'),
+)
+
+
+class FakeClient:
+    def __init__(self):
+        self.permission_calls = []
+
+    def get_contributors_stats(self, repo):
+        return [ContributorStats(make_user('owner'), 5), ContributorStats(make_user('outsider'), 1)]
+
+    def get_collaborator_permissions(self, repo):
+        return {'owner': 'admin'}
+
+    def get_collaborator_permission(self, repo, user):
+        self.permission_calls.append(user.login)
+        return 'read'
+
+    def get_rate_limiting(self):
+        return 5000, 5000
+
+    def get_rate_limiting_reset(self):
+        return 0
+
+
+class TestLogRepositoryContributors(unittest.TestCase):
+    def test_permissions_come_from_collaborators_list(self):
+        client = FakeClient()
+        sink = RepositoryBuffer()
+
+        log_repository_contributors(client, REPOSITORY, sink)
+
+        self.assertEqual(
+            [(row['login'], row['permissions'], row['total_commits']) for row in sink.rows],
+            [('owner', 'admin', 5), ('outsider', 'read', 1)],
+        )
+        # поштучно -- только контрибьютор, которого нет среди коллабораторов
+        self.assertEqual(client.permission_calls, ['outsider'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+
+from src.async_http import AsyncHttpEngine
+from src.ForgejoRepoAPI import ForgejoRepoAPI
+from src.interface_wrapper import Branch, Issue, Repository, User
+
+
+OWNER = User(_id=1, login='owner', username='', email='', html_url='', node_id='', type='', bio='', site_admin=False)
+REPOSITORY = Repository(
+    _id='owner/repo', name='repo', url='', default_branch=Branch(name='main', last_commit=None), owner=OWNER
+)
+
+
+def make_settings(page_size):
+    return SimpleNamespace(
+        get_general_api_settings=lambda: SimpleNamespace(max_response_items=page_size)
+    )
+
+
+def make_author(login):
+    return SimpleNamespace(login=login, full_name=login.title(), email=f'{login}@example.com', html_url='', id=1)
+
+
+class FakeRepositoryClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def repo_get_all_commits(self, owner, repo, page, **kwargs):
+        self.calls.append((page, kwargs))
+        return self.pages[page - 1] if page <= len(self.pages) else []
+
+
+class TestForgejoContributorsStats(unittest.TestCase):
+    def test_commits_are_counted_per_author_without_heavy_fields(self):
+        dev, lead = make_author('dev'), make_author('lead')
+        repository = FakeRepositoryClient([
+            [SimpleNamespace(author=dev), SimpleNamespace(author=None)],
+            [SimpleNamespace(author=lead), SimpleNamespace(author=dev)],
+        ])
+        api = ForgejoRepoAPI(SimpleNamespace(repository=repository, settings=make_settings(2)))
+
+        stats = api.get_contributors_stats(REPOSITORY)
+
+        self.assertEqual([(s.user.login, s.total_commits) for s in stats], [('dev', 2), ('lead', 1)])
+        self.assertEqual([page for page, _ in repository.calls], [1, 2, 3])
+        self.assertEqual(
+            repository.calls[0][1], {'stat': False, 'verification': False, 'files': False, 'limit': 2}
+        )
+
+
+class FakeIssueClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.pages_requested = 0
+
+    def get_repo_comments(self, owner, repo, page, **kwargs):
+        self.pages_requested += 1
+        return self.pages[page - 1] if page <= len(self.pages) else []
+
+
+def make_comment(body, issue_number):
+    return SimpleNamespace(
+        body=body,
+        created_at=None,
+        user=make_author('dev'),
+        issue_url=f'https://codeberg.org/owner/repo/issues/{issue_number}',
+        pull_request_url='',
+    )
+
+
+def make_issue(number):
+    return Issue(
+        _id=100 + number, number=number, title='', state='open', created_at=None, closed_at=None, body='',
+        user=None, closed_by=None, labels=[], milestone=None,
+    )
+
+
+class TestForgejoCommentsIndex(unittest.TestCase):
+    def test_repository_comments_are_listed_once_and_grouped_by_issue(self):
+        issue_client = FakeIssueClient([
+            [make_comment('a', 1), make_comment('b', 2)],
+            [make_comment('c', 1)],
+        ])
+        api = ForgejoRepoAPI(SimpleNamespace(issue=issue_client, settings=make_settings(2)))
+
+        first = api.get_comments(REPOSITORY, make_issue(1))
+        second = api.get_comments(REPOSITORY, make_issue(2))
+        third = api.get_comments(REPOSITORY, make_issue(3))
+
+        self.assertEqual([c.body for c in first], ['a', 'c'])
+        self.assertEqual([c.body for c in second], ['b'])
+        self.assertEqual(third, [])
+        # вторая страница неполная -- больше страниц не запрашивается
+        self.assertEqual(issue_client.pages_requested, 2)
+
+
+USER_JSON = {'login': 'lead', 'full_name': 'Lead', 'email': '', 'html_url': '', 'id': 2}
+
+
+def make_pull(number, merged):
+    branch = SimpleNamespace(ref='main')
+    return SimpleNamespace(
+        number=number, title='', user=make_author('dev'), state='closed', merged=merged,
+        created_at=datetime(2024, 5, 1, tzinfo=timezone.utc), head=branch, base=branch, labels=[], milestone=None,
+    )
+
+
+class FakeForgejoClient:
+    def __init__(self, pulls):
+        self.repository = SimpleNamespace(repo_list_pull_requests=self.list_pull_requests)
+        self.issue = SimpleNamespace(get_repo_comments=lambda owner, repo, page, **kwargs: [])
+        self.settings = make_settings(50)
+        self._client_wrapper = SimpleNamespace(
+            get_base_url=lambda: 'https://forgejo.test/api/v1',
+            get_headers=lambda: {'Authorization': 'token secret'},
+        )
+        self.pulls = pulls
+
+    def list_pull_requests(self, owner, repo, page, **kwargs):
+        return self.pulls if page == 1 else []
+
+
+class TestForgejoPullRequestsEnrichment(unittest.TestCase):
+    def setUp(self):
+        self.paths = []
+
+    def handler(self, request):
+        self.paths.append(request.url.path.removeprefix('/api/v1/repos/owner/repo/pulls/'))
+        assert request.headers['Authorization'] == 'token secret'
+        path = self.paths[-1]
+        if path == '1':
+            return httpx.Response(200, json={'merged_by': USER_JSON})
+        if path.endswith('/files'):
+            return httpx.Response(200, json=[{'filename': f'{path[0]}.py'}])
+        if path == '2/reviews':
+            return httpx.Response(200, json=[])
+        if path.endswith('/reviews'):
+            return httpx.Response(200, json=[{'id': 7, 'comments_count': 1}, {'id': 8, 'comments_count': 0}])
+        if path.endswith('/reviews/7/comments'):
+            return httpx.Response(200, json=[{'body': 'nit', 'created_at': '2024-05-02T00:00:00Z', 'user': USER_JSON}])
+        return httpx.Response(404)
+
+    def get_pulls(self, **kwargs):
+        api = ForgejoRepoAPI(FakeForgejoClient([make_pull(1, merged=True), make_pull(2, merged=False)]))
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        engine = AsyncHttpEngine()
+        self.addCleanup(engine.close)
+        with (
+            patch('src.ForgejoRepoAPI.async_engine', engine),
+            patch('src.async_http.transport.async_client', return_value=client),
+        ):
+            pulls = api.get_pull_requests(REPOSITORY, **kwargs)
+        return api, pulls
+
+    def test_details_and_files_are_fetched_per_pull(self):
+        api, pulls = self.get_pulls()
+
+        self.assertEqual(pulls[0].merged_by.login, 'lead')
+        self.assertIsNone(pulls[1].merged_by)
+        self.assertEqual([p.files for p in pulls], [['1.py'], ['2.py']])
+        self.assertEqual(sorted(self.paths), ['1', '1/files', '2/files'])
+
+    def test_since_keeps_pulls_created_at_the_mark(self):
+        api, pulls = self.get_pulls(since=datetime(2024, 5, 1, tzinfo=timezone.utc), files=False)
+
+        self.assertEqual([p._id for p in pulls], [1, 2])
+
+    def test_only_requested_data_is_fetched(self):
+        api, pulls = self.get_pulls(files=False, comments=True)
+
+        self.assertEqual(sorted(self.paths), ['1', '1/reviews', '1/reviews/7/comments', '2/reviews'])
+        self.assertEqual([c.body for c in api.get_comments(REPOSITORY, pulls[0])], ['nit'])
+        self.assertEqual(api.get_comments(REPOSITORY, pulls[1]), [])
+
+
+def make_referencing_pull(number, body):
+    return SimpleNamespace(number=number, body=body, html_url=f'https://codeberg.org/owner/repo/pulls/{number}')
+
+
+class TestForgejoPullRequestReferences(unittest.TestCase):
+    def test_references_are_indexed_once_per_repository(self):
+        pulls = [
+            make_referencing_pull(5, 'Fixes #1, see also !2 and other/repo#3'),
+            make_referencing_pull(6, 'closes #1 (issue#4)'),
+        ]
+        pull_pages = []
+        repository = SimpleNamespace(
+            repo_list_pull_requests=lambda owner, repo, page, **kwargs: pull_pages.append(page) or
+            (pulls if page == 1 else [])
+        )
+        issue_client = FakeIssueClient([[make_comment('done in !6, not in #9', 2)]])
+        api = ForgejoRepoAPI(SimpleNamespace(repository=repository, issue=issue_client, settings=make_settings(50)))
+
+        references = api.get_pull_request_references(REPOSITORY)
+        api.get_pull_request_references(REPOSITORY)
+
+        self.assertEqual(references, {
+            1: ['https://codeberg.org/owner/repo/pulls/5', 'https://codeberg.org/owner/repo/pulls/6'],
+            2: ['https://codeberg.org/owner/repo/pulls/5', 'https://codeberg.org/owner/repo/pulls/6'],
+        })
+        self.assertEqual(pull_pages, [1])
+        self.assertEqual(issue_client.pages_requested, 1)
+
+
+class FakeRawPages:
+    def __init__(self, items):
+        self.items = items
+
+    def list_items(self, page, limit):
+        return SimpleNamespace(
+            data=self.items[(page - 1) * limit:page * limit], headers={'x-total-count': str(len(self.items))}
+        )
+
+
+class FakePagedClient:
+    def __init__(self, items):
+        self.items = items
+        self.with_raw_response = FakeRawPages(items)
+        self.pages = []
+
+    def list_items(self, page, limit):
+        self.pages.append(page)
+        return self.items[(page - 1) * limit:page * limit]
+
+
+class TestForgejoPagination(unittest.TestCase):
+    def test_remaining_pages_are_fetched_in_parallel_and_kept_in_order(self):
+        items = list(range(95))
+        paged = FakePagedClient(items)
+        api = ForgejoRepoAPI(SimpleNamespace(settings=make_settings(10)))
+
+        result = list(api.iter_all_data_from_pages(paged.list_items))
+
+        self.assertEqual(result, items)
+        # первая страница -- с X-Total-Count через raw-ответ, остальные 9 -- без лишней пустой страницы
+        self.assertEqual(sorted(paged.pages), list(range(2, 11)))
+
+    def test_unavailable_settings_fall_back_once(self):
+        calls = []
+
+        def get_general_api_settings():
+            calls.append(1)
+            raise RuntimeError('404')
+
+        paged = FakePagedClient(list(range(120)))
+        settings = SimpleNamespace(get_general_api_settings=get_general_api_settings)
+        api = ForgejoRepoAPI(SimpleNamespace(settings=settings))
+
+        with self.assertLogs(level='WARNING'):
+            result = list(api.iter_all_data_from_pages(paged.list_items))
+
+        self.assertEqual(result, list(range(120)))
+        self.assertEqual(api.get_max_page_size(), 50)
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
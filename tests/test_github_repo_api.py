@@ -0,0 +1,95 @@
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from src.GitHubRepoAPI import GitHubRepoAPI
+from src.interface_wrapper import Branch, Repository, User
+
+
+OWNER = User(_id=1, login='owner', username='', email='', html_url='', node_id='', type='', bio='', site_admin=False)
+REPOSITORY = Repository(
+    _id='owner/repo', name='repo', url='', default_branch=Branch(name='main', last_commit=None), owner=OWNER
+)
+MOMENT = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def make_commit(sha):
+    # почта коммита не привязана к аккаунту GitHub: author у такого коммита None
+    signature = SimpleNamespace(date=MOMENT)
+    return SimpleNamespace(
+        sha=sha,
+        author=None,
+        commit=SimpleNamespace(message='fix', author=signature, committer=signature),
+        files=[SimpleNamespace(filename='README.md')],
+        stats=SimpleNamespace(additions=1, deletions=0),
+    )
+
+
+class FakePaginatedList(list):
+    @property
+    def totalCount(self):
+        return len(self)
+
+
+class FakeRepo:
+    def __init__(self, commits=(), branch_names=()):
+        self.commits = commits
+        self.branch_names = branch_names
+        self.commit_requests = 0
+
+    def get_commits(self, **kwargs):
+        return self.commits
+
+    def get_workflow_runs(self, created):
+        self.created = created
+        return FakePaginatedList()
+
+    def get_branches(self):
+        return [SimpleNamespace(name=name, commit=SimpleNamespace(sha=name)) for name in self.branch_names]
+
+    def get_commit(self, sha):
+        self.commit_requests += 1
+        return make_commit(sha)
+
+
+class FakeGithub:
+    def __init__(self, repo):
+        self.repo = repo
+
+    def get_user(self):
+        return SimpleNamespace(login='me')
+
+    def get_repo(self, full_name, lazy=False):
+        return self.repo
+
+
+class TestGitHubRepoAPI(unittest.TestCase):
+    def test_commit_without_github_account(self):
+        api = GitHubRepoAPI(FakeGithub(FakeRepo([make_commit('c1')])))
+
+        commits = list(api.iter_commits(REPOSITORY))
+
+        self.assertEqual([c._id for c in commits], ['c1'])
+        self.assertIsNone(commits[0].author)
+        self.assertEqual(commits[0].files, ['README.md'])
+
+    def test_branch_names_without_head_commits(self):
+        repo = FakeRepo(branch_names=['main', 'feature'])
+        api = GitHubRepoAPI(FakeGithub(repo))
+
+        self.assertEqual(api.get_branch_names(REPOSITORY), ['main', 'feature'])
+        self.assertEqual(repo.commit_requests, 0)
+        self.assertEqual([b.name for b in api.get_branches(REPOSITORY)], ['main', 'feature'])
+        self.assertEqual(repo.commit_requests, 2)
+
+    def test_workflow_runs_since_includes_the_mark_second(self):
+        repo = FakeRepo()
+        api = GitHubRepoAPI(FakeGithub(repo))
+
+        list(api.iter_workflow_runs(REPOSITORY, since=MOMENT))
+
+        self.assertEqual(repo.created, '>=2024-05-01T12:00:00+00:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch
+
+from src.graphql.commits_parser import log_repository_commits_by_graphql
+from src.interface_wrapper import Branch, Repository, User
+from src.utils import parse_time
+from src.workers import RepositoryBuffer
+
+
+OWNER = User(_id=1, login='owner', username='', email='', html_url='', node_id='', type='', bio='', site_admin=False)
+REPOSITORY = Repository(
+    _id='owner/repo', name='repo', url='', default_branch=Branch(name='main', last_commit=None), owner=OWNER
+)
+
+
+def make_node(oid, day):
+    return {
+        'oid': oid,
+        'authoredDate': f'2024-05-0{day}T12:00:00Z',
+        'committedDate': f'2024-05-0{day}T12:00:00Z',
+        'additions': 10,
+        'deletions': 2,
+        'author': {'name': 'Dev', 'email': 'dev@example.com', 'user': {'login': 'dev'}},
+    }
+
+
+def make_history_page(nodes, end_cursor=None):
+    return {
+        'repository': {
+            'ref': {
+                'target': {
+                    'history': {
+                        'totalCount': 3,
+                        'pageInfo': {'hasNextPage': end_cursor is not None, 'endCursor': end_cursor},
+                        'nodes': nodes,
+                    }
+                }
+            }
+        }
+    }
+
+
+class FakeGraphQL:
+    def __init__(self, sink=None):
+        self.history_calls = []
+        self.sink = sink
+        self.written_before = []
+
+    def __call__(self, query, variables, token):
+        if 'refs(' in query:
+            return {'repository': {'refs': {
+                'pageInfo': {'hasNextPage': False, 'endCursor': None},
+                'nodes': [{'name': 'main'}, {'name': 'feature'}],
+            }}}
+
+        self.history_calls.append((variables['ref'], variables['after']))
+        if self.sink is not None:
+            self.written_before.append(len(self.sink.rows))
+        if variables['ref'] == 'refs/heads/main':
+            if variables['after'] is None:
+                return make_history_page([make_node('c2', 2)], end_cursor='cursor')
+            return make_history_page([make_node('c1', 1)])
+        return make_history_page([make_node('c3', 3), make_node('c2', 2)])
+
+
+class TestLogRepositoryCommitsByGraphql(unittest.TestCase):
+    def test_history_is_paged_and_shared_commits_reused(self):
+        fake = FakeGraphQL()
+        sink = RepositoryBuffer()
+
+        with patch('src.graphql.commits_parser.run_graphql_query', fake):
+            log_repository_commits_by_graphql(
+                REPOSITORY, 'token', sink, parse_time(['2000/01/01']), parse_time(['2400/01/01']), 'all'
+            )
+
+        self.assertEqual(
+            fake.history_calls,
+            [('refs/heads/main', None), ('refs/heads/main', 'cursor'), ('refs/heads/feature', None)],
+        )
+        self.assertEqual(
+            [(row['commit_id'], row['branch']) for row in sink.rows],
+            [('c2', 'main'), ('c1', 'main'), ('c3', 'feature'), ('c2', 'feature')],
+        )
+        self.assertEqual(sink.rows[0]['additions'], 10)
+        self.assertEqual(sink.rows[0]['author_login'], 'dev')
+        self.assertEqual(sink.rows[0]['date_and_time'], '2024-05-02T15:00:00+03:00')
+
+    def test_rows_written_as_pages_arrive(self):
+        sink = RepositoryBuffer()
+        fake = FakeGraphQL(sink)
+
+        with patch('src.graphql.commits_parser.run_graphql_query', fake):
+            log_repository_commits_by_graphql(
+                REPOSITORY, 'token', sink, parse_time(['2000/01/01']), parse_time(['2400/01/01']), 'all'
+            )
+
+        self.assertEqual(fake.written_before, [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
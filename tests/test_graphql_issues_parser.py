@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import patch
+
+from src.graphql.issues_parser import log_repository_issues_by_graphql
+from src.interface_wrapper import Branch, Repository, User
+from src.utils import parse_time
+from src.workers import RepositoryBuffer
+
+
+OWNER = User(_id=1, login='owner', username='', email='', html_url='', node_id='', type='', bio='', site_admin=False)
+REPOSITORY = Repository(
+    _id='owner/repo', name='repo', url='', default_branch=Branch(name='main', last_commit=None), owner=OWNER
+)
+AUTHOR = {'login': 'dev', 'name': 'Dev', 'email': 'dev@example.com'}
+
+
+def make_page(nodes, end_cursor=None):
+    return {'pageInfo': {'hasNextPage': end_cursor is not None, 'endCursor': end_cursor}, 'nodes': nodes}
+
+
+def make_comment(body):
+    return {'body': body, 'createdAt': '2024-05-03T00:00:00Z', 'author': AUTHOR}
+
+
+def make_issue(number, day, comments, timeline):
+    return {
+        'number': number,
+        'title': f'Issue {number}',
+        'state': 'OPEN',
+        'body': '',
+        'createdAt': f'2024-05-0{day}T00:00:00Z',
+        'closedAt': None,
+        'author': AUTHOR,
+        'labels': {'nodes': [{'name': 'bug'}]},
+        'milestone': None,
+        'comments': comments,
+        'timelineItems': timeline,
+    }
+
+
+ASSIGNED = {
+    '__typename': 'AssignedEvent',
+    'createdAt': '2024-05-02T00:00:00Z',
+    'actor': {'login': 'lead'},
+    'assignee': {'login': 'dev'},
+}
+CONNECTED = {'__typename': 'ConnectedEvent', 'subject': {'url': 'https://github.com/owner/repo/pull/7'}}
+
+
+class FakeGraphQL:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, query, variables, token):
+        if 'GetIssueConnections' in query:
+            self.calls.append(
+                ('connections', variables['number'], variables['withComments'], variables['withTimeline'])
+            )
+            return {'repository': {'issue': {'comments': make_page([make_comment('second')])}}}
+
+        self.calls.append(('issues', variables['after']))
+        issues = [
+            make_issue(2, 2, make_page([make_comment('first')], end_cursor='c'), make_page([ASSIGNED, CONNECTED])),
+            make_issue(1, 1, make_page([]), make_page([])),
+        ]
+        return {'repository': {'issues': {'totalCount': 2, **make_page(issues)}}}
+
+
+class TestLogRepositoryIssuesByGraphql(unittest.TestCase):
+    def test_issues_page_with_overflowing_comments(self):
+        fake = FakeGraphQL()
+        sink = RepositoryBuffer()
+
+        with patch('src.graphql.issues_parser.run_graphql_query', fake):
+            log_repository_issues_by_graphql(
+                REPOSITORY, 'token', sink, parse_time(['2000/01/01']), parse_time(['2400/01/01'])
+            )
+
+        self.assertEqual(fake.calls, [('issues', None), ('connections', 2, True, False)])
+        self.assertEqual(
+            [(row['number'], row['comment_body']) for row in sink.rows],
+            [(2, 'first'), (2, 'second'), (1, '')],
+        )
+        self.assertEqual(sink.rows[0]['assignee_story'], '2024-05-02T00:00:00Z: lead -> dev; ')
+        self.assertEqual(sink.rows[0]['connected_pull_requests'], 'https://github.com/owner/repo/pull/7')
+        self.assertEqual(sink.rows[0]['state'], 'open')
+        self.assertEqual(sink.rows[2]['connected_pull_requests'], 'Empty field')
+
+    def test_older_issues_stop_paging(self):
+        fake = FakeGraphQL()
+        sink = RepositoryBuffer()
+
+        with patch('src.graphql.issues_parser.run_graphql_query', fake):
+            log_repository_issues_by_graphql(
+                REPOSITORY, 'token', sink, parse_time(['2024/05/01', '12:00:00']), parse_time(['2400/01/01'])
+            )
+
+        self.assertEqual({row['number'] for row in sink.rows}, {2})
+
+
+if __name__ == '__main__':
+    unittest.main()
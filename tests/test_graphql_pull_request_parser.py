@@ -0,0 +1,155 @@
+import os
+import tempfile
+import threading
+import unittest
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from src.graphql.pull_request_parser import log_pull_requests_by_graphql
+from src.interface_wrapper import Branch, Repository, User
+from src.sinks import CSV_FORMAT
+from src.sync_state import HighWaterMark, SyncState
+from src.workers import RepositoryBuffer
+
+
+OWNER = User(_id=1, login='owner', username='', email='', html_url='', node_id='', type='', bio='', site_admin=False)
+
+
+def make_repository(name):
+    return Repository(
+        _id=f'owner/{name}', name=name, url='', default_branch=Branch(name='main', last_commit=None), owner=OWNER
+    )
+
+
+def make_pull(number):
+    return {
+        'title': f'PR {number}',
+        'number': number,
+        'state': 'OPEN',
+        'createdAt': '2024-05-01T00:00:00Z',
+        'author': {'login': 'dev', 'name': 'Dev', 'email': ''},
+        'baseRef': None,
+        'headRef': None,
+        'changedFiles': 1,
+        'additions': 1,
+        'deletions': 0,
+        'mergedAt': None,
+        'mergedBy': None,
+        'assignees': {'nodes': []},
+        'labels': {'nodes': []},
+    }
+
+
+def make_repo_data(name, numbers, end_cursor=None):
+    return {
+        'nameWithOwner': f'owner/{name}',
+        'pullRequests': {
+            'totalCount': 2,
+            'pageInfo': {'hasNextPage': end_cursor is not None, 'endCursor': end_cursor},
+            'nodes': [make_pull(number) for number in numbers],
+        },
+    }
+
+
+class FakeGraphQL:
+    def __init__(self):
+        self.calls = []
+        self.tokens = []
+
+    def __call__(self, query, variables, token, allow_partial=False):
+        if 'GetPRDataBatch' in query:
+            repos = [variables[f'repo{i}'] for i in range(len(variables) // 2)]
+            self.calls.append(('batch', repos))
+            # у 'big' PR не поместились в первую страницу, 'gone' недоступен -- его алиас null
+            return {
+                f'r{i}': None if name == 'gone' else make_repo_data(
+                    name, [1], end_cursor='cursor' if name.startswith('big') else None
+                )
+                for i, name in enumerate(repos)
+            }
+
+        self.calls.append(('repo', variables['repo'], variables['after']))
+        self.tokens.append((token, threading.current_thread().name))
+        return {'repository': make_repo_data(variables['repo'], [2])}
+
+
+class TestLogPullRequestsByGraphql(unittest.TestCase):
+    def test_small_repositories_share_one_request(self):
+        fake = FakeGraphQL()
+        sink = RepositoryBuffer()
+        repos = [(None, make_repository(name), 'token') for name in ('a', 'big', 'c')]
+
+        with (
+            patch('src.graphql.pull_request_parser.run_graphql_query', fake),
+            patch('src.graphql.pull_request_parser.get_batch_size', return_value=2),
+            patch('src.graphql.pull_request_parser.open_sink', return_value=nullcontext(sink)),
+        ):
+            log_pull_requests_by_graphql(repos, 'out.csv', CSV_FORMAT)
+
+        self.assertEqual(
+            fake.calls,
+            [('batch', ['a', 'big']), ('repo', 'big', 'cursor'), ('batch', ['c'])],
+        )
+        self.assertEqual(
+            [(row['repository_name'], row['id']) for row in sink.rows],
+            [('owner/a', 1), ('owner/big', 1), ('owner/big', 2), ('owner/c', 1)],
+        )
+
+    def test_unavailable_repository_in_batch_is_requested_alone(self):
+        fake = FakeGraphQL()
+        sink = RepositoryBuffer()
+        repos = [(None, make_repository(name), 'token') for name in ('a', 'gone')]
+
+        with (
+            patch('src.graphql.pull_request_parser.run_graphql_query', fake),
+            patch('src.graphql.pull_request_parser.open_sink', return_value=nullcontext(sink)),
+        ):
+            log_pull_requests_by_graphql(repos, 'out.csv', CSV_FORMAT)
+
+        self.assertEqual(fake.calls, [('batch', ['a', 'gone']), ('repo', 'gone', None)])
+        self.assertEqual([row['repository_name'] for row in sink.rows], ['owner/a', 'owner/gone'])
+
+    def test_incremental_appends_only_new_pull_requests(self):
+        fake = FakeGraphQL()
+        sink = RepositoryBuffer()
+        repos = [(None, make_repository(name), 'token') for name in ('a', 'big')]
+        created_at = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            sync_state = SyncState(os.path.join(tmp, 'out.csv.state.json'))
+            sync_state.set_mark('pull_requests', 'owner/big', HighWaterMark(created_at, {1}))
+            with (
+                patch('src.graphql.pull_request_parser.run_graphql_query', fake),
+                patch('src.graphql.pull_request_parser.open_sink', return_value=nullcontext(sink)) as open_sink,
+            ):
+                log_pull_requests_by_graphql(repos, 'out.csv', CSV_FORMAT, sync_state=sync_state)
+
+            self.assertTrue(open_sink.call_args.kwargs['append'])
+            self.assertEqual(
+                [(row['repository_name'], row['id']) for row in sink.rows], [('owner/a', 1), ('owner/big', 2)]
+            )
+            self.assertEqual(sync_state.get_mark('pull_requests', 'owner/big'), HighWaterMark(created_at, {1, 2}))
+            self.assertTrue(os.path.exists(sync_state.path))
+
+    def test_batched_repositories_use_the_token_of_their_worker(self):
+        fake = FakeGraphQL()
+        sink = RepositoryBuffer()
+        repos = [(None, make_repository(f'big{i}'), 'prefetch-token') for i in range(4)]
+
+        def get_worker_client():
+            return None, f'token-{threading.current_thread().name}'
+
+        with (
+            patch('src.graphql.pull_request_parser.run_graphql_query', fake),
+            patch('src.graphql.pull_request_parser.open_sink', return_value=nullcontext(sink)),
+        ):
+            log_pull_requests_by_graphql(repos, 'out.csv', CSV_FORMAT, workers=2, get_worker_client=get_worker_client)
+
+        self.assertEqual(len(fake.tokens), 4)
+        for token, thread_name in fake.tokens:
+            self.assertEqual(token, f'token-{thread_name}')
+
+
+if __name__ == '__main__':
+    unittest.main()
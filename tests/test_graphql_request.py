@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from src.constants import GRAPHQL_MAX_RETRIES
+from src.graphql.request import GraphQLError, run_graphql_query
+
+
+PARTIAL = {
+    'data': {'r0': {'nameWithOwner': 'owner/a'}, 'r1': None},
+    'errors': [{'type': 'NOT_FOUND', 'path': ['r1']}],
+}
+
+
+class TestRunGraphqlQuery(unittest.TestCase):
+    def run_query(self, responses, **kwargs):
+        with (
+            patch('src.graphql.request.pacer.request', side_effect=responses) as request,
+            patch('src.graphql.request.sleep') as sleep,
+        ):
+            try:
+                return run_graphql_query('query', {}, 'token', **kwargs)
+            finally:
+                self.requests, self.sleeps = request.call_count, sleep.call_count
+
+    def test_transient_failure_is_retried(self):
+        data = self.run_query([httpx.Response(502), httpx.Response(200, json={'data': {'ok': True}})])
+
+        self.assertEqual(data, {'ok': True})
+        self.assertEqual((self.requests, self.sleeps), (2, 1))
+
+    def test_retries_are_bounded(self):
+        with self.assertRaises(GraphQLError):
+            self.run_query([httpx.Response(200, json=PARTIAL)] * GRAPHQL_MAX_RETRIES)
+
+        self.assertEqual((self.requests, self.sleeps), (GRAPHQL_MAX_RETRIES, GRAPHQL_MAX_RETRIES - 1))
+
+    def test_partial_data_is_accepted_when_allowed(self):
+        data = self.run_query([httpx.Response(200, json=PARTIAL)], allow_partial=True)
+
+        self.assertEqual(data, PARTIAL['data'])
+        self.assertEqual(self.requests, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+import unittest
+
+import httpx
+
+from src.http_cache import CachingTransport, HttpCache, get_cache_key
+
+
+class TestHttpCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = HttpCache(os.path.join(self.tmp_dir.name, 'http.sqlite'))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_not_modified_response_is_served_from_cache(self):
+        seen_headers = []
+
+        def handler(request):
+            seen_headers.append(request.headers.get('If-None-Match'))
+            if request.headers.get('If-None-Match') == '"v1"':
+                return httpx.Response(304, headers={'X-RateLimit-Remaining': '4998'})
+            return httpx.Response(200, headers={'ETag': '"v1"', 'X-RateLimit-Remaining': '4999'}, json=[1, 2])
+
+        client = httpx.Client(transport=CachingTransport(self.cache, httpx.MockTransport(handler)))
+        first = client.get('https://api.example.com/items')
+        second = client.get('https://api.example.com/items')
+
+        self.assertEqual(seen_headers, [None, '"v1"'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.headers['X-RateLimit-Remaining'], '4998')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key_depends_on_token(self):
+        url = 'https://api.example.com/items'
+
+        self.assertNotEqual(
+            get_cache_key('GET', url, {'Authorization': 'token a'}),
+            get_cache_key('GET', url, {'Authorization': 'token b'}),
+        )
+
+    def test_expired_entries_are_dropped(self):
+        self.cache.ttl = 0.01
+        self.cache.put('key', 200, {'ETag': '"v1"'}, b'body')
+        time.sleep(0.05)
+
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.cache.max_size = 10
+        self.cache.put('old', 200, {'ETag': '"a"'}, b'123456')
+        self.cache.put('new', 200, {'ETag': '"b"'}, b'123456')
+
+        self.assertIsNone(self.cache.get('old'))
+        self.assertEqual(self.cache.get('new').body, b'123456')
+
+
+if __name__ == '__main__':
+    unittest.main()
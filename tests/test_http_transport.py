@@ -0,0 +1,41 @@
+import asyncio
+import unittest
+
+import httpx
+
+from src.http_transport import HttpTransport
+
+
+class TestHttpTransport(unittest.TestCase):
+    def test_session_is_shared_and_pooled(self):
+        transport = HttpTransport(pool_size=4)
+
+        session = transport.session
+
+        self.assertIs(transport.session, session)
+        self.assertEqual(session.get_adapter('https://api.github.com')._pool_maxsize, 4)
+        self.assertIs(transport.sync_client(), transport.sync_client())
+
+    def test_response_hooks_see_async_responses(self):
+        transport = HttpTransport()
+        seen = []
+        transport.add_response_hook(lambda response: seen.append(response.status_code))
+
+        async def run():
+            async with transport.async_client() as client:
+                client._transport = httpx.MockTransport(lambda request: httpx.Response(204))
+                await client.get('https://example.com/a')
+
+        asyncio.run(run())
+
+        self.assertEqual(seen, [204])
+        self.assertEqual(transport.request_counts['example.com'], 1)
+
+    def test_github_options(self):
+        transport = HttpTransport(timeout=5, pool_size=8)
+
+        self.assertEqual(transport.github_options(), {'timeout': 5, 'pool_size': 8})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import time
+import unittest
+
+import requests
+
+from src.pacing import RequestPacer, is_rate_limited
+
+
+def make_response(status_code=200, **headers):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update({k.replace('_', '-'): str(v) for k, v in headers.items()})
+    return response
+
+
+class TestRequestPacer(unittest.TestCase):
+    def setUp(self):
+        self.pacer = RequestPacer(reserve=10, spread_threshold=0.2)
+
+    def test_no_delay_while_budget_is_large(self):
+        reset = time.time() + 3600
+        self.pacer.update_from_response(
+            'token', make_response(X_RateLimit_Remaining=4000, X_RateLimit_Limit=5000, X_RateLimit_Reset=reset)
+        )
+        self.assertEqual(self.pacer.get_delay('token'), 0.0)
+
+    def test_low_budget_is_spread_until_reset(self):
+        reset = time.time() + 1000
+        self.pacer.update('token', remaining=110, limit=5000, reset_at=reset)
+        self.pacer.wait('token')
+
+        delay = self.pacer.get_delay('token')
+        self.assertGreater(delay, 9)
+        self.assertLess(delay, 11)
+
+    def test_exhausted_budget_waits_for_reset(self):
+        reset = time.time() + 100
+        self.pacer.update('token', remaining=5, limit=5000, reset_at=reset)
+        self.assertAlmostEqual(self.pacer.get_delay('token'), 100, delta=1)
+
+    def test_retry_after_blocks_requests(self):
+        response = make_response(403, Retry_After=30)
+        self.assertTrue(is_rate_limited(response))
+
+        self.pacer.update_from_response('token', response)
+        self.assertAlmostEqual(self.pacer.get_delay('token'), 30, delta=1)
+
+    def test_unknown_budget_is_not_paced(self):
+        self.assertEqual(self.pacer.get_delay('other'), 0.0)
+        self.assertFalse(is_rate_limited(make_response(404)))
+
+
+if __name__ == '__main__':
+    unittest.main()
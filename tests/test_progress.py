@@ -0,0 +1,72 @@
+import logging
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.async_http import AsyncHttpEngine
+from src.progress import QUIET, SUMMARY, VERBOSE, ProgressReporter
+
+
+class FormattingSpy:
+    def __init__(self):
+        self.formatted = 0
+
+    def __format__(self, format_spec):
+        self.formatted += 1
+        return 'row'
+
+
+class TestProgressReporter(unittest.TestCase):
+    def tearDown(self):
+        logging.getLogger().setLevel(logging.INFO)
+
+    def test_rows_are_formatted_only_in_verbose_mode(self):
+        for level, expected in ((QUIET, 0), (SUMMARY, 0), (VERBOSE, 1)):
+            with self.subTest(level=level):
+                reporter = ProgressReporter(level, refresh_interval=3600)
+                reporter.start_repository('repo')
+                row = FormattingSpy()
+                reporter.add_item(row)
+                self.assertEqual(row.formatted, expected)
+
+    def test_progress_lines_are_rate_limited(self):
+        reporter = ProgressReporter(SUMMARY, refresh_interval=3600)
+        reporter.start_repository('repo', total=1000)
+        with self.assertLogs(level='INFO') as logs:
+            for _ in range(1000):
+                reporter.advance()
+                reporter.add_item()
+            reporter.finish()
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('repo: 1000 items', logs.output[0])
+        self.assertIn('Total: 1000 items', logs.output[1])
+
+    def test_requests_count_for_the_repository_of_the_calling_thread(self):
+        reporter = ProgressReporter(QUIET)
+        reporter.start_repository('repo')
+
+        async def job(session):
+            reporter.on_response(None)
+
+        engine = AsyncHttpEngine()
+        try:
+            list(engine.iter_completed((index, job) for index in range(3)))
+        finally:
+            engine.close()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            executor.submit(reporter.bind(reporter.on_response), None).result()
+            # без bind запрос засчитывается только в общий итог
+            executor.submit(reporter.on_response, None).result()
+
+        self.assertEqual(reporter.repository.requests, 4)
+        self.assertEqual(reporter.total_requests, 5)
+
+    def test_quiet_mode_suppresses_info(self):
+        reporter = ProgressReporter(QUIET)
+        self.assertEqual(logging.getLogger().level, logging.WARNING)
+        reporter.set_level(SUMMARY)
+        self.assertEqual(logging.getLogger().level, logging.INFO)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import csv
+import os
+import tempfile
+import unittest
+from dataclasses import asdict, dataclass
+
+from src.constants import EMPTY_FIELD
+from src.export_sheets import read_output_table
+from src.sinks import (
+    ARROW_FORMAT,
+    PARQUET_FORMAT,
+    BufferedSink,
+    CsvSink,
+    _coerce,
+    get_field_names,
+    get_header,
+    open_sink,
+)
+
+
+@dataclass(kw_only=True, frozen=True)
+class RowData:
+    repository_name: str = ''
+    author_login: str = ''
+    total_commits: int = 0
+
+
+class TestCsvSink(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_name = os.path.join(self.tmp_dir.name, 'out.csv')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read_rows(self):
+        with open(self.csv_name, encoding='utf-8', newline='') as file:
+            return list(csv.reader(file))
+
+    def test_header_is_computed_from_dataclass(self):
+        field_names = get_field_names(RowData)
+        self.assertEqual(field_names, ('repository_name', 'author_login', 'total_commits'))
+        self.assertEqual(get_header(field_names), ('repository name', 'author login', 'total commits'))
+
+    def test_rows_are_buffered_until_batch_is_full(self):
+        sink = CsvSink(self.csv_name, get_field_names(RowData), buffer_size=2)
+        sink.write(asdict(RowData(repository_name='repo', author_login='a', total_commits=1)))
+        self.assertEqual(len(self._read_rows()), 1)
+
+        sink.write(asdict(RowData(repository_name='repo', author_login='b', total_commits=2)))
+        self.assertEqual(len(self._read_rows()), 3)
+
+        sink.write(asdict(RowData(repository_name='repo', author_login='c', total_commits=3)))
+        sink.close()
+        self.assertEqual(
+            self._read_rows(),
+            [
+                ['repository name', 'author login', 'total commits'],
+                ['repo', 'a', '1'],
+                ['repo', 'b', '2'],
+                ['repo', 'c', '3'],
+            ],
+        )
+
+    def test_close_is_idempotent(self):
+        with CsvSink(self.csv_name, get_field_names(RowData)) as sink:
+            sink.write(asdict(RowData(repository_name='repo')))
+        sink.close()
+        self.assertEqual(self._read_rows()[1], ['repo', '', '0'])
+
+    def test_append_keeps_existing_rows(self):
+        with CsvSink(self.csv_name, get_field_names(RowData)) as sink:
+            sink.write(asdict(RowData(repository_name='repo', author_login='a')))
+        with CsvSink(self.csv_name, get_field_names(RowData), append=True) as sink:
+            sink.write(asdict(RowData(repository_name='repo', author_login='b')))
+
+        self.assertEqual([row[1] for row in self._read_rows()], ['author login', 'a', 'b'])
+
+    def test_non_dict_row_is_rejected(self):
+        with CsvSink(self.csv_name, get_field_names(RowData)) as sink:
+            with self.assertRaises(TypeError):
+                sink.write(['repo'])
+
+
+class TestArrowSink(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_rows(self, output_format):
+        file_name = os.path.join(self.tmp_dir.name, f'out.{output_format}')
+        with open_sink(file_name, RowData, output_format) as sink:
+            sink.buffer_size = 2
+            for login, commits in (('a', 1), ('b', None), ('a', '3')):
+                sink.write(asdict(RowData(repository_name='repo', author_login=login, total_commits=commits)))
+        return file_name, sink
+
+    def test_columnar_formats_round_trip(self):
+        for output_format in (PARQUET_FORMAT, ARROW_FORMAT):
+            with self.subTest(output_format=output_format):
+                file_name, sink = self._write_rows(output_format)
+                df = read_output_table(file_name, output_format)
+
+                self.assertEqual(list(df.columns), ['repository name', 'author login', 'total commits'])
+                self.assertEqual(list(df['author login']), ['a', 'b', 'a'])
+                self.assertEqual(df['total commits'].isna().tolist(), [False, True, False])
+                self.assertEqual(df['total commits'][2], 3)
+
+    def test_append_rewrites_existing_batches(self):
+        for output_format in (PARQUET_FORMAT, ARROW_FORMAT):
+            with self.subTest(output_format=output_format):
+                file_name, _ = self._write_rows(output_format)
+                with open_sink(file_name, RowData, output_format, append=True) as sink:
+                    sink.write(asdict(RowData(repository_name='repo', author_login='c', total_commits=4)))
+
+                df = read_output_table(file_name, output_format)
+                self.assertEqual(list(df['author login']), ['a', 'b', 'a', 'c'])
+
+    def test_repeated_columns_are_dictionary_encoded(self):
+        import pyarrow as pa
+
+        _, sink = self._write_rows(PARQUET_FORMAT)
+        self.assertTrue(pa.types.is_dictionary(sink.schema.field('repository name').type))
+        self.assertTrue(pa.types.is_dictionary(sink.schema.field('author login').type))
+        self.assertEqual(sink.schema.field('total commits').type, pa.int64())
+
+
+class TestCoerce(unittest.TestCase):
+    def test_bool_strings_are_parsed(self):
+        self.assertEqual(
+            [_coerce(v, bool) for v in ('False', 'true', '0', EMPTY_FIELD, 1)], [False, True, False, None, True]
+        )
+
+    def test_unconvertible_numbers_become_null(self):
+        self.assertEqual([_coerce(v, int) for v in ('3', '', EMPTY_FIELD, 4.0)], [3, None, None, 4])
+
+    def test_sink_methods_are_abstract(self):
+        with self.assertRaises(TypeError):
+            BufferedSink('out.csv', [], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
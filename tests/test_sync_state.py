@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from src.sync_state import HighWaterMark, SyncState
+
+
+MOMENT = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class TestHighWaterMark(unittest.TestCase):
+    def test_only_newer_items_pass(self):
+        mark = HighWaterMark(MOMENT, {'a'})
+
+        self.assertFalse(mark.is_new(MOMENT - timedelta(seconds=1), 'old'))
+        self.assertFalse(mark.is_new(MOMENT, 'a'))
+        self.assertTrue(mark.is_new(MOMENT, 'b'))
+        self.assertTrue(mark.is_new(MOMENT + timedelta(seconds=1), 'c'))
+
+    def test_items_are_compared_with_the_starting_mark(self):
+        mark = HighWaterMark(MOMENT - timedelta(days=2), {'old'})
+        # от новых к старым: add не должен отсекать остальные новые элементы
+        for moment, item_id in ((MOMENT, 'c'), (MOMENT - timedelta(days=1), 'b')):
+            self.assertTrue(mark.is_new(moment, item_id))
+            mark.add(moment, item_id)
+
+        self.assertFalse(mark.is_new(MOMENT - timedelta(days=2), 'old'))
+        self.assertTrue(mark.is_older(MOMENT - timedelta(days=3)))
+        self.assertFalse(mark.is_older(MOMENT - timedelta(days=1)))
+        self.assertEqual(mark, HighWaterMark(MOMENT, {'c'}))
+
+    def test_add_moves_mark_forward(self):
+        mark = HighWaterMark()
+        mark.add(MOMENT, 'a')
+        mark.add(MOMENT - timedelta(days=1), 'old')
+        mark.add(MOMENT, 'b')
+
+        self.assertEqual(mark, HighWaterMark(MOMENT, {'a', 'b'}))
+
+
+class TestSyncState(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'out.csv.state.json')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_marks_survive_save_and_load(self):
+        state = SyncState(self.path)
+        state.set_mark('issues', 'owner/repo', HighWaterMark(MOMENT, {3, 4}))
+        state.save()
+
+        loaded = SyncState(self.path)
+
+        self.assertEqual(loaded.get_mark('issues', 'owner/repo'), HighWaterMark(MOMENT, {3, 4}))
+        self.assertEqual(loaded.get_mark('issues', 'owner/other'), HighWaterMark())
+        self.assertEqual(loaded.get_mark('commits', 'owner/repo'), HighWaterMark())
+
+    def test_failed_transaction_drops_its_marks(self):
+        state = SyncState(self.path)
+        with state.transaction():
+            state.set_mark('issues', 'owner/ok', HighWaterMark(MOMENT, {1}))
+        with self.assertRaises(RuntimeError):
+            with state.transaction():
+                state.set_mark('issues', 'owner/broken', HighWaterMark(MOMENT, {2}))
+                raise RuntimeError('boom')
+
+        self.assertEqual(state.get_mark('issues', 'owner/ok'), HighWaterMark(MOMENT, {1}))
+        self.assertEqual(state.get_mark('issues', 'owner/broken'), HighWaterMark())
+
+
+if __name__ == '__main__':
+    unittest.main()
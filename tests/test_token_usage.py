@@ -48,6 +48,11 @@ class TestTokenUsage(ParametrizedTestCase):
             pr_comments=False,
             export_google_sheets=False,
             out=test_args.out,
+            format='csv',
+            workers=1,
+            incremental=False,
+            graphql=False,
+            commit_files=False,
             base_url=None,
         )
 
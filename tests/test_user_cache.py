@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.interface_wrapper import User
+from src.user_cache import UserCache
+
+
+def make_user(login):
+    return User(
+        _id=1, login=login, username=login.title(), email=None, html_url='', node_id='', type='User', bio='',
+        site_admin=False,
+    )
+
+
+class TestUserCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'users.sqlite')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_profile_is_loaded_once(self):
+        cache = UserCache()
+        loads = []
+
+        def load():
+            loads.append(1)
+            return make_user('dev')
+
+        first = cache.get_or_load('host#1', load)
+        second = cache.get_or_load('host#1', load)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(loads), 1)
+
+    def test_store_is_shared_between_runs(self):
+        cache = UserCache()
+        cache.set_store(self.path)
+        cache.put('host#1', make_user('dev'))
+        cache.close()
+
+        next_run = UserCache()
+        next_run.set_store(self.path)
+
+        self.assertEqual(next_run.get('host#1'), make_user('dev'))
+        next_run.close()
+
+    def test_expired_profile_is_reloaded(self):
+        cache = UserCache(ttl=60)
+        cache.set_store(self.path)
+        with patch('src.user_cache.time.time', return_value=1000):
+            cache.put('host#1', make_user('dev'))
+        with patch('src.user_cache.time.time', return_value=1100):
+            self.assertIsNone(cache.get('host#1'))
+        cache.close()
+
+    def test_least_recently_used_profile_is_evicted(self):
+        cache = UserCache(max_entries=2)
+        cache.put('host#1', make_user('a'))
+        cache.put('host#2', make_user('b'))
+        cache.get('host#1')
+        cache.put('host#3', make_user('c'))
+
+        self.assertIsNone(cache.get('host#2'))
+        self.assertEqual(cache.get('host#1').login, 'a')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import csv
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from git import Actor, Repo
+
+from src.wikipars import iter_wiki_log, sync_wiki_mirror, wikiparser
+
+
+AUTHOR = Actor('Dev', 'dev+login@users.noreply.github.com')
+
+
+class TestIterWikiLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+        self.repo = Repo.init(self.path)
+
+    def tearDown(self):
+        self.repo.close()
+        self.tmp.cleanup()
+
+    def commit(self, message):
+        self.repo.git.add(all=True)
+        return self.repo.index.commit(message, author=AUTHOR, committer=AUTHOR).hexsha
+
+    def test_pages_actions_and_lines_per_revision(self):
+        (self.path / 'Home.md').write_text('a\n')
+        (self.path / 'Страница.md').write_text('x\ny\n')
+        first = self.commit('init')
+        (self.path / 'Home.md').rename(self.path / 'Main.md')
+        (self.path / 'Страница.md').write_text('x\n')
+        (self.path / 'image.png').write_bytes(b'\0\1')
+        second = self.commit('edit')
+
+        revisions = list(iter_wiki_log(self.repo))
+
+        self.assertEqual([r.hexsha for r in revisions], [second, first])
+        latest, root = revisions
+        self.assertTrue(root.is_root)
+        self.assertEqual(root.pages, ['Home.md', 'Страница.md'])
+        self.assertEqual((root.added_lines, root.deleted_lines), (3, 0))
+        self.assertFalse(latest.is_root)
+        self.assertEqual(latest.pages, ['Main.md', 'image.png', 'Страница.md'])
+        self.assertEqual(latest.change_types, ['R', 'A', 'M'])
+        # бинарный файл не считается в строках
+        self.assertEqual((latest.added_lines, latest.deleted_lines), (0, 1))
+        self.assertEqual((latest.author_name, latest.author_email), ('Dev', AUTHOR.email))
+
+
+class TestSyncWikiMirror(unittest.TestCase):
+    def test_existing_mirror_is_fetched(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Repo.init(Path(tmp, 'source'))
+            (Path(tmp, 'source') / 'Home.md').write_text('a\n')
+            source.git.add(all=True)
+            source.index.commit('init', author=AUTHOR, committer=AUTHOR)
+            mirror_path = Path(tmp, 'wikis', 'owner', 'repo.wiki.git')
+            Repo.clone_from(source.working_dir, mirror_path, mirror=True).close()
+            (Path(tmp, 'source') / 'Home.md').write_text('b\n')
+            source.git.add(all=True)
+            head = source.index.commit('edit', author=AUTHOR, committer=AUTHOR).hexsha
+
+            mirror = sync_wiki_mirror('owner/repo', str(Path(tmp, 'wikis')))
+
+            self.assertTrue(mirror.bare)
+            self.assertEqual([r.hexsha for r in iter_wiki_log(mirror)][0], head)
+            broken_path = Path(tmp, 'wikis', 'owner', 'broken.wiki.git')
+            broken_path.mkdir()
+            (broken_path / 'file').write_text('')
+            self.assertIsNone(sync_wiki_mirror('owner/broken', str(Path(tmp, 'wikis'))))
+            mirror.close()
+            source.close()
+
+
+class TestWikiparser(unittest.TestCase):
+    def test_output_follows_repository_list(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ('first', 'second'):
+                repo = Repo.init(Path(tmp, name))
+                (Path(tmp, name) / 'Home.md').write_text('a\n')
+                repo.git.add(all=True)
+                repo.index.commit('init', author=AUTHOR, committer=AUTHOR)
+                repo.close()
+
+            def slow_first(name_rep, path_drepo):
+                # первое зеркало обновляется дольше второго
+                if name_rep == 'owner/first':
+                    time.sleep(0.2)
+                return Repo(Path(tmp, name_rep.split('/')[1]))
+
+            out = str(Path(tmp, 'wiki.csv'))
+            with patch('src.wikipars.sync_wiki_mirror', slow_first):
+                wikiparser(['owner/first', 'owner/second'], tmp, out, workers=2)
+
+            with open(out, encoding='utf-8') as file:
+                names = [row['repository name'] for row in csv.DictReader(file)]
+            self.assertEqual(names, ['owner/first', 'owner/second'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import time
+import unittest
+import os
+import tempfile
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from src.sync_state import HighWaterMark, SyncState
+from src.workers import RepositoryBuffer, process_repositories
+
+
+def make_binded_repos(count):
+    for index in range(count):
+        yield None, SimpleNamespace(name=f'repo{index}', delay=(count - index) * 0.01), 'token'
+
+
+def log_repository(client, repo, token, sink):
+    for row_index in range(3):
+        time.sleep(repo.delay)
+        sink.write({'repository_name': repo.name, 'row': row_index})
+
+
+class TestProcessRepositories(unittest.TestCase):
+    def test_parallel_output_keeps_repository_order(self):
+        sequential = RepositoryBuffer()
+        process_repositories(make_binded_repos(6), sequential, log_repository)
+
+        parallel = RepositoryBuffer()
+        process_repositories(make_binded_repos(6), parallel, log_repository, workers=4)
+
+        self.assertEqual(len(parallel.rows), 18)
+        self.assertEqual(parallel.rows, sequential.rows)
+
+    def test_worker_failure_skips_only_that_repository(self):
+        def failing(client, repo, token, sink):
+            sink.write({'repository_name': repo.name})
+            if repo.name == 'repo1':
+                raise RuntimeError('boom')
+
+        sink = RepositoryBuffer()
+        with self.assertLogs(level='WARNING') as logs:
+            process_repositories(make_binded_repos(4), sink, failing, workers=2)
+
+        self.assertEqual(sink.rows, [{'repository_name': f'repo{i}'} for i in (0, 2, 3)])
+        self.assertIn('WARNING:root:repo1', logs.output)
+
+    def test_sequential_failure_skips_only_that_repository(self):
+        moment = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+        def failing(client, repo, token, sink):
+            sink.write({'repository_name': repo.name})
+            state.set_mark('commits', repo.name, HighWaterMark(moment, {repo.name}))
+            if repo.name == 'repo0':
+                raise RuntimeError('boom')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            state = SyncState(os.path.join(tmp, 'state.json'))
+            sink = RepositoryBuffer()
+            process_repositories(make_binded_repos(2), sink, failing, sync_state=state)
+
+            # строки и отметка упавшего репозитория отброшены, следующий обработан
+            self.assertEqual(sink.rows, [{'repository_name': 'repo1'}])
+            self.assertEqual(state.get_mark('commits', 'repo0'), HighWaterMark())
+            self.assertEqual(state.get_mark('commits', 'repo1'), HighWaterMark(moment, {'repo1'}))
+
+
+if __name__ == '__main__':
+    unittest.main()